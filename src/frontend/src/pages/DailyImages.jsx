@@ -216,7 +216,7 @@ function DailyImages() {
               onClick={() => openImage(img, index)}
             >
               <img
-                src={img.url}
+                src={img.thumbUrl || img.url}
                 alt={`Capture at ${img.time}`}
                 loading="lazy"
               />
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Import Time Benchmark
+Measures `import scraper` with -X importtime and fails when startup exceeds
+the budget or eagerly loads a dependency that should be imported lazily
+"""
+import os
+import sys
+import subprocess
+from statistics import median
+from typing import Dict, List
+
+
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '200'))
+IMPORT_RUNS = int(os.environ.get('IMPORT_RUNS', '5'))
+# Heavy packages only the code paths that need them may import
+LAZY_PACKAGES = ('selenium', 'webdriver_manager', 'PIL', 'requests', 'http.server')
+
+
+def parse_importtime(output: str) -> Dict[str, int]:
+    """Parse -X importtime stderr into {module: cumulative microseconds}."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(cumulative)
+        except ValueError:
+            continue
+    return modules
+
+
+def measure_import(module: str = 'scraper') -> Dict[str, int]:
+    """Import a module in a fresh interpreter and return its import timings."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def check_budget(module: str = 'scraper', runs: int = IMPORT_RUNS, budget_ms: float = IMPORT_BUDGET_MS) -> List[str]:
+    """Run the benchmark and return a list of budget violations (empty when within budget)."""
+    samples = [measure_import(module) for _ in range(runs)]
+    total_ms = median(sample[module] for sample in samples) / 1000
+
+    last = samples[-1]
+    print(f"import {module}: median {total_ms:.1f}ms over {runs} runs (budget {budget_ms:.0f}ms)")
+    print("Slowest imports:")
+    for name, micros in sorted(last.items(), key=lambda item: item[1], reverse=True)[1:11]:
+        print(f"  {micros / 1000:8.1f}ms  {name}")
+
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"import took {total_ms:.1f}ms, over the {budget_ms:.0f}ms budget")
+    for package in LAZY_PACKAGES:
+        if any(name == package or name.startswith(package + '.') for name in last):
+            problems.append(f"{package} is imported eagerly")
+    return problems
+
+
+if __name__ == '__main__':
+    module = sys.argv[1] if len(sys.argv) > 1 else 'scraper'
+    problems = check_budget(module)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
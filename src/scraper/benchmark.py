@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmark Suite
+Times the capture and render hot paths on synthetic frames and compares the
+results against a JSON baseline to catch regressions
+"""
+import os
+import io
+import sys
+import json
+import time
+import sqlite3
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image
+
+from image_transform import transform
+from fingerprint import compute_fingerprint, compute_frame_stats
+from encoders import encode_capture, get_storage_format
+from renditions import submit_renditions
+from overlay import add_overlay_to_image, get_overlay_layer
+
+
+BENCH_RUNS = int(os.environ.get('BENCH_RUNS', '20'))
+# A case regresses when its p50 is this fraction slower than the baseline...
+BENCH_THRESHOLD = float(os.environ.get('BENCH_THRESHOLD', '0.25'))
+# ...and at least this many milliseconds slower, so sub-millisecond noise is ignored
+BENCH_MIN_DELTA_MS = float(os.environ.get('BENCH_MIN_DELTA_MS', '1.0'))
+# 'sqlite' (in-memory stand-in) or 'mariadb' (save_capture() against DB_*; use a scratch database)
+BENCH_DB = os.environ.get('BENCH_DB', 'sqlite').lower()
+BENCH_BASELINE = os.environ.get('BENCH_BASELINE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json'))
+
+RESOLUTIONS = {
+    '800x450': (800, 450),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+# Fixed weather so every run draws the same overlay
+ALICANTE = {'city': 'Alicante', 'temperature': 24.3, 'sunrise': '07:58', 'sunset': '18:49', 'day_length': '10h 51m'}
+BRATISLAVA = {'city': 'Bratislava', 'temperature': 11.7, 'sunrise': '07:02', 'sunset': '17:20', 'day_length': '10h 18m'}
+
+
+def make_frame(size) -> bytes:
+    """Deterministic synthetic webcam frame (fractal detail plus a sky gradient) as JPEG bytes."""
+    detail = Image.effect_mandelbrot(size, (-2.2, -1.2, 1.0, 1.2), 100).convert('RGB')
+    sky = Image.linear_gradient('L').resize(size).convert('RGB')
+    frame = Image.blend(detail, sky, 0.4)
+    buffer = io.BytesIO()
+    frame.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def measure(fn: Callable[[], object], runs: int = BENCH_RUNS) -> Dict:
+    """
+    Time a case (after one warm-up call) and report p50/p95 in ms plus the
+    peak traced allocation of one extra call. tracemalloc sees Python
+    allocations (encoded bytes, buffers), not Pillow's pixel storage.
+    """
+    fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'peak_kb': round(peak / 1024, 1),
+        'runs': runs,
+    }
+
+
+def process_frame(raw: bytes) -> bytes:
+    """The CPU part of process_screenshot(): crop/resize, fingerprint and stats, encode with renditions."""
+    image = transform(raw)
+    compute_fingerprint(image)
+    compute_frame_stats(image)
+    futures = submit_renditions(image, get_storage_format())
+    data, _ = encode_capture(image)
+    [future.result() for future in futures]
+    return data
+
+
+class SqliteStore:
+    """In-memory stand-in for the captures tables, inserting the same rows as save_capture()."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('''
+            CREATE TABLE captures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                camera_id TEXT, capture_date TEXT, capture_time TEXT, captured_at TEXT,
+                image_data BLOB, image_format TEXT, width INTEGER, height INTEGER,
+                alicante_temp REAL, alicante_sunrise TEXT, alicante_sunset TEXT, alicante_day_length TEXT,
+                bratislava_temp REAL, bratislava_sunrise TEXT, bratislava_sunset TEXT, bratislava_day_length TEXT,
+                fingerprint INTEGER, duplicate_of INTEGER,
+                luminance REAL, contrast REAL, light_class TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE capture_renditions (
+                capture_id INTEGER, size TEXT, width INTEGER, height INTEGER,
+                image_format TEXT, image_data BLOB, PRIMARY KEY (capture_id, size)
+            )
+        ''')
+
+    def save(self, image_data: bytes, renditions: List[Dict], width: int, height: int, fingerprint: int, frame_stats: Dict) -> int:
+        now = datetime.now()
+        cursor = self.conn.execute('''
+            INSERT INTO captures (
+                camera_id, capture_date, capture_time, captured_at, image_data, image_format, width, height,
+                alicante_temp, alicante_sunrise, alicante_sunset, alicante_day_length,
+                bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length,
+                fingerprint, duplicate_of, luminance, contrast, light_class
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            'benchmark', now.date().isoformat(), now.time().isoformat(), now.isoformat(), image_data, 'jpeg', width, height,
+            ALICANTE['temperature'], ALICANTE['sunrise'], ALICANTE['sunset'], ALICANTE['day_length'],
+            BRATISLAVA['temperature'], BRATISLAVA['sunrise'], BRATISLAVA['sunset'], BRATISLAVA['day_length'],
+            fingerprint & 0x7FFFFFFFFFFFFFFF, None,  # SQLite integers are signed 64-bit
+            frame_stats['luminance'], frame_stats['contrast'], frame_stats['light_class']
+        ))
+        capture_id = cursor.lastrowid
+        self.conn.executemany('''
+            INSERT INTO capture_renditions (capture_id, size, width, height, image_format, image_data)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(capture_id, r['size'], r['width'], r['height'], r['image_format'], r['image_data']) for r in renditions])
+        self.conn.commit()
+        return capture_id
+
+
+def get_db_insert(image: Image.Image, image_data: bytes, renditions: List[Dict]) -> Callable[[], object]:
+    """Build the DB insert case for BENCH_DB."""
+    fingerprint = compute_fingerprint(image)
+    frame_stats = compute_frame_stats(image)
+    if BENCH_DB == 'mariadb':
+        from database import save_capture
+
+        counter = iter(range(1_000_000))
+        # A camera id per call keeps the (camera, date, second) unique key from colliding
+        return lambda: save_capture(
+            image_data, ALICANTE, BRATISLAVA, image.width, image.height,
+            camera_id=f'benchmark-{next(counter)}', fingerprint=fingerprint, renditions=renditions,
+            frame_stats=frame_stats
+        )
+
+    store = SqliteStore()
+    return lambda: store.save(image_data, renditions, image.width, image.height, fingerprint, frame_stats)
+
+
+def cleanup_db() -> None:
+    """Remove the rows the MariaDB insert case created."""
+    if BENCH_DB != 'mariadb':
+        return
+    from database import get_connection
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM captures WHERE camera_id LIKE 'benchmark-%'")
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def get_cases() -> Dict[str, Callable[[], object]]:
+    """All benchmark cases keyed 'resolution/stage' ('output/...' for stages on the stored frame)."""
+    cases = {}
+    for label, size in RESOLUTIONS.items():
+        raw = make_frame(size)
+        cases[f'{label}/decode'] = lambda raw=raw: Image.open(io.BytesIO(raw)).load()
+        # load(): a frame already at the output size comes back undecoded
+        cases[f'{label}/crop_resize'] = lambda raw=raw: transform(raw).load()
+        cases[f'{label}/process'] = lambda raw=raw: process_frame(raw)
+
+    # Everything after crop/resize works on the stored frame size
+    image = transform(make_frame(RESOLUTIONS['1080p']))
+    image_data, _ = encode_capture(image)
+    renditions = [future.result() for future in submit_renditions(image, get_storage_format())]
+
+    def overlay_uncached():
+        get_overlay_layer.cache_clear()
+        return add_overlay_to_image(image, ALICANTE, BRATISLAVA)
+
+    cases['output/encode'] = lambda: encode_capture(image)
+    cases['output/renditions'] = lambda: [future.result() for future in submit_renditions(image, get_storage_format())]
+    cases['output/overlay'] = lambda: add_overlay_to_image(image, ALICANTE, BRATISLAVA)
+    cases['output/overlay_uncached'] = overlay_uncached
+    cases[f'output/db_insert_{BENCH_DB}'] = get_db_insert(image, image_data, renditions)
+    return cases
+
+
+def run(runs: int = BENCH_RUNS, only: Optional[str] = None) -> Dict:
+    """Run the suite and return the results document."""
+    results = {}
+    try:
+        for name, fn in get_cases().items():
+            if only and only not in name:
+                continue
+            results[name] = measure(fn, runs)
+            result = results[name]
+            print(f"{name:28} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  peak {result['peak_kb']:9.1f}KB")
+    finally:
+        cleanup_db()
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = BENCH_THRESHOLD) -> List[str]:
+    """Return the cases whose p50 regressed beyond the threshold (empty when none did)."""
+    problems = []
+    for name, result in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        delta = result['p50_ms'] - previous['p50_ms']
+        if result['p50_ms'] > previous['p50_ms'] * (1 + threshold) and delta >= BENCH_MIN_DELTA_MS:
+            problems.append(
+                f"{name}: p50 {result['p50_ms']:.2f}ms vs baseline {previous['p50_ms']:.2f}ms "
+                f"(+{delta / previous['p50_ms'] * 100:.0f}%, threshold {threshold * 100:.0f}%)"
+            )
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the capture and render hot paths')
+    parser.add_argument('--runs', type=int, default=BENCH_RUNS, help='Timed runs per case')
+    parser.add_argument('--only', help='Only run cases whose name contains this')
+    parser.add_argument('--baseline', default=BENCH_BASELINE, help='Baseline JSON path')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='Exit non-zero when a case regressed against the baseline')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    options = parser.parse_args()
+
+    current = run(options.runs, options.only)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if options.save_baseline:
+        with open(options.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {options.baseline}")
+
+    if options.compare:
+        if not os.path.exists(options.baseline):
+            print(f"No baseline at {options.baseline}; run with --save-baseline first")
+            sys.exit(1)
+        with open(options.baseline) as f:
+            problems = compare(current, json.load(f))
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,277 @@
+"""
+Browser Session Module
+Keeps a long-lived Chromium WebDriver across capture cycles,
+with liveness probes and recycling by capture count or memory usage
+"""
+import os
+import queue
+import shutil
+import signal
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+# Configuration
+BROWSER_PERSISTENT = os.environ.get('BROWSER_PERSISTENT', 'true').lower() in ('1', 'true', 'yes')
+BROWSER_MAX_CAPTURES = int(os.environ.get('BROWSER_MAX_CAPTURES', '50'))
+BROWSER_MAX_RSS_MB = int(os.environ.get('BROWSER_MAX_RSS_MB', '800'))
+BROWSER_POOL_SIZE = max(1, int(os.environ.get('BROWSER_POOL_SIZE', '1')))
+# Keep a Chromium user-data directory per pooled browser so consent cookies survive restarts
+BROWSER_PROFILE = os.environ.get('BROWSER_PROFILE', 'true').lower() in ('1', 'true', 'yes')
+BROWSER_PROFILE_RESET_FAILURES = int(os.environ.get('BROWSER_PROFILE_RESET_FAILURES', '3'))
+
+
+def get_profile_root() -> str:
+    """Get the directory holding persistent browser profiles."""
+    default = os.path.join(os.environ.get('OUTPUT_DIR', '/data'), 'browser-profile')
+    return os.environ.get('BROWSER_PROFILE_DIR', default)
+
+
+def _read_children_map() -> Dict[int, List[int]]:
+    """Build a parent PID -> child PIDs map from /proc."""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return children
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+            # The command name may contain spaces, so parse after the closing paren
+            ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return children
+
+
+def _read_rss_bytes(pid: int) -> int:
+    """Read resident set size of a single process in bytes."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def get_process_tree_pids(root_pid: int) -> List[int]:
+    """Get a PID and all of its descendants."""
+    children = _read_children_map()
+    pids = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def get_process_tree_rss(root_pid: int) -> int:
+    """Get the total RSS in bytes of a process and all of its descendants."""
+    return sum(_read_rss_bytes(pid) for pid in get_process_tree_pids(root_pid))
+
+
+def kill_process_tree(root_pid: int) -> int:
+    """SIGKILL a process and all of its descendants. Returns how many were signalled."""
+    killed = 0
+    # Children first so nothing gets reparented and missed
+    for pid in reversed(get_process_tree_pids(root_pid)):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+def get_driver_pid(driver) -> Optional[int]:
+    """Get the chromedriver PID (root of the Chromium process tree)."""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def is_driver_alive(driver) -> bool:
+    """Probe the WebDriver session for liveness."""
+    try:
+        driver.switch_to.default_content()
+        return driver.execute_script('return 1') == 1
+    except Exception:
+        return False
+
+
+def get_profile_dir(name: str) -> Optional[str]:
+    """Get the persistent profile directory for a named browser, or None when disabled."""
+    return os.path.join(get_profile_root(), name) if BROWSER_PROFILE else None
+
+
+class BrowserSession:
+    """
+    Long-lived WebDriver shared across capture cycles.
+
+    The driver is created lazily by `driver_factory`, probed for liveness
+    before each capture and recycled after `max_captures` captures or when
+    the Chromium process tree grows beyond `max_rss_mb`.
+
+    With `profile_dir` the browser keeps its cookies and localStorage
+    between restarts; the profile is wiped after `reset_failures`
+    consecutive failed captures in case its state broke the page.
+    """
+
+    def __init__(
+        self,
+        driver_factory: Callable,
+        max_captures: int = BROWSER_MAX_CAPTURES,
+        max_rss_mb: int = BROWSER_MAX_RSS_MB,
+        name: str = 'browser-0',
+        profile_dir: str = None,
+        reset_failures: int = BROWSER_PROFILE_RESET_FAILURES
+    ):
+        self.name = name
+        self.profile_dir = profile_dir
+        self.reset_failures = reset_failures
+        self.failures = 0
+        self.driver_factory = driver_factory
+        self.max_captures = max_captures
+        self.max_rss_mb = max_rss_mb
+        self.driver = None
+        self.captures = 0
+        self.started_at = None
+        self.recycles = 0
+
+    def get_rss_bytes(self) -> int:
+        """Get the current RSS of the browser process tree in bytes."""
+        if self.driver is None:
+            return 0
+        pid = get_driver_pid(self.driver)
+        return get_process_tree_rss(pid) if pid else 0
+
+    def recycle_reason(self) -> Optional[str]:
+        """Return why the current driver should be replaced, or None if it is healthy."""
+        if self.driver is None:
+            return None
+        if self.max_captures > 0 and self.captures >= self.max_captures:
+            return f"reached {self.captures} captures"
+        if self.max_rss_mb > 0:
+            rss_mb = self.get_rss_bytes() / (1024 * 1024)
+            if rss_mb > self.max_rss_mb:
+                return f"RSS {rss_mb:.0f}MB over limit {self.max_rss_mb}MB"
+        if not is_driver_alive(self.driver):
+            return "liveness probe failed"
+        return None
+
+    def acquire(self):
+        """Get a healthy driver, starting or recycling the browser as needed."""
+        reason = self.recycle_reason()
+        if reason:
+            print(f"[browser] Recycling browser: {reason}")
+            self.close()
+            self.recycles += 1
+
+        if self.driver is None:
+            print("[browser] Starting browser...")
+            self.driver = self.driver_factory(profile_dir=self.prepare_profile())
+            self.captures = 0
+            self.started_at = datetime.now()
+
+        return self.driver
+
+    def kill(self) -> None:
+        """
+        Forcefully kill the browser process tree, e.g. when a capture hangs.
+        Blocked WebDriver calls then fail; the driver is discarded on release.
+        """
+        driver = self.driver
+        pid = get_driver_pid(driver) if driver is not None else None
+        if pid:
+            killed = kill_process_tree(pid)
+            print(f"[browser] Killed {killed} browser processes ({self.name})")
+
+    def prepare_profile(self) -> Optional[str]:
+        """Create the profile directory and clear locks left by a crashed browser."""
+        if not self.profile_dir:
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for lock in ('SingletonLock', 'SingletonCookie', 'SingletonSocket'):
+            try:
+                os.unlink(os.path.join(self.profile_dir, lock))
+            except OSError:
+                pass
+        return self.profile_dir
+
+    def reset_profile(self) -> None:
+        """Quit the browser and wipe its profile so the next start is clean."""
+        self.close()
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            print(f"[browser] Reset profile {self.profile_dir}")
+
+    def release(self, success: bool = True) -> None:
+        """Mark the end of a capture; a failed capture discards the driver."""
+        self.captures += 1
+        if success:
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self.profile_dir and self.reset_failures > 0 and self.failures >= self.reset_failures:
+            print(f"[browser] {self.failures} consecutive failures, resetting profile")
+            self.reset_profile()
+            self.failures = 0
+        else:
+            print("[browser] Capture failed, discarding browser")
+            self.close()
+
+    def close(self) -> None:
+        """Quit the driver if running."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+class BrowserPool:
+    """
+    Fixed-size pool of BrowserSessions shared by capture workers.
+
+    At most `size` browsers exist at once; a worker blocks in `session()`
+    until one is free. Non-persistent pools quit the browser on release.
+    """
+
+    def __init__(self, driver_factory: Callable, size: int = BROWSER_POOL_SIZE, persistent: bool = BROWSER_PERSISTENT):
+        self.size = size
+        self.persistent = persistent
+        self.sessions = queue.Queue()
+        self.all_sessions = [
+            BrowserSession(driver_factory, name=f'browser-{i}', profile_dir=get_profile_dir(f'browser-{i}'))
+            for i in range(size)
+        ]
+        for browser_session in self.all_sessions:
+            self.sessions.put(browser_session)
+
+    @contextmanager
+    def session(self):
+        """Borrow a session for the duration of one capture."""
+        browser_session = self.sessions.get()
+        try:
+            yield browser_session
+        finally:
+            if not self.persistent:
+                browser_session.close()
+            self.sessions.put(browser_session)
+
+    def close(self) -> None:
+        """Quit every browser in the pool."""
+        for browser_session in self.all_sessions:
+            browser_session.close()
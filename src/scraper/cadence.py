@@ -0,0 +1,110 @@
+"""
+Capture Cadence Policy
+Chooses the capture interval from the sun: dense around sunrise and sunset,
+normal during the day and sparse at night
+"""
+import os
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from weather import get_all_weather
+
+
+# 'fixed' keeps SCREENSHOT_INTERVAL around the clock, 'sun' follows the policy below
+CADENCE_MODE = os.environ.get('CADENCE_MODE', 'fixed').lower()
+CADENCE_CITY = os.environ.get('CADENCE_CITY', 'alicante')
+SUN_TIMES_REFRESH = 3600  # re-read sunrise/sunset at most once an hour
+
+DEFAULT_POLICY = {
+    'golden_window_minutes': 45,  # ± around sunrise and sunset
+    'golden_interval': 120,
+    'day_interval': 600,
+    'night_interval': 1800,
+}
+
+
+def load_policy() -> Dict:
+    """
+    Load the cadence policy: defaults overridden by CADENCE_POLICY, which is
+    either inline JSON or a path to a JSON file.
+    """
+    policy = dict(DEFAULT_POLICY)
+    raw = os.environ.get('CADENCE_POLICY', '').strip()
+    if raw:
+        if not raw.startswith('{'):
+            with open(raw, 'r') as f:
+                raw = f.read()
+        overrides = json.loads(raw)
+        unknown = set(overrides) - set(DEFAULT_POLICY)
+        if unknown:
+            raise ValueError(f"Unknown cadence policy keys: {', '.join(sorted(unknown))}")
+        policy.update(overrides)
+
+    for key in ('golden_interval', 'day_interval', 'night_interval'):
+        if int(policy[key]) < 60 or 86400 % int(policy[key]) != 0:
+            raise ValueError(f"{key} must be at least 60s and divide a day evenly")
+        policy[key] = int(policy[key])
+    return policy
+
+
+class CadencePolicy:
+    """Maps a timestamp to a capture interval based on the sun phase."""
+
+    def __init__(self, policy: Dict = None, city: str = CADENCE_CITY):
+        self.policy = policy or load_policy()
+        self.city = city
+        self._sun_times = None
+        self._sun_times_loaded = 0
+
+    @property
+    def intervals(self) -> Tuple[int, int, int]:
+        """All intervals the policy can return."""
+        return (self.policy['golden_interval'], self.policy['day_interval'], self.policy['night_interval'])
+
+    def get_sun_times(self) -> Optional[Tuple[datetime, datetime]]:
+        """Get today's sunrise and sunset, refreshed at most hourly."""
+        if self._sun_times is None or time.time() - self._sun_times_loaded > SUN_TIMES_REFRESH:
+            self._sun_times_loaded = time.time()
+            try:
+                weather = get_all_weather().get(self.city) or {}
+                sunrise = weather.get('sunrise_datetime')
+                sunset = weather.get('sunset_datetime')
+                if sunrise and sunset:
+                    self._sun_times = (datetime.fromisoformat(sunrise), datetime.fromisoformat(sunset))
+            except Exception as e:
+                print(f"[cadence] Could not load sun times: {e}")
+        return self._sun_times
+
+    def get_phase(self, when: datetime) -> str:
+        """Get the sun phase ('golden', 'day' or 'night') at a local time."""
+        sun_times = self.get_sun_times()
+        if not sun_times:
+            return 'day'
+
+        # Sun times move by minutes per day, so today's times are close enough for nearby dates
+        sunrise = datetime.combine(when.date(), sun_times[0].time())
+        sunset = datetime.combine(when.date(), sun_times[1].time())
+        window = timedelta(minutes=self.policy['golden_window_minutes'])
+
+        if abs(when - sunrise) <= window or abs(when - sunset) <= window:
+            return 'golden'
+        if sunrise < when < sunset:
+            return 'day'
+        return 'night'
+
+    def interval_at(self, timestamp: float) -> int:
+        """Get the capture interval in effect at a timestamp."""
+        phase = self.get_phase(datetime.fromtimestamp(timestamp))
+        return self.policy[f'{phase}_interval']
+
+
+if __name__ == '__main__':
+    # Print the cadence for today in 30 minute steps
+    cadence = CadencePolicy()
+    print(f"Policy: {cadence.policy}")
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(48):
+        when = start + timedelta(minutes=30 * i)
+        print(f"{when.strftime('%H:%M')}  {cadence.get_phase(when):6}  {cadence.interval_at(when.timestamp())}s")
@@ -0,0 +1,71 @@
+"""
+Camera Registry
+Loads the list of webcams to capture from a JSON config file
+"""
+import os
+import re
+import json
+from typing import Dict, List
+
+
+DEFAULT_CAMERA_ID = 'default'
+CAMERA_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+
+def get_default_camera() -> Dict:
+    """Single camera configured through TARGET_URL (the pre-registry setup)."""
+    return {
+        'id': DEFAULT_CAMERA_ID,
+        'name': 'Default',
+        'url': os.environ.get('TARGET_URL', 'https://www.algarapictures.com/webcam')
+    }
+
+
+def get_cameras_file() -> str:
+    """Get the camera config file path from environment variable."""
+    return os.environ.get('CAMERAS_FILE', os.path.join(os.environ.get('OUTPUT_DIR', '/data'), 'metadata', 'cameras.json'))
+
+
+def load_cameras() -> List[Dict]:
+    """
+    Load cameras from CAMERAS_FILE.
+
+    The file holds a JSON list (or {"cameras": [...]}) of objects with
+    `id`, `url` and optional `name`. Without a file the single TARGET_URL
+    camera is used.
+    """
+    cameras_file = get_cameras_file()
+    if not os.path.exists(cameras_file):
+        return [get_default_camera()]
+
+    with open(cameras_file, 'r') as f:
+        config = json.load(f)
+
+    entries = config.get('cameras', []) if isinstance(config, dict) else config
+    cameras = []
+    seen = set()
+    for entry in entries:
+        camera_id = str(entry.get('id', '')).strip().lower()
+        url = entry.get('url')
+        if not CAMERA_ID_PATTERN.match(camera_id):
+            raise ValueError(f"Invalid camera id: {entry.get('id')!r}")
+        if camera_id in seen:
+            raise ValueError(f"Duplicate camera id: {camera_id}")
+        if not url:
+            raise ValueError(f"Camera {camera_id} has no url")
+        seen.add(camera_id)
+        cameras.append({
+            'id': camera_id,
+            'name': entry.get('name', camera_id),
+            'url': url
+        })
+
+    if not cameras:
+        raise ValueError(f"No cameras configured in {cameras_file}")
+    return cameras
+
+
+if __name__ == '__main__':
+    # Show the configured cameras
+    for camera in load_cameras():
+        print(f"{camera['id']}: {camera['name']} - {camera['url']}")
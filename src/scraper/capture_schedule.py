@@ -0,0 +1,166 @@
+"""
+Capture Scheduler
+Fires capture ticks on a wall-clock grid (e.g. every 10 minutes on the :00
+boundary) so slow captures never push later ones back
+"""
+import os
+import math
+import time
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+
+# 'skip' drops ticks that were missed while a capture overran,
+# 'catchup' runs them back-to-back (up to MAX_CATCHUP_TICKS behind)
+OVERRUN_POLICY = os.environ.get('OVERRUN_POLICY', 'skip').lower()
+MAX_CATCHUP_TICKS = int(os.environ.get('MAX_CATCHUP_TICKS', '3'))
+LATENESS_WINDOW = 144  # one day of 10-minute ticks
+
+
+def grid_tick(timestamp: float, interval: int, strictly_after: bool = False) -> float:
+    """
+    Get the grid tick at or after `timestamp`.
+    The grid starts at local midnight, so a 600s interval lands on :00, :10, :20...
+    """
+    midnight = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    offset = (timestamp - midnight) / interval
+    index = math.floor(offset) + 1 if strictly_after else math.ceil(offset)
+    return midnight + index * interval
+
+
+class AlignedScheduler:
+    """
+    Wall-clock aligned tick scheduler.
+
+    Jitter is applied around each grid tick rather than added to the
+    previous cycle's end, so capture duration does not cause drift.
+    Lateness (actual start minus jittered target) is tracked per tick.
+
+    With `interval_fn` the interval varies over the day: a tick is the
+    first point of the `step` grid that also lies on the grid of the
+    interval in effect at that point.
+    """
+
+    def __init__(
+        self,
+        interval: int,
+        jitter: int = 0,
+        overrun_policy: str = OVERRUN_POLICY,
+        max_catchup: int = MAX_CATCHUP_TICKS,
+        interval_fn: Callable[[float], int] = None,
+        step: int = None
+    ):
+        if overrun_policy not in ('skip', 'catchup'):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        self.interval = interval
+        self.interval_fn = interval_fn
+        self.step = step or interval
+        self.jitter = jitter
+        self.overrun_policy = overrun_policy
+        self.max_catchup = max_catchup
+        self.last_tick = None
+        self.ticks = 0
+        self.skipped = 0
+        self.caught_up = 0
+        self.lateness = deque(maxlen=LATENESS_WINDOW)
+        self.last_lateness = None
+        self.max_lateness = 0.0
+
+    def interval_at(self, timestamp: float) -> int:
+        """Get the interval in effect at a timestamp."""
+        return self.interval_fn(timestamp) if self.interval_fn else self.interval
+
+    def following_tick(self, timestamp: float, strictly_after: bool = False) -> float:
+        """Get the first tick at (or strictly after) a timestamp."""
+        if not self.interval_fn:
+            return grid_tick(timestamp, self.interval, strictly_after)
+
+        candidate = grid_tick(timestamp, self.step, strictly_after)
+        for _ in range(86400 // self.step):
+            if grid_tick(candidate, self.interval_at(candidate)) == candidate:
+                return candidate
+            candidate = grid_tick(candidate, self.step, strictly_after=True)
+        return candidate
+
+    def next_tick(self, now: float) -> float:
+        """Pick the next grid tick, applying the overrun policy to missed ticks."""
+        if self.last_tick is None:
+            return self.following_tick(now)
+
+        tick = self.following_tick(self.last_tick, strictly_after=True)
+        if tick >= now:
+            return tick
+
+        # The previous cycle overran one or more ticks
+        missed = 0
+        next_tick = tick
+        while next_tick < now:
+            missed += 1
+            next_tick = self.following_tick(next_tick, strictly_after=True)
+
+        if self.overrun_policy == 'catchup' and missed <= self.max_catchup:
+            self.caught_up += 1
+            print(f"[schedule] Overran {missed} tick(s), catching up")
+            return tick
+
+        self.skipped += missed
+        print(f"[schedule] Overran, skipping {missed} tick(s)")
+        return next_tick
+
+    def wait_next(self, stop_event: threading.Event) -> Optional[Dict]:
+        """
+        Block until the next (jittered) tick.
+        Returns tick info, or None if `stop_event` was set while waiting.
+        """
+        now = time.time()
+        tick = self.next_tick(now)
+        # Keep jitter small relative to short intervals so ticks never swap order
+        max_jitter = min(self.jitter, self.interval_at(tick) / 4)
+        jitter = random.uniform(-max_jitter, max_jitter) if max_jitter else 0.0
+        target = max(tick + jitter, now)
+
+        delay = target - time.time()
+        if delay > 0:
+            print(f"Next capture at {datetime.fromtimestamp(target).strftime('%H:%M:%S')} "
+                  f"(tick {datetime.fromtimestamp(tick).strftime('%H:%M:%S')}, in {delay:.0f}s)")
+            # Event.wait sleeps on the monotonic clock and wakes immediately on shutdown
+            if stop_event.wait(delay):
+                return None
+
+        started = time.time()
+        lateness = max(0.0, started - (tick + jitter))
+        self.record_lateness(lateness)
+        self.last_tick = tick
+
+        return {
+            'tick': tick,
+            'interval': self.interval_at(tick),
+            'target': target,
+            'started': started,
+            'jitter': jitter,
+            'lateness': lateness
+        }
+
+    def record_lateness(self, lateness: float) -> None:
+        """Record how late a tick started."""
+        self.ticks += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.lateness.append(lateness)
+
+    def get_stats(self) -> Dict:
+        """Get lateness statistics over recent ticks (seconds)."""
+        recent = sorted(self.lateness)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else None
+        return {
+            'ticks': self.ticks,
+            'skipped': self.skipped,
+            'caught_up': self.caught_up,
+            'last_lateness': self.last_lateness,
+            'mean_lateness': sum(recent) / len(recent) if recent else None,
+            'p95_lateness': p95,
+            'max_lateness': self.max_lateness
+        }
@@ -7,7 +7,7 @@ import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator, List, Tuple
 import io
 
 
@@ -23,12 +23,87 @@ def get_db_config() -> Dict:
     }
 
 
-def get_connection():
-    """Create a database connection."""
+def get_connection(**options):
+    """Create a database connection (options override the environment config)."""
     config = get_db_config()
+    config.update(options)
     return mysql.connector.connect(**config)
 
 
+def column_exists(cursor, table: str, column: str) -> bool:
+    """Check whether a column exists in the current database."""
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    ''', (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def get_index_columns(cursor, table: str, index: str) -> list:
+    """Get the ordered column names of an index (empty if it does not exist)."""
+    cursor.execute('''
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ORDER BY SEQ_IN_INDEX
+    ''', (table, index))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def migrate_schema(cursor) -> None:
+    """Bring tables created by older versions up to the current schema."""
+    if not column_exists(cursor, 'captures', 'camera_id'):
+        print("Migrating captures: adding camera_id column")
+        cursor.execute('''
+            ALTER TABLE captures
+            ADD COLUMN camera_id VARCHAR(64) NOT NULL DEFAULT 'default' AFTER id
+        ''')
+
+    if not column_exists(cursor, 'captures', 'fingerprint'):
+        print("Migrating captures: adding fingerprint and duplicate_of columns")
+        cursor.execute('''
+            ALTER TABLE captures
+            ADD COLUMN fingerprint BIGINT UNSIGNED AFTER bratislava_day_length,
+            ADD COLUMN duplicate_of INT AFTER fingerprint
+        ''')
+
+    if not column_exists(cursor, 'captures', 'light_class'):
+        print("Migrating captures: adding luminance, contrast and light_class columns")
+        cursor.execute('''
+            ALTER TABLE captures
+            ADD COLUMN luminance FLOAT AFTER duplicate_of,
+            ADD COLUMN contrast FLOAT AFTER luminance,
+            ADD COLUMN light_class ENUM('dark', 'twilight', 'day') AFTER contrast,
+            ADD INDEX idx_light (camera_id, capture_date, light_class, capture_time)
+        ''')
+
+    if get_index_columns(cursor, 'captures', 'unique_capture') != ['camera_id', 'capture_date', 'capture_time']:
+        print("Migrating captures: making unique_capture per camera")
+        cursor.execute('''
+            ALTER TABLE captures
+            DROP INDEX unique_capture,
+            ADD UNIQUE KEY unique_capture (camera_id, capture_date, capture_time)
+        ''')
+
+    # Daylight selection filters by camera first
+    if get_index_columns(cursor, 'captures', 'idx_light') != ['camera_id', 'capture_date', 'light_class', 'capture_time']:
+        print("Migrating captures: adding camera_id to idx_light")
+        cursor.execute('''
+            ALTER TABLE captures
+            DROP INDEX idx_light,
+            ADD INDEX idx_light (camera_id, capture_date, light_class, capture_time)
+        ''')
+
+    # unique_capture covers the same columns, so this index only cost writes
+    if get_index_columns(cursor, 'captures', 'idx_camera_datetime'):
+        print("Migrating captures: dropping redundant idx_camera_datetime index")
+        cursor.execute('ALTER TABLE captures DROP INDEX idx_camera_datetime')
+
+    # Selection goes through light_class; no query filters on luminance
+    if get_index_columns(cursor, 'captures', 'idx_luminance'):
+        print("Migrating captures: dropping unused idx_luminance index")
+        cursor.execute('ALTER TABLE captures DROP INDEX idx_luminance')
+
+
 def init_database():
     """Initialize the database schema (create tables if not exist)."""
     conn = None
@@ -40,6 +115,7 @@ def init_database():
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS captures (
                 id INT AUTO_INCREMENT PRIMARY KEY,
+                camera_id VARCHAR(64) NOT NULL DEFAULT 'default',
                 capture_date DATE NOT NULL,
                 capture_time TIME NOT NULL,
                 captured_at DATETIME NOT NULL,
@@ -55,10 +131,32 @@ def init_database():
                 bratislava_sunrise VARCHAR(10),
                 bratislava_sunset VARCHAR(10),
                 bratislava_day_length VARCHAR(20),
+                fingerprint BIGINT UNSIGNED,
+                duplicate_of INT,
+                luminance FLOAT,
+                contrast FLOAT,
+                light_class ENUM('dark', 'twilight', 'day'),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 INDEX idx_capture_date (capture_date),
                 INDEX idx_capture_datetime (capture_date, capture_time),
-                UNIQUE KEY unique_capture (capture_date, capture_time)
+                INDEX idx_light (camera_id, capture_date, light_class, capture_time),
+                UNIQUE KEY unique_capture (camera_id, capture_date, capture_time)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''')
+
+        migrate_schema(cursor)
+
+        # Downscaled copies of each capture for galleries and previews
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS capture_renditions (
+                capture_id INT NOT NULL,
+                size VARCHAR(16) NOT NULL,
+                width INT,
+                height INT,
+                image_format VARCHAR(10) DEFAULT 'jpeg',
+                image_data MEDIUMBLOB NOT NULL,
+                PRIMARY KEY (capture_id, size),
+                FOREIGN KEY (capture_id) REFERENCES captures(id) ON DELETE CASCADE
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         ''')
 
@@ -80,17 +178,31 @@ def save_capture(
     alicante_weather: Optional[Dict] = None,
     bratislava_weather: Optional[Dict] = None,
     width: int = None,
-    height: int = None
+    height: int = None,
+    camera_id: str = 'default',
+    fingerprint: int = None,
+    duplicate_of: int = None,
+    image_format: str = 'jpeg',
+    renditions: Optional[List[Dict]] = None,
+    frame_stats: Optional[Dict] = None
 ) -> Optional[int]:
     """
     Save a capture to the database.
 
     Args:
-        image_data: JPEG image data as bytes
+        image_data: Encoded image data as bytes
         alicante_weather: Weather data for Alicante
         bratislava_weather: Weather data for Bratislava
         width: Image width in pixels
         height: Image height in pixels
+        camera_id: ID of the camera the frame came from
+        fingerprint: 64-bit perceptual hash of the frame
+        duplicate_of: ID of the capture holding the image when this frame
+            is a near-duplicate (image_data is then stored empty)
+        image_format: Encoding of image_data ('jpeg', 'webp' or 'avif')
+        renditions: Downscaled copies (dicts with size, width, height,
+            image_format, image_data) stored in the same transaction
+        frame_stats: Brightness statistics (luminance, contrast, light_class)
 
     Returns:
         The capture ID if successful, None otherwise
@@ -115,28 +227,45 @@ def save_capture(
         bra_sunset = bratislava_weather.get('sunset') if bratislava_weather else None
         bra_day_length = bratislava_weather.get('day_length') if bratislava_weather else None
 
+        frame_stats = frame_stats or {}
+
         cursor.execute('''
             INSERT INTO captures (
-                capture_date, capture_time, captured_at, image_data, image_format,
+                camera_id, capture_date, capture_time, captured_at, image_data, image_format,
                 width, height,
                 alicante_temp, alicante_sunrise, alicante_sunset, alicante_day_length,
-                bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length
+                bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length,
+                fingerprint, duplicate_of,
+                luminance, contrast, light_class
             ) VALUES (
-                %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s, %s,
                 %s, %s,
                 %s, %s, %s, %s,
-                %s, %s, %s, %s
+                %s, %s, %s, %s,
+                %s, %s,
+                %s, %s, %s
             )
         ''', (
-            capture_date, capture_time, now, image_data, 'jpeg',
+            camera_id, capture_date, capture_time, now, image_data, image_format,
             width, height,
             ali_temp, ali_sunrise, ali_sunset, ali_day_length,
-            bra_temp, bra_sunrise, bra_sunset, bra_day_length
+            bra_temp, bra_sunrise, bra_sunset, bra_day_length,
+            fingerprint, duplicate_of,
+            frame_stats.get('luminance'), frame_stats.get('contrast'), frame_stats.get('light_class')
         ))
+        capture_id = cursor.lastrowid
+
+        if renditions:
+            cursor.executemany('''
+                INSERT INTO capture_renditions (capture_id, size, width, height, image_format, image_data)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', [
+                (capture_id, r['size'], r['width'], r['height'], r['image_format'], r['image_data'])
+                for r in renditions
+            ])
 
         conn.commit()
-        capture_id = cursor.lastrowid
-        print(f"Saved capture {capture_id} for {capture_date} {capture_time}")
+        print(f"Saved capture {capture_id} for {camera_id} {capture_date} {capture_time}")
         return capture_id
 
     except Error as e:
@@ -148,6 +277,67 @@ def save_capture(
             conn.close()
 
 
+def get_latest_fingerprint(camera_id: str = 'default') -> Optional[Dict]:
+    """
+    Get the fingerprint of the image behind a camera's latest capture.
+    Returns dict with id, image_id (the capture holding the image) and that
+    image's fingerprint and luminance, so a slow fade or pan is compared with
+    the stored frame rather than chained onto it one small step at a time.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute('''
+            SELECT c.id, o.id AS image_id, o.fingerprint, o.luminance
+            FROM captures c
+            JOIN captures o ON o.id = COALESCE(c.duplicate_of, c.id)
+            WHERE c.camera_id = %s
+            ORDER BY c.capture_date DESC, c.capture_time DESC
+            LIMIT 1
+        ''', (camera_id,))
+
+        return cursor.fetchone()
+
+    except Error as e:
+        print(f"Error getting latest fingerprint: {e}")
+        return None
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def get_capture_times(camera_id: str, capture_date: str) -> Optional[Dict[int, Tuple[str, Optional[str]]]]:
+    """Get a camera's captures on a day as {id: ('HH:MM:SS', light_class)}. None on error."""
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, capture_time, light_class
+            FROM captures
+            WHERE camera_id = %s AND capture_date = %s
+        ''', (camera_id, capture_date))
+
+        # TIME columns come back as timedeltas
+        times = {}
+        for capture_id, capture_time, light_class in cursor.fetchall():
+            seconds = int(capture_time.total_seconds())
+            times[capture_id] = (f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}", light_class)
+        return times
+
+    except Error as e:
+        print(f"Error getting capture times: {e}")
+        return None
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
 def get_capture_by_id(capture_id: int) -> Optional[Dict]:
     """Get a capture by its ID."""
     conn = None
@@ -155,13 +345,18 @@ def get_capture_by_id(capture_id: int) -> Optional[Dict]:
         conn = get_connection()
         cursor = conn.cursor(dictionary=True)
 
+        # Near-duplicates store no blob; read the image from the referenced capture
         cursor.execute('''
-            SELECT id, capture_date, capture_time, captured_at, image_data,
-                   width, height,
-                   alicante_temp, alicante_sunrise, alicante_sunset, alicante_day_length,
-                   bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length
-            FROM captures
-            WHERE id = %s
+            SELECT c.id, c.camera_id, c.capture_date, c.capture_time, c.captured_at,
+                   COALESCE(o.image_data, c.image_data) AS image_data,
+                   COALESCE(o.image_format, c.image_format) AS image_format,
+                   c.width, c.height,
+                   c.alicante_temp, c.alicante_sunrise, c.alicante_sunset, c.alicante_day_length,
+                   c.bratislava_temp, c.bratislava_sunrise, c.bratislava_sunset, c.bratislava_day_length,
+                   c.fingerprint, c.duplicate_of
+            FROM captures c
+            LEFT JOIN captures o ON o.id = c.duplicate_of
+            WHERE c.id = %s
         ''', (capture_id,))
 
         return cursor.fetchone()
@@ -175,6 +370,105 @@ def get_capture_by_id(capture_id: int) -> Optional[Dict]:
             conn.close()
 
 
+def get_rendition(capture_id: int, size: str) -> Optional[Dict]:
+    """
+    Get a downscaled rendition of a capture.
+    Near-duplicates resolve to the renditions of the capture they reference.
+    Returns dict with width, height, image_format and image_data, or None.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute('''
+            SELECT r.width, r.height, r.image_format, r.image_data
+            FROM captures c
+            JOIN capture_renditions r ON r.capture_id = COALESCE(c.duplicate_of, c.id)
+            WHERE c.id = %s AND r.size = %s
+        ''', (capture_id, size))
+
+        return cursor.fetchone()
+
+    except Error as e:
+        print(f"Error getting rendition: {e}")
+        return None
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def iter_captures(
+    date_from: str,
+    date_to: Optional[str] = None,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    light_classes: Optional[List[str]] = None
+) -> Iterator[Dict]:
+    """
+    Stream captures (with image and weather data) in capture order.
+
+    Uses an unbuffered cursor so rows, blobs included, are fetched from the
+    server as they are consumed instead of loading a whole day into memory.
+    Times filter each day (e.g. sunrise to sunset for daylight videos).
+    With `light_classes`, classified captures are selected by class and
+    the times only apply to captures stored before classification.
+    Raises mysql.connector.Error when the stream fails part-way.
+    """
+    conditions = ['c.capture_date BETWEEN %s AND %s']
+    params = [date_from, date_to or date_from]
+    time_conditions = []
+    if time_from:
+        time_conditions.append('c.capture_time >= %s')
+        params.append(time_from)
+    if time_to:
+        time_conditions.append('c.capture_time <= %s')
+        params.append(time_to)
+    if light_classes:
+        placeholders = ', '.join(['%s'] * len(light_classes))
+        unclassified = ' AND '.join(['c.light_class IS NULL'] + time_conditions)
+        conditions.append(f'(c.light_class IN ({placeholders}) OR ({unclassified}))')
+        # The IN values come before the time values in the SQL
+        params[2:2] = light_classes
+    else:
+        conditions.extend(time_conditions)
+    if camera_id:
+        conditions.append('c.camera_id = %s')
+        params.append(camera_id)
+
+    conn = None
+    try:
+        # consume_results lets the connection close when the caller stops early
+        conn = get_connection(consume_results=True)
+        cursor = conn.cursor(dictionary=True, buffered=False)
+
+        cursor.execute(f'''
+            SELECT c.id, c.camera_id, c.capture_date, c.capture_time,
+                   COALESCE(o.image_data, c.image_data) AS image_data,
+                   COALESCE(o.image_format, c.image_format) AS image_format,
+                   c.alicante_temp, c.alicante_sunrise, c.alicante_sunset, c.alicante_day_length,
+                   c.bratislava_temp, c.bratislava_sunrise, c.bratislava_sunset, c.bratislava_day_length
+            FROM captures c
+            LEFT JOIN captures o ON o.id = c.duplicate_of
+            WHERE {' AND '.join(conditions)}
+            ORDER BY c.capture_date, c.capture_time
+        ''', params)
+
+        for row in cursor:
+            yield row
+
+    except Error as e:
+        # Re-raised so a dropped connection fails the render instead of ending the video early
+        print(f"Error streaming captures: {e}")
+        raise
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
 if __name__ == '__main__':
     # Test database initialization
     init_database()
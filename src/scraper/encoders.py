@@ -0,0 +1,171 @@
+"""
+Image Encoders
+Storage encodings for captured frames (optimized/progressive JPEG, WebP,
+AVIF) with an optional per-frame byte budget
+"""
+from __future__ import annotations
+
+import io
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# Storage format: 'jpeg', 'webp' or 'avif' (AVIF needs Pillow >= 11.2 or pillow-avif-plugin)
+IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'jpeg').lower()
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', '90'))
+JPEG_PROGRESSIVE = os.environ.get('JPEG_PROGRESSIVE', 'true').lower() in ('1', 'true', 'yes')
+# Binary-search quality to stay under this many bytes per frame (0 = fixed IMAGE_QUALITY)
+IMAGE_TARGET_BYTES = int(os.environ.get('IMAGE_TARGET_BYTES', '0'))
+IMAGE_MIN_QUALITY = int(os.environ.get('IMAGE_MIN_QUALITY', '40'))
+
+FORMATS = ('jpeg', 'webp', 'avif')
+_warned_formats = set()
+
+
+@lru_cache(maxsize=1)
+def register_plugins() -> bool:
+    """
+    Register the AVIF plugin where Pillow has no native AVIF support, so
+    stored AVIF frames can be decoded too. Call before opening stored frames
+    in a fresh process. Returns whether AVIF is available.
+    """
+    from PIL import features
+
+    if 'avif' in features.get_supported_modules():
+        return features.check('avif')
+    try:
+        import pillow_avif  # noqa: F401  registers the AVIF plugin
+        return True
+    except ImportError:
+        return False
+
+
+def is_format_supported(fmt: str) -> bool:
+    """Check whether Pillow can encode a storage format here."""
+    from PIL import features
+
+    if fmt == 'jpeg':
+        return True
+    if fmt == 'webp':
+        return features.check('webp')
+    if fmt == 'avif':
+        return register_plugins()
+    return False
+
+
+def get_storage_format(fmt: str = IMAGE_FORMAT) -> str:
+    """Get the format to store frames in, falling back to JPEG when unsupported."""
+    if fmt in FORMATS and is_format_supported(fmt):
+        return fmt
+    if fmt not in _warned_formats:
+        _warned_formats.add(fmt)
+        print(f"Image format '{fmt}' is not supported here, storing JPEG")
+    return 'jpeg'
+
+
+def encode(image: Image.Image, fmt: str = 'jpeg', quality: int = IMAGE_QUALITY) -> bytes:
+    """Encode an RGB image in a storage format."""
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=JPEG_PROGRESSIVE)
+    elif fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    elif fmt == 'avif':
+        image.save(buffer, 'AVIF', quality=quality, speed=6)
+    else:
+        raise ValueError(f"Unknown image format: {fmt}")
+    return buffer.getvalue()
+
+
+def encode_to_budget(
+    image: Image.Image,
+    fmt: str,
+    target_bytes: int,
+    min_quality: int = IMAGE_MIN_QUALITY,
+    max_quality: int = IMAGE_QUALITY
+) -> Tuple[bytes, int]:
+    """
+    Binary-search the highest quality whose encoding fits in `target_bytes`.
+    Returns (data, quality); if even `min_quality` is too large, that encoding is returned.
+    """
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(image, fmt, quality)
+        if len(data) <= target_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        best = (encode(image, fmt, min_quality), min_quality)
+    return best
+
+
+def encode_capture(image: Image.Image) -> Tuple[bytes, str]:
+    """Encode a processed frame for storage per IMAGE_FORMAT/IMAGE_TARGET_BYTES. Returns (data, format)."""
+    fmt = get_storage_format()
+    if IMAGE_TARGET_BYTES > 0:
+        data, quality = encode_to_budget(image, fmt, IMAGE_TARGET_BYTES)
+        print(f"Encoded {fmt} at quality {quality} ({len(data)} bytes, budget {IMAGE_TARGET_BYTES})")
+        return data, fmt
+    return encode(image, fmt), fmt
+
+
+BENCHMARK_ENCODERS = [
+    ('baseline jpeg q90', lambda im: _save(im, 'JPEG', quality=90)),
+    ('jpeg q90 optimized', lambda im: _save(im, 'JPEG', quality=90, optimize=True)),
+    ('jpeg q90 progressive', lambda im: _save(im, 'JPEG', quality=90, optimize=True, progressive=True)),
+    ('jpeg q80 progressive', lambda im: _save(im, 'JPEG', quality=80, optimize=True, progressive=True)),
+    ('webp q80', lambda im: encode(im, 'webp', 80)),
+    ('webp q90', lambda im: encode(im, 'webp', 90)),
+    ('avif q60', lambda im: encode(im, 'avif', 60)),
+]
+
+
+def _save(image: Image.Image, fmt: str, **params) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def benchmark(images: List[Image.Image], runs: int = 3) -> List[Dict]:
+    """Time each encoder over the frames and report mean encode time and size."""
+    results = []
+    for name, encoder in BENCHMARK_ENCODERS:
+        if 'avif' in name and not is_format_supported('avif'):
+            continue
+        if 'webp' in name and not is_format_supported('webp'):
+            continue
+        sizes = []
+        start = time.perf_counter()
+        for _ in range(runs):
+            sizes = [len(encoder(image)) for image in images]
+        elapsed = (time.perf_counter() - start) / (runs * len(images))
+        results.append({'encoder': name, 'ms': elapsed * 1000, 'bytes': sum(sizes) / len(sizes)})
+    return results
+
+
+if __name__ == '__main__':
+    # Usage: python encoders.py [frame.jpg ...]  (synthetic frames when no paths are given)
+    import PIL.Image
+    from image_transform import get_transform
+
+    if len(sys.argv) > 1:
+        frames = [get_transform().apply(path, apply_crop=False) for path in sys.argv[1:]]
+    else:
+        frames = [PIL.Image.effect_mandelbrot((800, 450), (-2 + i * 0.1, -1.2, 1, 1.2), 100).convert('RGB') for i in range(3)]
+
+    baseline = None
+    for result in benchmark(frames):
+        baseline = baseline or result['bytes']
+        print(f"{result['encoder']:24} {result['ms']:7.1f}ms  {result['bytes'] / 1024:7.1f}KB  "
+              f"({result['bytes'] / baseline * 100:.0f}% of baseline)")
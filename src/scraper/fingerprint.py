@@ -0,0 +1,103 @@
+"""
+Frame Fingerprint Module
+Perceptual difference hash used to spot frozen streams and near-duplicate frames,
+plus cheap brightness statistics for daylight classification
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# Maximum Hamming distance (of 64 bits) for two frames to count as near-duplicates; -1 disables
+DUPLICATE_THRESHOLD = int(os.environ.get('DUPLICATE_THRESHOLD', '2'))
+# Max mean-luminance difference (0-255) for near-duplicates; the dHash ignores overall
+# brightness, so without this a dusk frame would match the brighter frame before it
+DUPLICATE_LUMINANCE_DELTA = float(os.environ.get('DUPLICATE_LUMINANCE_DELTA', '2'))
+# Extra capture attempts with a fresh page when a near-duplicate is detected
+DUPLICATE_RETRIES = int(os.environ.get('DUPLICATE_RETRIES', '1'))
+# 'reference' stores a near-duplicate as a pointer to the earlier frame, 'store' keeps the blob
+DUPLICATE_ACTION = os.environ.get('DUPLICATE_ACTION', 'reference').lower()
+# Mean luminance (0-255) below which a frame is 'dark', and from which it is 'day'; between is 'twilight'
+DARK_LUMINANCE = float(os.environ.get('DARK_LUMINANCE', '35'))
+DAY_LUMINANCE = float(os.environ.get('DAY_LUMINANCE', '80'))
+# Statistics are taken from a copy this small; plenty for a mean and spread
+STATS_SIZE = (64, 36)
+
+LIGHT_CLASSES = ('dark', 'twilight', 'day')
+
+
+def compute_fingerprint(image: Image.Image) -> int:
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+    The image is reduced to a 9x8 luminance grid and each bit records
+    whether a pixel is brighter than its right-hand neighbour.
+    """
+    from PIL import Image
+
+    small = image.convert('L').resize((9, 8), Image.BILINEAR)
+    pixels = list(small.getdata())
+
+    fingerprint = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            fingerprint = (fingerprint << 1) | (1 if left > right else 0)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Count differing bits between two fingerprints."""
+    return bin(a ^ b).count('1')
+
+
+def is_near_duplicate(
+    fingerprint: int,
+    previous: int,
+    luminance: Optional[float],
+    previous_luminance: Optional[float],
+    threshold: int = DUPLICATE_THRESHOLD,
+    luminance_delta: float = DUPLICATE_LUMINANCE_DELTA
+) -> bool:
+    """
+    Check whether two frames are within the duplicate thresholds: fingerprint
+    distance and mean luminance difference. Frames without a luminance (stored
+    before it was recorded) never count as duplicates.
+    """
+    if threshold < 0 or previous is None:
+        return False
+    if luminance is None or previous_luminance is None:
+        return False
+    if abs(luminance - previous_luminance) > luminance_delta:
+        return False
+    return hamming_distance(fingerprint, previous) <= threshold
+
+
+def classify_light(luminance: float) -> str:
+    """Classify a frame's mean luminance as 'dark', 'twilight' or 'day'."""
+    if luminance < DARK_LUMINANCE:
+        return 'dark'
+    if luminance < DAY_LUMINANCE:
+        return 'twilight'
+    return 'day'
+
+
+def compute_frame_stats(image: Image.Image) -> Dict:
+    """
+    Compute mean luminance, contrast (luminance standard deviation) and the
+    light class of an image from a downsampled grayscale copy.
+    """
+    from PIL import Image, ImageStat
+
+    small = image.resize(STATS_SIZE, Image.BILINEAR, reducing_gap=2.0).convert('L')
+    stat = ImageStat.Stat(small)
+    luminance = round(stat.mean[0], 2)
+    return {
+        'luminance': luminance,
+        'contrast': round(stat.stddev[0], 2),
+        'light_class': classify_light(luminance)
+    }
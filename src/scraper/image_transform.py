@@ -0,0 +1,155 @@
+"""
+Image Transform Pipeline
+Shared crop and resize from raw captures to the stored frame size, with the
+crop box and target size read from the environment once
+"""
+from __future__ import annotations
+
+import io
+import os
+import math
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# Only pre-shrink with reduce() when the remaining LANCZOS pass still downsamples by this much
+REDUCE_GAP = 2.0
+
+
+class ImageTransform:
+    """
+    Crop (percentages of the source) and resize to a fixed output size.
+
+    JPEG sources are decoded with `draft()` at the smallest DCT scale that
+    still covers the output, and large downscales are pre-shrunk with
+    `reduce()` (which also applies the crop) before the final LANCZOS pass.
+    """
+
+    def __init__(self, crop: Tuple[float, float, float, float] = (0, 0, 100, 100), size: Tuple[int, int] = (800, 450)):
+        self.crop = tuple(value / 100 for value in crop)
+        self.size = size
+
+    @classmethod
+    def from_env(cls) -> 'ImageTransform':
+        """Build the transform from CROP_X1..CROP_Y2 and OUTPUT_WIDTH/OUTPUT_HEIGHT."""
+        crop = tuple(float(os.environ.get(name, default)) for name, default in (
+            ('CROP_X1', '0'), ('CROP_Y1', '0'), ('CROP_X2', '100'), ('CROP_Y2', '100')
+        ))
+        size = (int(os.environ.get('OUTPUT_WIDTH', '800')), int(os.environ.get('OUTPUT_HEIGHT', '450')))
+        return cls(crop, size)
+
+    @property
+    def crop_fraction(self) -> Tuple[float, float]:
+        """Fraction of the source width and height kept by the crop."""
+        x1, y1, x2, y2 = self.crop
+        return (max(0.0, min(x2, 1.0) - max(x1, 0.0)) or 1.0, max(0.0, min(y2, 1.0) - max(y1, 0.0)) or 1.0)
+
+    def crop_box(self, img_width: int, img_height: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the (left, top, right, bottom) crop box for a source size,
+        clamped to the image. Returns None for an empty box.
+        """
+        return _crop_box(self.crop, img_width, img_height)
+
+    def draft_size(self) -> Tuple[int, int]:
+        """Smallest full-frame decode size whose cropped region still covers the output."""
+        fraction_x, fraction_y = self.crop_fraction
+        return (math.ceil(self.size[0] / fraction_x), math.ceil(self.size[1] / fraction_y))
+
+    def open(self, source: Union[bytes, str, Image.Image]) -> Image.Image:
+        """Open a source lazily; JPEGs are set to decode at a reduced scale."""
+        from PIL import Image
+
+        if isinstance(source, Image.Image):
+            image = source
+        elif isinstance(source, (bytes, bytearray)):
+            image = Image.open(io.BytesIO(source))
+        else:
+            image = Image.open(source)
+
+        # draft() only works before the pixel data is loaded
+        if image.format == 'JPEG' and getattr(image, 'im', None) is None:
+            image.draft('RGB', self.draft_size())
+        return image
+
+    def apply(self, source: Union[bytes, str, Image.Image], apply_crop: bool = True) -> Image.Image:
+        """Crop and resize a source to the output size as an RGB image."""
+        from PIL import Image
+
+        image = self.open(source)
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGB')
+
+        box = self.crop_box(*image.size) if apply_crop else None
+        if box is None:
+            box = (0, 0) + image.size
+
+        box_width, box_height = box[2] - box[0], box[3] - box[1]
+        factor = int(min(box_width / self.size[0], box_height / self.size[1]) / REDUCE_GAP)
+        if factor >= 2:
+            image = image.reduce(factor, box=box)
+            box = (0, 0) + image.size
+
+        if image.size != self.size or box != (0, 0) + image.size:
+            image = image.resize(self.size, Image.LANCZOS, box=box)
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
+
+
+@lru_cache(maxsize=32)
+def _crop_box(crop: Tuple[float, float, float, float], img_width: int, img_height: int) -> Optional[Tuple[int, int, int, int]]:
+    x1, y1, x2, y2 = crop
+    left = max(0, int(img_width * x1))
+    top = max(0, int(img_height * y1))
+    right = min(int(img_width * x2), img_width)
+    bottom = min(int(img_height * y2), img_height)
+
+    if right > left and bottom > top:
+        return (left, top, right, bottom)
+    return None
+
+
+_transform = None
+
+
+def get_transform() -> ImageTransform:
+    """Get the transform configured from the environment (read once)."""
+    global _transform
+    if _transform is None:
+        _transform = ImageTransform.from_env()
+    return _transform
+
+
+def transform(source: Union[bytes, str, Image.Image], apply_crop: bool = True) -> Image.Image:
+    """Crop and resize raw bytes, a path or an image with the configured transform."""
+    return get_transform().apply(source, apply_crop)
+
+
+if __name__ == '__main__':
+    # Compare the pipeline against a plain decode + crop + LANCZOS resize
+    import time
+    import PIL.Image
+
+    pipeline = ImageTransform((10, 10, 90, 90), (800, 450))
+    for width, height in ((1280, 720), (1920, 1080), (3840, 2160)):
+        buffer = io.BytesIO()
+        PIL.Image.effect_mandelbrot((width, height), (-2, -1.2, 1, 1.2), 100).convert('RGB').save(buffer, 'JPEG', quality=90)
+        data = buffer.getvalue()
+
+        start = time.perf_counter()
+        for _ in range(5):
+            image = PIL.Image.open(io.BytesIO(data)).convert('RGB')
+            image = image.crop(pipeline.crop_box(*image.size)).resize(pipeline.size, PIL.Image.LANCZOS)
+        baseline = (time.perf_counter() - start) / 5
+
+        start = time.perf_counter()
+        for _ in range(5):
+            pipeline.apply(data)
+        fast = (time.perf_counter() - start) / 5
+
+        print(f"{width}x{height}: baseline {baseline * 1000:.1f}ms, pipeline {fast * 1000:.1f}ms ({baseline / fast:.1f}x)")
@@ -0,0 +1,231 @@
+"""
+Metrics and Tracing Module
+Per-stage timing spans emitted as JSON lines, aggregated into Prometheus-style
+counters, gauges and histograms served over HTTP
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9100'))  # 0 disables the endpoint
+TRACE_FILE = os.environ.get('TRACE_FILE', '')  # JSON lines go to stdout when unset
+TRACE_ENABLED = os.environ.get('TRACE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class Metric:
+    """Base class for a labelled metric family."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {value}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with self.lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self.lock:
+            entry = self.values.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            for key, entry in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, entry['counts']):
+                    lines.append(f'{self.name}_bucket{_format_labels(key, (("le", str(bound)),))} {count}')
+                lines.append(f'{self.name}_bucket{_format_labels(key, (("le", "+Inf"),))} {entry["count"]}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {entry["sum"]}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {entry["count"]}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'scraper_stage_duration_seconds', 'Duration of capture pipeline stages'))
+READY_SIGNAL_DURATION = REGISTRY.register(Histogram(
+    'scraper_ready_signal_seconds', 'Time until a page readiness signal fired'))
+CAPTURES_TOTAL = REGISTRY.register(Counter(
+    'scraper_captures_total', 'Capture attempts by camera and result'))
+BYTES_STORED_TOTAL = REGISTRY.register(Counter(
+    'scraper_bytes_stored_total', 'Image bytes written to the database'))
+CHROMIUM_RSS_BYTES = REGISTRY.register(Gauge(
+    'scraper_chromium_rss_bytes', 'RSS of the Chromium process tree per browser'))
+WEATHER_CACHE_TOTAL = REGISTRY.register(Counter(
+    'scraper_weather_cache_total', 'Weather lookups by cache result'))
+SCHEDULE_LATENESS = REGISTRY.register(Histogram(
+    'scraper_schedule_lateness_seconds', 'How late capture ticks started'))
+SCHEDULE_SKIPPED = REGISTRY.register(Gauge(
+    'scraper_schedule_skipped_ticks', 'Ticks skipped because a cycle overran'))
+
+
+# Per-thread trace context: each camera capture runs in its own worker thread
+_trace_state = threading.local()
+_trace_lock = threading.Lock()
+
+
+def emit(record: Dict) -> None:
+    """Write a trace record as one JSON line."""
+    if not TRACE_ENABLED:
+        return
+    line = json.dumps(record, default=str)
+    with _trace_lock:
+        if TRACE_FILE:
+            with open(TRACE_FILE, 'a') as f:
+                f.write(line + '\n')
+        else:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+
+@contextmanager
+def trace(**attrs):
+    """Start a trace (one capture cycle); spans inside share its trace_id and attributes."""
+    previous = getattr(_trace_state, 'context', None)
+    _trace_state.context = {'trace_id': uuid.uuid4().hex[:16], **attrs}
+    try:
+        yield _trace_state.context
+    finally:
+        _trace_state.context = previous
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a pipeline stage. Emits a JSON line and observes
+    scraper_stage_duration_seconds{stage=name} when the block exits.
+    """
+    context = getattr(_trace_state, 'context', None) or {}
+    start = time.monotonic()
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        duration = time.monotonic() - start
+        STAGE_DURATION.observe(duration, stage=name)
+        emit({
+            'ts': time.time(),
+            'span': name,
+            'duration_ms': round(duration * 1000, 2),
+            'status': status,
+            **context,
+            **attrs
+        })
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serve /metrics from a daemon thread. Returns None when disabled or the port is taken."""
+    if port <= 0:
+        return None
+
+    # http.server pulls in most of the email/http packages, so only load it when serving
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Serves the registry at /metrics."""
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    except OSError as e:
+        print(f"Could not start metrics server on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at http://0.0.0.0:{port}/metrics")
+    return server
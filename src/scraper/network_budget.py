@@ -0,0 +1,160 @@
+"""
+Network Budget Module
+Blocks ads, analytics, fonts and host page images via CDP and accounts
+requests and bytes by domain for each page load
+"""
+import os
+import json
+from fnmatch import fnmatchcase
+from typing import Dict, List
+from urllib.parse import urlparse
+
+from metrics import REGISTRY, Counter
+
+
+NETWORK_BLOCKING = os.environ.get('NETWORK_BLOCKING', 'true').lower() in ('1', 'true', 'yes')
+NETWORK_ACCOUNTING = os.environ.get('NETWORK_ACCOUNTING', 'true').lower() in ('1', 'true', 'yes')
+
+# Chrome URL patterns ('*' wildcard). Only the ipcamlive iframe is needed for a capture.
+DEFAULT_BLOCK_PATTERNS = [
+    '*googletagmanager.com*',
+    '*google-analytics.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*googleadservices.com*',
+    '*adservice.google.*',
+    '*fundingchoicesmessages.google.com*',
+    '*facebook.net*',
+    '*connect.facebook.*',
+    '*hotjar.com*',
+    '*fonts.googleapis.com*',
+    '*fonts.gstatic.com*',
+    '*.woff2*',
+    '*.woff*',
+    '*.ttf*',
+    '*algarapictures.com/*.jpg*',
+    '*algarapictures.com/*.jpeg*',
+    '*algarapictures.com/*.png*',
+    '*algarapictures.com/*.webp*',
+    '*algarapictures.com/*.gif*',
+]
+
+PAGE_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    'scraper_page_requests_total', 'Requests made while loading the webcam page, by domain'))
+PAGE_BYTES_TOTAL = REGISTRY.register(Counter(
+    'scraper_page_bytes_total', 'Bytes received while loading the webcam page, by domain'))
+PAGE_BLOCKED_TOTAL = REGISTRY.register(Counter(
+    'scraper_page_blocked_requests_total', 'Requests blocked by the network budget, by domain'))
+
+
+def _parse_patterns(value: str) -> List[str]:
+    return [p.strip() for p in value.split(',') if p.strip()]
+
+
+def get_block_patterns() -> List[str]:
+    """
+    Get the effective block list.
+    NETWORK_BLOCK_PATTERNS replaces the defaults, NETWORK_BLOCK_EXTRA adds to
+    them, and any block pattern matched by a NETWORK_ALLOW_PATTERNS entry is
+    dropped (e.g. allow '*fundingchoices*' to keep the consent framework).
+    """
+    raw = os.environ.get('NETWORK_BLOCK_PATTERNS')
+    patterns = _parse_patterns(raw) if raw is not None else list(DEFAULT_BLOCK_PATTERNS)
+    patterns += _parse_patterns(os.environ.get('NETWORK_BLOCK_EXTRA', ''))
+    allow = _parse_patterns(os.environ.get('NETWORK_ALLOW_PATTERNS', ''))
+    return [p for p in patterns if not any(fnmatchcase(p, a) for a in allow)]
+
+
+def apply_network_budget(driver) -> None:
+    """Install the URL block list on a fresh driver; it persists across navigations."""
+    if not NETWORK_BLOCKING:
+        return
+    patterns = get_block_patterns()
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        print(f"[network] Blocking {len(patterns)} URL patterns")
+    except Exception as e:
+        print(f"[network] Could not install URL block list: {e}")
+
+
+def is_url_blocked(url: str) -> bool:
+    """Check whether a URL is covered by the active block list."""
+    return NETWORK_BLOCKING and any(fnmatchcase(url, p) for p in get_block_patterns())
+
+
+def get_domain(url: str) -> str:
+    """Get the host of a request URL for accounting."""
+    return urlparse(url).hostname or 'other'
+
+
+def drain_performance_log(driver) -> None:
+    """Discard performance log entries so the next summary covers one page load."""
+    if not NETWORK_ACCOUNTING:
+        return
+    try:
+        driver.get_log('performance')
+    except Exception:
+        pass
+
+
+def summarize_page_load(driver) -> Dict:
+    """
+    Tally requests, bytes and blocked requests by domain from the
+    performance log collected since the last drain.
+    """
+    domains = {}
+    urls = {}
+    try:
+        entries = driver.get_log('performance')
+    except Exception as e:
+        print(f"[network] Performance log unavailable: {e}")
+        return {}
+
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        request_id = params.get('requestId')
+
+        if method == 'Network.requestWillBeSent':
+            url = params.get('request', {}).get('url', '')
+            if url.startswith('data:'):
+                continue
+            urls[request_id] = url
+            stats = domains.setdefault(get_domain(url), {'requests': 0, 'bytes': 0, 'blocked': 0})
+            stats['requests'] += 1
+        elif method == 'Network.loadingFinished' and request_id in urls:
+            stats = domains[get_domain(urls[request_id])]
+            stats['bytes'] += int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed' and request_id in urls and params.get('blockedReason'):
+            stats = domains[get_domain(urls[request_id])]
+            stats['blocked'] += 1
+
+    return domains
+
+
+def report_page_load(driver) -> None:
+    """Log and export the page load accounting."""
+    if not NETWORK_ACCOUNTING:
+        return
+    domains = summarize_page_load(driver)
+    if not domains:
+        return
+
+    for domain, stats in domains.items():
+        PAGE_REQUESTS_TOTAL.inc(stats['requests'], domain=domain)
+        PAGE_BYTES_TOTAL.inc(stats['bytes'], domain=domain)
+        if stats['blocked']:
+            PAGE_BLOCKED_TOTAL.inc(stats['blocked'], domain=domain)
+
+    total_requests = sum(s['requests'] for s in domains.values())
+    total_bytes = sum(s['bytes'] for s in domains.values())
+    total_blocked = sum(s['blocked'] for s in domains.values())
+    print(f"[network] {total_requests} requests, {total_bytes / 1024:.0f}KB, {total_blocked} blocked")
+    top = sorted(domains.items(), key=lambda item: item[1]['bytes'], reverse=True)[:5]
+    for domain, stats in top:
+        print(f"[network]   {domain}: {stats['requests']} requests, {stats['bytes'] / 1024:.0f}KB")
@@ -3,57 +3,135 @@ Image Overlay Module
 Adds weather information and temperature gauges to webcam screenshots
 """
 from PIL import Image, ImageDraw, ImageFont
+import io
 import math
 import os
-from datetime import datetime, timedelta
+import sys
+import subprocess
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 from calendar import monthrange
-from typing import Dict, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple, Optional, Union
+
+from image_transform import transform
+from encoders import register_plugins
+
+
+# Rendered overlay layers kept per (size, weather, date); one day of captures fits comfortably
+OVERLAY_CACHE_SIZE = int(os.environ.get('OVERLAY_CACHE_SIZE', '256'))
+# Batch video rendering: worker processes (0 = one per CPU core) and frames
+# queued ahead of ffmpeg per worker, which bounds memory for long date ranges
+VIDEO_WORKERS = int(os.environ.get('VIDEO_WORKERS', '0'))
+VIDEO_FRAMES_IN_FLIGHT = int(os.environ.get('VIDEO_FRAMES_IN_FLIGHT', '4'))
+VIDEO_FRAME_RATE = 30
+# Exit code of `--video` when there are no frames to render (argparse uses 2 for usage errors)
+NO_FRAMES_EXIT_CODE = 3
+# Pre-rendered labels (text + shadow); the fixed labels plus a few days of values
+TEXT_SPRITE_CACHE_SIZE = 1024
+
+FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+    'C:/Windows/Fonts/arialbd.ttf',
+    'DejaVuSans-Bold.ttf',  # resolved by FreeType's own search path
+]
+
+Color = Union[str, Tuple[int, ...]]
+
+
+@lru_cache(maxsize=1)
+def get_font_path() -> Optional[str]:
+    """Find the first usable system font, once per process. None means Pillow's default font."""
+    for font_path in FONT_PATHS:
+        if os.path.isabs(font_path) and not os.path.exists(font_path):
+            continue
+        try:
+            ImageFont.truetype(font_path, 12)
+            return font_path
+        except IOError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_font(size: int) -> ImageFont.FreeTypeFont:
+    """Get a font for drawing text (loaded once per size)."""
+    font_path = get_font_path()
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default()
 
 
-def get_font(size: int) -> ImageFont.FreeTypeFont:
-    """Get a font for drawing text."""
-    # Try to use a system font, fall back to default
-    font_paths = [
-        '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-        '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
-        '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
-        'C:/Windows/Fonts/arial.ttf',
-        'C:/Windows/Fonts/arialbd.ttf',
-    ]
+@lru_cache(maxsize=TEXT_SPRITE_CACHE_SIZE)
+def get_text_sprite(
+    text: str,
+    size: int,
+    text_color: Color = 'white',
+    shadow_color: Optional[Color] = None,
+    shadow_offset: int = 2
+) -> Image.Image:
+    """
+    Render a label once onto a transparent RGBA sprite whose origin matches
+    `draw.text()` at the paste position; the shadow is baked in when given.
+    """
+    font = get_font(size)
+    _, _, right, bottom = font.getbbox(text)
+    offset = shadow_offset if shadow_color is not None else 0
+    sprite = Image.new('RGBA', (max(1, right + offset), max(1, bottom + offset)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    if shadow_color is not None:
+        draw.text((offset, offset), text, font=font, fill=shadow_color)
+    draw.text((0, 0), text, font=font, fill=text_color)
+    return sprite
 
-    for font_path in font_paths:
-        if os.path.exists(font_path):
-            try:
-                return ImageFont.truetype(font_path, size)
-            except IOError:
-                continue
 
-    # Fall back to default font
-    try:
-        return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
-    except IOError:
-        return ImageFont.load_default()
+@lru_cache(maxsize=TEXT_SPRITE_CACHE_SIZE)
+def get_text_size(text: str, size: int) -> Tuple[int, int]:
+    """Get the (width, height) of a label's bounding box, as `draw.textbbox()` measures it."""
+    left, top, right, bottom = get_font(size).getbbox(text)
+    return right - left, bottom - top
+
+
+def paste_text(
+    image: Image.Image,
+    position: Tuple[int, int],
+    text: str,
+    size: int,
+    text_color: Color = 'white',
+    shadow_color: Optional[Color] = None,
+    shadow_offset: int = 2
+) -> None:
+    """Composite a cached text sprite onto an RGBA layer."""
+    sprite = get_text_sprite(text, size, text_color, shadow_color, shadow_offset)
+    x, y = position
+    if x < 0 or y < 0:
+        # alpha_composite() needs a non-negative destination; clip the sprite instead
+        sprite = sprite.crop((max(0, -x), max(0, -y), sprite.width, sprite.height))
+        x, y = max(0, x), max(0, y)
+    image.alpha_composite(sprite, (x, y))
 
 
 def draw_text_with_shadow(
-    draw: ImageDraw.Draw,
+    image: Image.Image,
     position: Tuple[int, int],
     text: str,
-    font: ImageFont.FreeTypeFont,
-    text_color: str = 'white',
-    shadow_color: str = 'black',
+    size: int,
+    text_color: Color = 'white',
+    shadow_color: Color = 'black',
     shadow_offset: int = 2
 ) -> None:
     """Draw text with a shadow for better visibility."""
-    x, y = position
-    # Draw shadow
-    draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
-    # Draw text
-    draw.text((x, y), text, font=font, fill=text_color)
+    paste_text(image, position, text, size, text_color, shadow_color, shadow_offset)
 
 
 def draw_weather_info(
     draw: ImageDraw.Draw,
+    image: Image.Image,
     position: Tuple[int, int],
     weather: Dict,
     align: str = 'left'
@@ -63,12 +141,13 @@ def draw_weather_info(
 
     Args:
         draw: PIL ImageDraw object
+        image: RGBA layer the text sprites are pasted onto
         position: (x, y) position for the text
         weather: Weather data dictionary
         align: 'left' or 'right' alignment
     """
-    title_font = get_font(28)
-    info_font = get_font(22)
+    title_font_size = 28
+    info_font_size = 22
 
     x, y = position
     line_height = 30
@@ -80,25 +159,35 @@ def draw_weather_info(
     day_length = weather.get('day_length', '--')
 
     lines = [
-        (f"{city}", title_font),
-        (f"Temp: {temp}°C", info_font),
-        (f"Sunrise: {sunrise}", info_font),
-        (f"Sunset: {sunset}", info_font),
-        (f"Day: {day_length}", info_font),
+        (f"{city}", title_font_size),
+        (f"Temp: {temp}°C", info_font_size),
+        (f"Sunrise: {sunrise}", info_font_size),
+        (f"Sunset: {sunset}", info_font_size),
+        (f"Day: {day_length}", info_font_size),
     ]
 
-    for i, (text, font) in enumerate(lines):
+    for i, (text, font_size) in enumerate(lines):
         text_y = y + (i * line_height)
 
         if align == 'right':
             # Get text width for right alignment
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
+            text_width, _ = get_text_size(text, font_size)
             text_x = x - text_width
         else:
             text_x = x
 
-        draw_text_with_shadow(draw, (text_x, text_y), text, font)
+        draw_text_with_shadow(image, (text_x, text_y), text, font_size)
+
+
+def draw_gauge_ring(draw: ImageDraw.Draw, center: Tuple[int, int], size: int = 100) -> None:
+    """Draw the static outer circle of a temperature gauge."""
+    cx, cy = center
+    radius = size // 2
+    draw.ellipse(
+        [cx - radius, cy - radius, cx + radius, cy + radius],
+        outline='white',
+        width=3
+    )
 
 
 def draw_temperature_gauge(
@@ -166,12 +255,7 @@ def draw_temperature_gauge(
 
     temp_color = (r, g, b)
 
-    # Draw outer circle (background)
-    draw.ellipse(
-        [cx - radius, cy - radius, cx + radius, cy + radius],
-        outline='white',
-        width=3
-    )
+    # The outer circle is part of the static template (draw_gauge_ring)
 
     # Draw arc representing temperature
     # Arc goes from -150° to 150° (300° total range)
@@ -188,32 +272,50 @@ def draw_temperature_gauge(
     )
 
     # Draw temperature text in center
-    temp_font = get_font(32)
+    temp_font_size = 32
     temp_text = f"{temperature:.0f}°"
-    bbox = draw.textbbox((0, 0), temp_text, font=temp_font)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
+    text_width, text_height = get_text_size(temp_text, temp_font_size)
     draw_text_with_shadow(
-        draw,
+        image,
         (cx - text_width // 2, cy - text_height // 2 - 10),
         temp_text,
-        temp_font
+        temp_font_size
     )
 
     # Draw city name below gauge
-    city_font = get_font(18)
-    bbox = draw.textbbox((0, 0), city, font=city_font)
-    text_width = bbox[2] - bbox[0]
+    city_font_size = 18
+    text_width, _ = get_text_size(city, city_font_size)
     draw_text_with_shadow(
-        draw,
+        image,
         (cx - text_width // 2, cy + radius + 10),
         city,
-        city_font
+        city_font_size
+    )
+
+
+DIFFERENCE_BOX_SIZE = (140, 70)
+
+
+def get_difference_box(center: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """Get the (left, top, right, bottom) of the temperature difference box."""
+    cx, cy = center
+    box_width, box_height = DIFFERENCE_BOX_SIZE
+    return (cx - box_width // 2, cy - box_height // 2, cx + box_width // 2, cy + box_height // 2)
+
+
+def draw_difference_background(draw: ImageDraw.Draw, center: Tuple[int, int]) -> None:
+    """Draw the static semi-transparent background of the difference indicator."""
+    bg_left, bg_top, bg_right, bg_bottom = get_difference_box(center)
+    draw.rounded_rectangle(
+        [(bg_left, bg_top), (bg_right, bg_bottom)],
+        radius=12,
+        fill=(30, 30, 50, 200)
     )
 
 
 def draw_temperature_difference(
     draw: ImageDraw.Draw,
+    image: Image.Image,
     center: Tuple[int, int],
     alicante_temp: float,
     bratislava_temp: float
@@ -230,22 +332,8 @@ def draw_temperature_difference(
     cx, cy = center
     diff = alicante_temp - bratislava_temp
 
-    # Dimensions
-    box_width = 140
-    box_height = 70
-
-    # Background rounded rectangle with gradient effect (semi-transparent dark)
-    bg_left = cx - box_width // 2
-    bg_top = cy - box_height // 2
-    bg_right = cx + box_width // 2
-    bg_bottom = cy + box_height // 2
-
-    # Draw background with rounded corners
-    draw.rounded_rectangle(
-        [(bg_left, bg_top), (bg_right, bg_bottom)],
-        radius=12,
-        fill=(30, 30, 50, 200)
-    )
+    # The semi-transparent background is part of the static template (draw_difference_background)
+    bg_left, bg_top, bg_right, bg_bottom = get_difference_box(center)
 
     # Draw border
     border_color = (255, 200, 100) if diff > 0 else (100, 200, 255) if diff < 0 else (200, 200, 200)
@@ -257,23 +345,16 @@ def draw_temperature_difference(
     )
 
     # Title "DIFF" at top
-    title_font = get_font(12)
+    title_font_size = 12
     title_text = "DIFFERENCE"
-    bbox = draw.textbbox((0, 0), title_text, font=title_font)
-    title_width = bbox[2] - bbox[0]
-    draw.text(
-        (cx - title_width // 2, bg_top + 6),
-        title_text,
-        font=title_font,
-        fill=(180, 180, 200)
-    )
+    title_width, _ = get_text_size(title_text, title_font_size)
+    paste_text(image, (cx - title_width // 2, bg_top + 6), title_text, title_font_size, (180, 180, 200))
 
     # Main difference value
-    diff_font = get_font(28)
+    diff_font_size = 28
     sign = "+" if diff > 0 else ""
     diff_text = f"{sign}{diff:.1f}°"
-    bbox = draw.textbbox((0, 0), diff_text, font=diff_font)
-    diff_width = bbox[2] - bbox[0]
+    diff_width, _ = get_text_size(diff_text, diff_font_size)
 
     # Color based on difference (warm = orange/red, cold = blue/cyan)
     if diff > 0:
@@ -296,15 +377,15 @@ def draw_temperature_difference(
         diff_color = (200, 200, 200)     # Gray for equal
 
     draw_text_with_shadow(
-        draw,
+        image,
         (cx - diff_width // 2, cy - 8),
         diff_text,
-        diff_font,
+        diff_font_size,
         text_color=diff_color
     )
 
     # Arrow indicator and label at bottom
-    arrow_font = get_font(11)
+    arrow_font_size = 11
     if diff > 0:
         # Alicante is warmer
         arrow = "▲"
@@ -319,26 +400,43 @@ def draw_temperature_difference(
 
     # Draw arrow
     arrow_y = bg_bottom - 18
-    bbox = draw.textbbox((0, 0), arrow, font=arrow_font)
-    arrow_width = bbox[2] - bbox[0]
-    draw.text(
-        (cx - 35 - arrow_width // 2, arrow_y),
-        arrow,
-        font=arrow_font,
-        fill=diff_color
-    )
+    arrow_width, _ = get_text_size(arrow, arrow_font_size)
+    paste_text(image, (cx - 35 - arrow_width // 2, arrow_y), arrow, arrow_font_size, diff_color)
 
     # Draw label
-    draw.text(
-        (cx - 25, arrow_y),
-        label,
-        font=arrow_font,
-        fill=(180, 180, 200)
+    paste_text(image, (cx - 25, arrow_y), label, arrow_font_size, (180, 180, 200))
+
+
+def get_date_track(width: int, height: int) -> Dict:
+    """Get the geometry of the date indicator and its track bar."""
+    # Calculate overlay dimensions (responsive to image size) - reduced to half
+    overlay_height = max(30, int(height * 0.065))
+    bottom_padding = 10
+    overlay_y = height - overlay_height - bottom_padding
+    track_margin = 40
+    return {
+        'overlay_height': overlay_height,
+        'overlay_y': overlay_y,
+        'x': track_margin,
+        'y': overlay_y + int(overlay_height * 0.65),
+        'width': width - (track_margin * 2),
+        'height': max(4, int(overlay_height * 0.08)),
+    }
+
+
+def draw_date_track(draw: ImageDraw.Draw, width: int, height: int) -> None:
+    """Draw the static track bar of the date indicator."""
+    track = get_date_track(width, height)
+    # Purple/blue gradient track (simulate with solid color for simplicity)
+    draw.rectangle(
+        [(track['x'], track['y']), (track['x'] + track['width'], track['y'] + track['height'])],
+        fill=(102, 126, 234)
     )
 
 
 def draw_date_indicator(
     draw: ImageDraw.Draw,
+    image: Image.Image,
     width: int,
     height: int,
     current_date: datetime
@@ -350,14 +448,14 @@ def draw_date_indicator(
 
     Args:
         draw: PIL ImageDraw object
+        image: RGBA layer the text sprites are pasted onto
         width: Image width
         height: Image height
         current_date: Current date
     """
-    # Calculate overlay dimensions (responsive to image size) - reduced to half
-    overlay_height = max(30, int(height * 0.065))
-    bottom_padding = 10
-    overlay_y = height - overlay_height - bottom_padding
+    track = get_date_track(width, height)
+    overlay_height = track['overlay_height']
+    overlay_y = track['overlay_y']
 
     # No background - transparent
 
@@ -373,41 +471,29 @@ def draw_date_indicator(
 
     # Draw month timeline
     month_font_size = max(11, int(overlay_height * 0.18))
-    month_font = get_font(month_font_size)
     active_font_size = max(13, int(overlay_height * 0.22))
-    active_font = get_font(active_font_size)
 
     month_y = overlay_y + 10
     month_width = width // 5
 
     for idx, month_info in enumerate(months):
-        font = active_font if month_info['is_active'] else month_font
+        font_size = active_font_size if month_info['is_active'] else month_font_size
         color = (255, 255, 255) if month_info['is_active'] else (255, 255, 255, 100)
 
         # Center the month label
-        bbox = draw.textbbox((0, 0), month_info['label'], font=font)
-        text_width = bbox[2] - bbox[0]
+        text_width, _ = get_text_size(month_info['label'], font_size)
         month_x = (idx * month_width) + (month_width - text_width) // 2
 
-        draw.text((month_x, month_y), month_info['label'], font=font, fill=color)
+        paste_text(image, (month_x, month_y), month_info['label'], font_size, color)
 
     # Calculate day position within month
     day = current_date.day
     days_in_month = monthrange(current_date.year, current_date.month)[1]
     day_position = (day - 1) / (days_in_month - 1) if days_in_month > 1 else 0.5
 
-    # Draw track bar
-    track_height = max(4, int(overlay_height * 0.08))
-    track_y = overlay_y + int(overlay_height * 0.65)
-    track_margin = 40
-    track_width = width - (track_margin * 2)
-    track_x = track_margin
-
-    # Purple/blue gradient track (simulate with solid color for simplicity)
-    draw.rectangle(
-        [(track_x, track_y), (track_x + track_width, track_y + track_height)],
-        fill=(102, 126, 234)
-    )
+    # The track bar is part of the static template (draw_date_track)
+    track_x, track_y = track['x'], track['y']
+    track_width, track_height = track['width'], track['height']
 
     # Draw day marker
     marker_x = track_x + int(track_width * day_position)
@@ -424,11 +510,8 @@ def draw_date_indicator(
 
     # Day number label above marker
     day_font_size = max(12, int(overlay_height * 0.20))
-    day_font = get_font(day_font_size)
     day_text = str(day)
-    bbox = draw.textbbox((0, 0), day_text, font=day_font)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
+    text_width, text_height = get_text_size(day_text, day_font_size)
 
     label_padding = 4
     label_x = marker_x - text_width // 2 - label_padding
@@ -444,16 +527,162 @@ def draw_date_indicator(
     )
 
     # Day number text
-    draw.text(
-        (marker_x - text_width // 2, label_y + label_padding // 2),
-        day_text,
-        font=day_font,
-        fill=(255, 255, 255)
+    paste_text(image, (marker_x - text_width // 2, label_y + label_padding // 2), day_text, day_font_size, (255, 255, 255))
+
+
+WeatherKey = Optional[Tuple]
+
+
+def get_weather_key(weather: Optional[Dict]) -> WeatherKey:
+    """
+    Reduce weather data to the values the overlay shows, as a hashable cache key.
+    Temperatures are rounded to the displayed precision so jitter below it
+    reuses the cached layer.
+    """
+    if not weather:
+        return None
+    temperature = weather.get('temperature', '--')
+    if isinstance(temperature, (int, float)):
+        temperature = round(temperature, 1)
+    return (
+        weather.get('city', 'Unknown'),
+        temperature,
+        weather.get('sunrise', '--:--'),
+        weather.get('sunset', '--:--'),
+        weather.get('day_length', '--')
+    )
+
+
+def weather_from_key(key: WeatherKey) -> Optional[Dict]:
+    """Rebuild the weather dict drawn by the overlay from a cache key."""
+    if key is None:
+        return None
+    city, temperature, sunrise, sunset, day_length = key
+    return {'city': city, 'temperature': temperature, 'sunrise': sunrise, 'sunset': sunset, 'day_length': day_length}
+
+
+def get_layout(width: int, height: int) -> Dict[str, Tuple[int, int]]:
+    """Positions of the overlay elements for an output size."""
+    margin = 20
+    gauge_size = 80
+    gauge_y = height - gauge_size // 2 - 50
+    return {
+        'margin': margin,
+        'gauge_size': gauge_size,
+        'alicante_info': (margin, margin),
+        'bratislava_info': (width - margin, margin),
+        'alicante_gauge': (margin + gauge_size // 2 + 20, gauge_y),
+        'bratislava_gauge': (width - margin - gauge_size // 2 - 20, gauge_y),
+        'difference': (width // 2, gauge_y),
+    }
+
+
+@lru_cache(maxsize=16)
+def get_static_template(size: Tuple[int, int], has_alicante: bool, has_bratislava: bool) -> Image.Image:
+    """
+    Transparent RGBA layer with the parts of the overlay that never change for
+    an output size: gauge rings, the difference box background and the date track.
+    """
+    width, height = size
+    layout = get_layout(width, height)
+    template = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(template)
+
+    if has_alicante:
+        draw_gauge_ring(draw, layout['alicante_gauge'], layout['gauge_size'])
+    if has_bratislava:
+        draw_gauge_ring(draw, layout['bratislava_gauge'], layout['gauge_size'])
+    if has_alicante and has_bratislava:
+        draw_difference_background(draw, layout['difference'])
+    draw_date_track(draw, width, height)
+    return template
+
+
+@lru_cache(maxsize=OVERLAY_CACHE_SIZE)
+def get_overlay_layer(
+    size: Tuple[int, int],
+    alicante_key: WeatherKey,
+    bratislava_key: WeatherKey,
+    current_date: date
+) -> Image.Image:
+    """
+    Complete RGBA overlay for an output size and content key: the static
+    template with the weather text, gauge arcs and date indicator drawn on top.
+    The content only changes a few times per hour, so most frames reuse a cached layer.
+    """
+    width, height = size
+    layout = get_layout(width, height)
+    alicante_weather = weather_from_key(alicante_key)
+    bratislava_weather = weather_from_key(bratislava_key)
+
+    layer = get_static_template(size, alicante_key is not None, bratislava_key is not None).copy()
+    draw = ImageDraw.Draw(layer)
+
+    # Draw Alicante weather info (top-left)
+    if alicante_weather:
+        draw_weather_info(draw, layer, layout['alicante_info'], alicante_weather, align='left')
+
+    # Draw Bratislava weather info (top-right)
+    if bratislava_weather:
+        draw_weather_info(draw, layer, layout['bratislava_info'], bratislava_weather, align='right')
+
+    # Alicante gauge (bottom-left)
+    if alicante_weather:
+        draw_temperature_gauge(
+            draw,
+            layer,
+            layout['alicante_gauge'],
+            alicante_weather.get('temperature', 0),
+            'Alicante',
+            layout['gauge_size']
+        )
+
+    # Bratislava gauge (bottom-right)
+    if bratislava_weather:
+        draw_temperature_gauge(
+            draw,
+            layer,
+            layout['bratislava_gauge'],
+            bratislava_weather.get('temperature', 0),
+            'Bratislava',
+            layout['gauge_size']
+        )
+
+    # Draw temperature difference indicator (bottom-center)
+    if alicante_weather and bratislava_weather:
+        draw_temperature_difference(
+            draw,
+            layer,
+            layout['difference'],
+            alicante_weather.get('temperature', 0),
+            bratislava_weather.get('temperature', 0)
+        )
+
+    # Draw date indicator at bottom
+    draw_date_indicator(draw, layer, width, height, datetime.combine(current_date, datetime.min.time()))
+    return layer
+
+
+def render_overlay(
+    image: Image.Image,
+    alicante_weather: Optional[Dict],
+    bratislava_weather: Optional[Dict],
+    current_date: Optional[date] = None
+) -> Image.Image:
+    """Composite the (cached) overlay layer onto an RGB frame in one pass."""
+    layer = get_overlay_layer(
+        image.size,
+        get_weather_key(alicante_weather),
+        get_weather_key(bratislava_weather),
+        current_date or date.today()
     )
+    frame = image.convert('RGBA')
+    frame.alpha_composite(layer)
+    return frame.convert('RGB')
 
 
 def add_overlay(
-    image_path: str,
+    image_path: Union[str, bytes, Image.Image],
     output_path: str,
     alicante_weather: Optional[Dict],
     bratislava_weather: Optional[Dict],
@@ -463,7 +692,7 @@ def add_overlay(
     Add weather overlay to an image and save to file.
 
     Args:
-        image_path: Path to the input image
+        image_path: Path to the input image, or its encoded bytes or a PIL Image
         output_path: Path to save the output image
         alicante_weather: Weather data for Alicante
         bratislava_weather: Weather data for Bratislava
@@ -488,7 +717,7 @@ def add_overlay(
 
 
 def add_overlay_to_image(
-    image_path: str,
+    image_path: Union[str, bytes, Image.Image],
     alicante_weather: Optional[Dict],
     bratislava_weather: Optional[Dict],
     capture_time: Optional[str] = None
@@ -497,7 +726,7 @@ def add_overlay_to_image(
     Add weather overlay to an image and return the PIL Image object.
 
     Args:
-        image_path: Path to the input image
+        image_path: Path to the input image, or its encoded bytes or a PIL Image
         alicante_weather: Weather data for Alicante
         bratislava_weather: Weather data for Bratislava
         capture_time: Timestamp string to display (e.g., "14:30:45")
@@ -506,110 +735,10 @@ def add_overlay_to_image(
         Tuple of (PIL Image, width, height) if successful, None otherwise
     """
     try:
-        # Open image
-        image = Image.open(image_path)
-
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-
-        # Crop positions from environment variables (percentages 0-100)
-        # CROP_X1: left edge (default 0)
-        # CROP_Y1: top edge (default 0)
-        # CROP_X2: right edge (default 100)
-        # CROP_Y2: bottom edge (default 100)
-        img_width, img_height = image.size
-
-        x1 = float(os.environ.get('CROP_X1', '0')) / 100
-        y1 = float(os.environ.get('CROP_Y1', '0')) / 100
-        x2 = float(os.environ.get('CROP_X2', '100')) / 100
-        y2 = float(os.environ.get('CROP_Y2', '100')) / 100
-
-        left = int(img_width * x1)
-        top = int(img_height * y1)
-        right = int(img_width * x2)
-        bottom = int(img_height * y2)
-
-        # Clamp to image bounds
-        left = max(0, left)
-        top = max(0, top)
-        right = min(right, img_width)
-        bottom = min(bottom, img_height)
-
-        if right > left and bottom > top:
-            image = image.crop((left, top, right, bottom))
-
-        # Resize to target dimensions from env (default 800x450)
-        target_width = int(os.environ.get('OUTPUT_WIDTH', '800'))
-        target_height = int(os.environ.get('OUTPUT_HEIGHT', '450'))
-
-        # Resize to exact dimensions
-        image = image.resize((target_width, target_height), Image.LANCZOS)
-
-        draw = ImageDraw.Draw(image)
+        # Crop (CROP_X1..CROP_Y2 percentages) and resize to OUTPUT_WIDTH x OUTPUT_HEIGHT
+        image = transform(image_path)
+        image = render_overlay(image, alicante_weather, bratislava_weather)
         width, height = image.size
-
-        margin = 20
-
-        # Draw Alicante weather info (top-left)
-        if alicante_weather:
-            draw_weather_info(
-                draw,
-                (margin, margin),
-                alicante_weather,
-                align='left'
-            )
-
-        # Draw Bratislava weather info (top-right)
-        if bratislava_weather:
-            draw_weather_info(
-                draw,
-                (width - margin, margin),
-                bratislava_weather,
-                align='right'
-            )
-
-        # Draw temperature gauges
-        gauge_size = 80
-        gauge_y = height - gauge_size // 2 - 50
-
-        # Alicante gauge (bottom-left)
-        if alicante_weather:
-            draw_temperature_gauge(
-                draw,
-                image,
-                (margin + gauge_size // 2 + 20, gauge_y),
-                alicante_weather.get('temperature', 0),
-                'Alicante',
-                gauge_size
-            )
-
-        # Bratislava gauge (bottom-right)
-        if bratislava_weather:
-            draw_temperature_gauge(
-                draw,
-                image,
-                (width - margin - gauge_size // 2 - 20, gauge_y),
-                bratislava_weather.get('temperature', 0),
-                'Bratislava',
-                gauge_size
-            )
-
-        # Draw temperature difference indicator (bottom-center)
-        if alicante_weather and bratislava_weather:
-            alicante_temp = alicante_weather.get('temperature', 0)
-            bratislava_temp = bratislava_weather.get('temperature', 0)
-            draw_temperature_difference(
-                draw,
-                (width // 2, gauge_y),
-                alicante_temp,
-                bratislava_temp
-            )
-
-        # Draw date indicator at bottom
-        current_date = datetime.now()
-        draw_date_indicator(draw, width, height, current_date)
-
         return (image, width, height)
 
     except Exception as e:
@@ -617,8 +746,187 @@ def add_overlay_to_image(
         return None
 
 
+def weather_from_row(row: Dict, city: str) -> Optional[Dict]:
+    """Build the overlay weather dict for a city from a captures row."""
+    prefix = city.lower()
+    temperature = row.get(f'{prefix}_temp')
+    if temperature is None:
+        return None
+    return {
+        'city': city,
+        'temperature': temperature,
+        'sunrise': row.get(f'{prefix}_sunrise') or '--:--',
+        'sunset': row.get(f'{prefix}_sunset') or '--:--',
+        'day_length': row.get(f'{prefix}_day_length') or '--'
+    }
+
+
+def render_frame(row: Dict) -> Optional[bytes]:
+    """
+    Render one stored capture with its overlay as JPEG bytes (runs in a worker
+    process). Falls back to the plain frame when the overlay fails; returns
+    None when the frame cannot be decoded.
+    """
+    # Stored frames may be AVIF, which older Pillow only decodes through the plugin
+    register_plugins()
+    try:
+        # Stored frames are already cropped and resized
+        image = transform(row['image_data'], apply_crop=False)
+    except Exception as e:
+        print(f"Error decoding capture {row.get('id')}: {e}")
+        return None
+
+    try:
+        image = render_overlay(
+            image,
+            weather_from_row(row, 'Alicante'),
+            weather_from_row(row, 'Bratislava'),
+            row.get('capture_date')
+        )
+    except Exception as e:
+        print(f"Error adding overlay to capture {row.get('id')}: {e}")
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def get_ffmpeg_args(output_path: str, frame_rate: int = VIDEO_FRAME_RATE) -> list:
+    """ffmpeg command reading JPEG frames from stdin (same encoding as the server's daily videos)."""
+    return [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'image2pipe',
+        '-framerate', str(frame_rate),
+        '-c:v', 'mjpeg',
+        '-i', '-',
+        '-c:v', 'libx264',
+        '-pix_fmt', 'yuv420p',
+        '-preset', 'medium',
+        '-crf', '23',
+        '-r', str(frame_rate),
+        output_path
+    ]
+
+
+def write_frame(ffmpeg: subprocess.Popen, future: Future) -> int:
+    """Wait for a rendered frame and pipe it to ffmpeg. Returns the number of frames written."""
+    frame = future.result()
+    if not frame:
+        return 0
+    ffmpeg.stdin.write(frame)
+    return 1
+
+
+def render_video(
+    rows: Iterable[Dict],
+    output_path: str,
+    workers: int = VIDEO_WORKERS,
+    frames_in_flight: int = VIDEO_FRAMES_IN_FLIGHT
+) -> int:
+    """
+    Render capture rows with overlays across a process pool and pipe the
+    frames, in order, into ffmpeg. At most `workers * frames_in_flight`
+    frames are rendered ahead of ffmpeg, so memory stays flat however long
+    the range is. The video is written next to `output_path` and moved into
+    place when ffmpeg succeeds. Returns the number of frames written.
+    Raises RuntimeError when any capture could not be decoded, rather than
+    leaving a video with frames silently missing.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(1, workers * frames_in_flight)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    partial_path = output_path + '.partial.mp4'
+
+    submitted = 0
+    written = 0
+    with tempfile.TemporaryFile() as log:
+        ffmpeg = subprocess.Popen(get_ffmpeg_args(partial_path), stdin=subprocess.PIPE, stderr=log)
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for row in rows:
+                    pending.append(pool.submit(render_frame, row))
+                    submitted += 1
+                    if len(pending) >= max_in_flight:
+                        written += write_frame(ffmpeg, pending.popleft())
+                while pending:
+                    written += write_frame(ffmpeg, pending.popleft())
+            ffmpeg.stdin.close()
+            code = ffmpeg.wait()
+        except BaseException:
+            ffmpeg.kill()
+            ffmpeg.wait()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        skipped = submitted - written
+        if code != 0 or written == 0 or skipped:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            if skipped:
+                raise RuntimeError(f"{skipped} of {submitted} captures could not be decoded for {output_path}")
+            if written == 0:
+                print(f"No frames rendered for {output_path}")
+                return 0
+            log.seek(0)
+            raise RuntimeError(f"ffmpeg exited with code {code}: {log.read()[-500:].decode(errors='replace')}")
+
+    os.replace(partial_path, output_path)
+    return written
+
+
+def render_video_for_dates(
+    output_path: str,
+    date_from: str,
+    date_to: Optional[str] = None,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    light_classes: Optional[List[str]] = None
+) -> int:
+    """Stream a date range from MariaDB and render it to a video with overlays."""
+    from database import iter_captures
+
+    rows = iter_captures(date_from, date_to, time_from, time_to, camera_id, light_classes)
+    return render_video(rows, output_path)
+
+
+def main_video(args: list) -> None:
+    """Command line entry point for batch video rendering."""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(prog='overlay.py --video', description='Render captures with overlays into a video')
+    parser.add_argument('output', help='Output .mp4 path')
+    parser.add_argument('date_from', help='First capture date (YYYY-MM-DD)')
+    parser.add_argument('date_to', nargs='?', help='Last capture date (defaults to date_from)')
+    parser.add_argument('--from-time', help='Only captures at or after HH:MM each day')
+    parser.add_argument('--to-time', help='Only captures at or before HH:MM each day')
+    parser.add_argument('--camera', help='Only captures of this camera id')
+    parser.add_argument('--light', help='Only captures of these light classes (e.g. day,twilight); '
+                                        'the time range still applies to unclassified captures')
+    options = parser.parse_args(args)
+
+    start = time.perf_counter()
+    frames = render_video_for_dates(
+        options.output, options.date_from, options.date_to,
+        options.from_time, options.to_time, options.camera,
+        options.light.split(',') if options.light else None
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {frames} frames to {options.output} in {elapsed:.1f}s")
+    sys.exit(0 if frames else NO_FRAMES_EXIT_CODE)
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--video':
+        # Usage: python overlay.py --video OUTPUT DATE_FROM [DATE_TO] [--from-time HH:MM] [--to-time HH:MM]
+        main_video(sys.argv[2:])
+
     # Test overlay
+    import time
+
     test_weather = {
         'city': 'Test City',
         'temperature': 22.5,
@@ -638,3 +946,25 @@ if __name__ == '__main__':
         test_weather
     )
     print("Test overlay created at /tmp/test_output.jpg")
+
+    # Per-overlay cost: nothing cached (fonts resolved and labels rasterized
+    # per draw, as before the registry), warm fonts/sprites with a new
+    # content key, and a fully cached layer
+    def time_render(clear, runs=50):
+        start = time.perf_counter()
+        for i in range(runs):
+            clear()
+            render_overlay(test_image, dict(test_weather, temperature=i % 40), test_weather)
+        return (time.perf_counter() - start) / runs
+
+    def clear_all():
+        for cached in (get_font_path, get_font, get_text_sprite, get_text_size, get_static_template, get_overlay_layer):
+            cached.cache_clear()
+
+    results = [
+        ('cold', time_render(clear_all)),
+        ('warm fonts/sprites', time_render(get_overlay_layer.cache_clear)),
+        ('cached layer', time_render(lambda: None)),
+    ]
+    for name, elapsed in results:
+        print(f"{name:20} {elapsed * 1000:6.2f}ms per overlay ({results[0][1] / elapsed:.1f}x)")
@@ -0,0 +1,177 @@
+"""
+Overlay Render Daemon
+Long-running overlay renderer on a Unix domain socket: encoded image bytes and
+weather/date metadata in, overlaid JPEG out, with fonts and layers kept warm
+"""
+import os
+import io
+import sys
+import json
+import signal
+import struct
+import threading
+import socketserver
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+
+OVERLAY_SOCKET = os.environ.get('OVERLAY_SOCKET', '/tmp/overlay.sock')
+# Render worker processes (0 = one per CPU core)
+OVERLAY_WORKERS = int(os.environ.get('OVERLAY_WORKERS', '0'))
+# Larger requests are rejected before their image is read
+OVERLAY_MAX_REQUEST_BYTES = int(os.environ.get('OVERLAY_MAX_REQUEST_BYTES', str(32 * 1024 * 1024)))
+
+# Frames are a big-endian u32 length followed by that many bytes. A request is a
+# JSON header frame then an image frame; the response is the same with the
+# JPEG (empty on error). Connections may carry several requests in turn.
+LENGTH = struct.Struct('>I')
+
+_pool = None
+
+
+def warm_up() -> None:
+    """Worker initializer: load fonts and build the static template for the output size."""
+    from PIL import Image
+    from overlay import render_overlay
+    from encoders import register_plugins
+    from image_transform import get_transform
+
+    # Clients may send stored frames, which can be AVIF
+    register_plugins()
+    weather = {'city': 'Warmup', 'temperature': 20.0, 'sunrise': '07:00', 'sunset': '19:00', 'day_length': '12h 0m'}
+    render_overlay(Image.new('RGB', get_transform().size), weather, weather)
+
+
+def render_request(header: Dict, image_data: bytes) -> Tuple[bytes, int, int]:
+    """Render one request in a worker process. Returns (jpeg, width, height)."""
+    from overlay import render_overlay
+    from image_transform import transform
+
+    # Stored frames are already cropped and resized; raw screenshots ask for the crop
+    image = transform(image_data, apply_crop=bool(header.get('apply_crop', False)))
+    current_date = date.fromisoformat(header['date']) if header.get('date') else None
+    image = render_overlay(image, header.get('alicante'), header.get('bratislava'), current_date)
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=int(header.get('quality', 90)))
+    return buffer.getvalue(), image.width, image.height
+
+
+def get_pool(workers: int = OVERLAY_WORKERS) -> ProcessPoolExecutor:
+    """Shared render pool, created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=warm_up)
+    return _pool
+
+
+def read_frame(rfile, limit: int = OVERLAY_MAX_REQUEST_BYTES) -> Optional[bytes]:
+    """Read one length-prefixed frame. Returns None on a clean end of stream."""
+    prefix = rfile.read(LENGTH.size)
+    if not prefix:
+        return None
+    if len(prefix) < LENGTH.size:
+        raise ValueError("Truncated frame length")
+    (length,) = LENGTH.unpack(prefix)
+    if length > limit:
+        raise ValueError(f"Frame of {length} bytes exceeds the {limit} byte limit")
+    data = rfile.read(length)
+    if len(data) < length:
+        raise ValueError("Truncated frame")
+    return data
+
+
+def write_response(wfile, header: Dict, image_data: bytes = b'') -> None:
+    """Write a header frame and an image frame."""
+    encoded = json.dumps(header).encode()
+    # One write, so a client that stops reading after the header cannot fail a second one
+    wfile.write(b''.join((LENGTH.pack(len(encoded)), encoded, LENGTH.pack(len(image_data)), image_data)))
+    wfile.flush()
+
+
+class OverlayHandler(socketserver.StreamRequestHandler):
+    """Serves requests from one connection; rendering happens in the worker pool."""
+
+    def handle(self) -> None:
+        try:
+            self.serve_requests()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+
+    def serve_requests(self) -> None:
+        while True:
+            try:
+                raw_header = read_frame(self.rfile)
+                if raw_header is None:
+                    return
+                header = json.loads(raw_header)
+                image_data = read_frame(self.rfile)
+                if image_data is None:
+                    raise ValueError("Missing image frame")
+            except (ValueError, json.JSONDecodeError) as e:
+                # The stream position is unknown after a framing error; answer and drop the connection
+                write_response(self.wfile, {'ok': False, 'error': str(e)})
+                return
+
+            try:
+                jpeg, width, height = get_pool().submit(render_request, header, image_data).result()
+                write_response(self.wfile, {'ok': True, 'width': width, 'height': height}, jpeg)
+            except Exception as e:
+                print(f"[overlay] Render failed: {e}")
+                write_response(self.wfile, {'ok': False, 'error': str(e)})
+
+
+class OverlayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str = OVERLAY_SOCKET) -> None:
+    """Run the daemon until SIGTERM/SIGINT."""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    workers = OVERLAY_WORKERS or os.cpu_count() or 1
+    pool = get_pool(workers)
+    # Start the workers now so fonts and templates are warm before the first request
+    pool.submit(warm_up).result()
+
+    server = OverlayServer(socket_path, OverlayHandler)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"[overlay] Listening on {socket_path} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown(cancel_futures=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("[overlay] Stopped")
+
+
+def request_overlay(
+    image_data: bytes,
+    alicante_weather: Optional[Dict],
+    bratislava_weather: Optional[Dict],
+    current_date: Optional[str] = None,
+    socket_path: str = OVERLAY_SOCKET
+) -> bytes:
+    """Client helper: render an overlay through a running daemon and return the JPEG."""
+    import socket
+
+    header = json.dumps({'alicante': alicante_weather, 'bratislava': bratislava_weather, 'date': current_date}).encode()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(LENGTH.pack(len(header)) + header + LENGTH.pack(len(image_data)) + image_data)
+        with client.makefile('rb') as rfile:
+            response = json.loads(read_frame(rfile) or b'{}')
+            jpeg = read_frame(rfile)
+    if not response.get('ok'):
+        raise RuntimeError(f"Overlay daemon error: {response.get('error', 'no response')}")
+    return jpeg
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1] if len(sys.argv) > 1 else OVERLAY_SOCKET)
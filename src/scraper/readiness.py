@@ -0,0 +1,160 @@
+"""
+Page Readiness Module
+Waits on real page signals (DOM, iframe, video playback, painted frames)
+with per-signal deadlines instead of fixed sleeps
+"""
+import os
+import time
+from typing import Callable, Dict, Optional
+
+
+# Default deadline per signal in seconds, overridable via READY_TIMEOUT_<SIGNAL>
+DEFAULT_DEADLINES = {
+    'dom_ready': 15,
+    'iframe': 10,
+    'video_element': 10,
+    'play_click': 1,
+    'video_playing': 10,
+    'fullscreen': 2,
+    'first_frame': 3,
+}
+
+POLL_INTERVAL = float(os.environ.get('READY_POLL_INTERVAL', '0.1'))
+
+
+def get_deadline(signal: str) -> float:
+    """Get the deadline for a signal from environment or defaults."""
+    env_value = os.environ.get(f'READY_TIMEOUT_{signal.upper()}')
+    if env_value:
+        return float(env_value)
+    return DEFAULT_DEADLINES.get(signal, 5)
+
+
+class PageReadiness:
+    """
+    Waits for page readiness signals and records how long each one took.
+
+    `timings` maps signal name to elapsed seconds, or None when the
+    signal's deadline passed without it firing.
+    """
+
+    def __init__(self, driver, poll_interval: float = POLL_INTERVAL):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.timings: Dict[str, Optional[float]] = {}
+
+    def wait_for(self, signal: str, predicate: Callable[[], bool], timeout: float = None) -> bool:
+        """Poll `predicate` until it is truthy or the signal's deadline passes."""
+        if timeout is None:
+            timeout = get_deadline(signal)
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            try:
+                if predicate():
+                    self.timings[signal] = time.monotonic() - start
+                    return True
+            except Exception:
+                pass
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_interval)
+
+        self.timings[signal] = None
+        print(f"[ready] {signal} not reached within {timeout}s")
+        return False
+
+    def dom_ready(self, timeout: float = None) -> bool:
+        """Wait for document.readyState to be complete."""
+        return self.wait_for(
+            'dom_ready',
+            lambda: self.driver.execute_script("return document.readyState") == 'complete',
+            timeout
+        )
+
+    def iframe_present(self, url_match: str = 'ipcamlive.com', timeout: float = None) -> bool:
+        """Wait for an iframe whose src contains `url_match`."""
+        return self.wait_for(
+            'iframe',
+            lambda: self.driver.execute_script("""
+                var frames = document.querySelectorAll('iframe');
+                for (var i = 0; i < frames.length; i++) {
+                    if ((frames[i].src || '').indexOf(arguments[0]) !== -1) return true;
+                }
+                return false;
+            """, url_match),
+            timeout
+        )
+
+    def video_element(self, timeout: float = None) -> bool:
+        """Wait for a <video> element in the current frame."""
+        return self.wait_for(
+            'video_element',
+            lambda: self.driver.execute_script("return !!document.querySelector('video')"),
+            timeout
+        )
+
+    def video_playing(self, timeout: float = None) -> bool:
+        """Wait for the video to have data and its currentTime to advance."""
+        state = {'last_time': None}
+
+        def advancing() -> bool:
+            info = self.driver.execute_script("""
+                var v = document.querySelector('video');
+                if (!v) return null;
+                return { readyState: v.readyState, paused: v.paused, currentTime: v.currentTime };
+            """)
+            if not info or info['readyState'] < 2 or info['paused']:
+                return False
+            last_time = state['last_time']
+            state['last_time'] = info['currentTime']
+            return last_time is not None and info['currentTime'] > last_time
+
+        return self.wait_for('video_playing', advancing, timeout)
+
+    def fullscreen(self, timeout: float = None) -> bool:
+        """Wait for fullscreen to take effect or the video to fill the viewport."""
+        return self.wait_for(
+            'fullscreen',
+            lambda: self.driver.execute_script("""
+                if (document.fullscreenElement || document.webkitFullscreenElement) return true;
+                var v = document.querySelector('video');
+                if (!v) return false;
+                var rect = v.getBoundingClientRect();
+                return rect.width >= window.innerWidth - 2 && rect.height >= window.innerHeight - 2;
+            """),
+            timeout
+        )
+
+    def first_frame(self, timeout: float = None) -> bool:
+        """Wait for the next painted video frame via requestVideoFrameCallback."""
+        if timeout is None:
+            timeout = get_deadline('first_frame')
+        start = time.monotonic()
+        try:
+            self.driver.set_script_timeout(timeout + 1)
+            painted = self.driver.execute_async_script("""
+                var timeoutMs = arguments[0];
+                var done = arguments[arguments.length - 1];
+                var v = document.querySelector('video');
+                if (!v) { done(false); return; }
+                if (!v.requestVideoFrameCallback) { done(v.readyState >= 2); return; }
+                var timer = setTimeout(function() { done(false); }, timeoutMs);
+                v.requestVideoFrameCallback(function() { clearTimeout(timer); done(true); });
+            """, int(timeout * 1000))
+        except Exception as e:
+            print(f"[ready] first_frame check failed: {e}")
+            painted = False
+
+        self.timings['first_frame'] = (time.monotonic() - start) if painted else None
+        if not painted:
+            print(f"[ready] first_frame not reached within {timeout}s")
+        return bool(painted)
+
+    def summary(self) -> str:
+        """Format recorded timings for logging."""
+        parts = []
+        for signal, elapsed in self.timings.items():
+            parts.append(f"{signal}={elapsed:.2f}s" if elapsed is not None else f"{signal}=timeout")
+        return ' '.join(parts)
@@ -0,0 +1,69 @@
+"""
+Capture Renditions
+Downscaled copies (thumbnail, preview) of each processed frame, encoded in
+parallel alongside the full-size image
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from encoders import encode
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# name:width pairs; heights follow the frame's aspect ratio. Empty disables renditions.
+RENDITIONS = os.environ.get('RENDITIONS', 'thumb:160,preview:400')
+RENDITION_QUALITY = int(os.environ.get('RENDITION_QUALITY', '80'))
+
+_executor = None
+# Camera workers submit concurrently; only one of them may create the executor
+_executor_lock = threading.Lock()
+
+
+def parse_renditions(value: str = RENDITIONS) -> List[Tuple[str, int]]:
+    """Parse 'name:width,...' into [(name, width), ...]."""
+    renditions = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, width = item.partition(':')
+        if not name or not width.isdigit() or int(width) <= 0:
+            raise ValueError(f"Invalid rendition '{item}', expected name:width")
+        renditions.append((name.strip(), int(width)))
+    return renditions
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared encoder pool; Pillow releases the GIL while resizing and encoding."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, len(parse_renditions())), thread_name_prefix='rendition')
+    return _executor
+
+
+def render_rendition(image: Image.Image, name: str, width: int, fmt: str) -> Dict:
+    """Downscale and encode one rendition."""
+    from PIL import Image
+
+    height = max(1, round(width * image.height / image.width))
+    small = image.resize((width, height), Image.LANCZOS, reducing_gap=2.0) if width < image.width else image
+    return {
+        'size': name,
+        'width': small.width,
+        'height': small.height,
+        'image_format': fmt,
+        'image_data': encode(small, fmt, RENDITION_QUALITY)
+    }
+
+
+def submit_renditions(image: Image.Image, fmt: str) -> List[Future]:
+    """Start encoding all configured renditions; collect with `[f.result() for f in futures]`."""
+    executor = get_executor()
+    return [executor.submit(render_rendition, image, name, width, fmt) for name, width in parse_renditions()]
@@ -4,31 +4,72 @@ Webcam Scraper
 Captures screenshots from Algarapictures webcam with weather overlay
 Stores captures in MariaDB database
 """
+from __future__ import annotations
+
 import os
 import sys
 import time
-import random
 import signal
-import io
+import threading
+import math
+import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
-from PIL import Image
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# Selenium and PIL are imported where they are used, so `--once` with the
+# stream backend and other light entry points start without them
+if TYPE_CHECKING:
+    from selenium import webdriver
 
 from weather import get_all_weather
-from database import init_database, save_capture
+from database import init_database, save_capture, get_latest_fingerprint
+from browser import BrowserPool, BrowserSession, get_profile_dir, BROWSER_PERSISTENT, BROWSER_POOL_SIZE, BROWSER_PROFILE
+from cameras import load_cameras, get_default_camera
+from capture_schedule import AlignedScheduler, OVERRUN_POLICY
+from cadence import CadencePolicy, CADENCE_MODE
+from fingerprint import (
+    compute_fingerprint, compute_frame_stats, hamming_distance, is_near_duplicate,
+    DUPLICATE_ACTION, DUPLICATE_RETRIES
+)
+from readiness import PageReadiness
+from image_transform import get_transform, transform
+from encoders import encode_capture, get_storage_format
+from renditions import submit_renditions
+from timelapse import submit_capture as submit_timelapse_frame
+from stream_grab import capture_stream_frame, remember_player_url, get_cached_player_url, forget_player_url
+from network_budget import (
+    apply_network_budget, drain_performance_log, report_page_load, is_url_blocked,
+    NETWORK_ACCOUNTING
+)
+from watchdog import guard, stage, abort_active_captures, get_stage_budget
+from metrics import (
+    span, trace, start_metrics_server, CAPTURES_TOTAL, BYTES_STORED_TOTAL,
+    CHROMIUM_RSS_BYTES, READY_SIGNAL_DURATION, SCHEDULE_LATENESS, SCHEDULE_SKIPPED
+)
 
 
 # Configuration
+# Default camera URL; additional cameras come from the registry in cameras.py
 WEBCAM_URL = os.environ.get('TARGET_URL', 'https://www.algarapictures.com/webcam')
-SCREENSHOT_INTERVAL = 600  # 10 minutes in seconds
-INTERVAL_JITTER = 30  # ±30 seconds random jitter
+SCREENSHOT_INTERVAL = 600  # 10 minutes in seconds, aligned to the wall clock
+INTERVAL_JITTER = 30  # ±30 seconds random jitter around each tick
+# 'selenium' drives the full page; 'stream' grabs a frame straight from the player's stream
+CAPTURE_BACKEND = os.environ.get('CAPTURE_BACKEND', 'selenium').lower()
+# Browser capture mode: 'screenshot' (fullscreen + viewport crop) or 'canvas' (native video frame)
+BROWSER_CAPTURE_MODE = os.environ.get('BROWSER_CAPTURE_MODE', 'screenshot').lower()
+CANVAS_JPEG_QUALITY = float(os.environ.get('CANVAS_JPEG_QUALITY', '0.92'))
+SCREENSHOT_JPEG_QUALITY = int(os.environ.get('SCREENSHOT_JPEG_QUALITY', '95'))
+# Load the remembered ipcamlive player URL directly instead of the host page
+PLAYER_DIRECT = os.environ.get('PLAYER_DIRECT', 'true').lower() in ('1', 'true', 'yes')
+PLAYER_URL_MAX_AGE = int(os.environ.get('PLAYER_URL_MAX_AGE', '86400'))  # rediscover daily, 0 = never
+
+# FundingChoices stores the consent decision in these first-party cookies
+CONSENT_COOKIES = ('FCCDCF', 'FCNEC')
+FUNDING_CHOICES_URL = 'https://fundingchoicesmessages.google.com/'
+
+# Returned by process_screenshot() when a near-duplicate frame should be re-captured
+DUPLICATE_FRAME = -1
 
 
 def get_storage_path() -> str:
@@ -45,20 +86,20 @@ def get_screenshot_dir() -> str:
     return screenshot_dir
 
 
-def get_temp_dir() -> str:
-    """Get temporary directory for raw screenshots."""
-    temp_dir = '/tmp/webcam-scraper'
-    os.makedirs(temp_dir, exist_ok=True)
-    return temp_dir
-
-
 # Viewport configuration (16:9 aspect ratio)
 VIEWPORT_WIDTH = int(os.environ.get('VIEWPORT_WIDTH', '800'))
 VIEWPORT_HEIGHT = int(os.environ.get('VIEWPORT_HEIGHT', '450'))
 
 
-def setup_driver() -> webdriver.Chrome:
-    """Set up Chrome WebDriver with appropriate options."""
+def setup_driver(profile_dir: str = None) -> webdriver.Chrome:
+    """
+    Set up Chrome WebDriver with appropriate options.
+    With `profile_dir` the browser uses a persistent user-data directory.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
     options = Options()
     options.add_argument('--headless=new')
     options.add_argument('--no-sandbox')
@@ -74,8 +115,14 @@ def setup_driver() -> webdriver.Chrome:
     options.add_argument('--force-device-scale-factor=1')
     # Disable scrollbars to get clean screenshots
     options.add_argument('--hide-scrollbars')
+    if profile_dir:
+        options.add_argument(f'--user-data-dir={profile_dir}')
     # User agent matching old Puppeteer version
     options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36')
+    if NETWORK_ACCOUNTING:
+        # Network events feed the per-load request/byte accounting; without a reader
+        # the browser would buffer every event until it is recycled
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
     # Use Chromium binary from environment or default path
     chrome_bin = os.environ.get('CHROME_BIN', '/usr/bin/chromium')
@@ -88,19 +135,26 @@ def setup_driver() -> webdriver.Chrome:
         service = Service(chromedriver_path)
     else:
         # Fallback to webdriver-manager for local development
+        from webdriver_manager.chrome import ChromeDriverManager
         service = Service(ChromeDriverManager().install())
 
     driver = webdriver.Chrome(service=service, options=options)
-    driver.set_page_load_timeout(60)
+    # Let the page load time out on its own just before the watchdog would kill the browser
+    driver.set_page_load_timeout(get_stage_budget('navigate'))
 
     # Explicitly set window size to ensure exact viewport dimensions
     driver.set_window_size(VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
 
+    # Skip ads, analytics, fonts and host page images; only the player iframe matters
+    apply_network_budget(driver)
+
     return driver
 
 
 def dismiss_cookie_banner(driver: webdriver.Chrome):
     """Dismiss the cookie notification banner if present (matches old working version)."""
+    from selenium.webdriver.common.by import By
+
     # Primary selector from old working version
     try:
         dismissed = driver.execute_script("""
@@ -110,7 +164,6 @@ def dismiss_cookie_banner(driver: webdriver.Chrome):
         """)
         if dismissed:
             print("Dismissed cookie banner via #d-notification-bar .notification-dismiss")
-            time.sleep(0.5)
             return True
     except:
         pass
@@ -126,7 +179,6 @@ def dismiss_cookie_banner(driver: webdriver.Chrome):
             dismiss_btn = driver.find_element(By.CSS_SELECTOR, selector)
             dismiss_btn.click()
             print(f"Dismissed cookie banner with selector: {selector}")
-            time.sleep(0.5)
             return True
         except:
             continue
@@ -223,19 +275,37 @@ def handle_consent_dialog(driver: webdriver.Chrome, timeout: int = 8) -> bool:
 
     if accepted:
         print("[consent] Accepted cookie/consent dialog")
-        time.sleep(0.5)
     else:
         print("[consent] No consent dialog found or already dismissed")
 
     return accepted
 
 
+def consent_already_given(driver: webdriver.Chrome) -> bool:
+    """
+    Check whether the persistent profile already holds the FundingChoices
+    consent cookie, so the consent stages can be skipped. The cookie is only
+    ever set when FundingChoices is not blocked (see consent_dialog_blocked).
+    """
+    try:
+        names = {cookie.get('name') for cookie in driver.get_cookies()}
+    except Exception:
+        return False
+    return any(name in names for name in CONSENT_COOKIES)
+
+
+def consent_dialog_blocked() -> bool:
+    """Whether network blocking keeps FundingChoices, and so its dialog, from loading."""
+    return is_url_blocked(FUNDING_CHOICES_URL)
+
+
 def click_center_of_iframe(driver: webdriver.Chrome):
     """
     Click the exact center of the current frame/viewport.
     The big play button is typically in the center of the video player.
     """
     from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.by import By
 
     try:
         # Get viewport dimensions
@@ -279,24 +349,34 @@ def click_center_of_iframe(driver: webdriver.Chrome):
     return False
 
 
-def handle_player_in_iframe(driver: webdriver.Chrome):
+def handle_player_in_iframe(driver: webdriver.Chrome, readiness: PageReadiness = None):
     """
     Handle play button and start video in ipcamlive iframe.
     Based on the old working version's tryClickPlayerPlay logic.
     """
+    from selenium.webdriver.common.by import By
+
+    readiness = readiness or PageReadiness(driver)
+
     # First click on body to generate user gesture (as per old version)
     try:
         body = driver.find_element(By.TAG_NAME, 'body')
         body.click()
         print("Clicked body to generate user gesture")
-        time.sleep(0.3)
     except:
         pass
 
     # Click the center of the iframe where the big play button is
     print("Clicking center of iframe for play button...")
     click_center_of_iframe(driver)
-    time.sleep(1)
+
+    # The center click usually starts playback, so skip the selector search if it did
+    if readiness.wait_for('play_click', lambda: driver.execute_script("""
+        var v = document.querySelector('video');
+        return !!(v && !v.paused);
+    """)):
+        print("Video started after center click")
+        return True
 
     # Try JavaScript-based click with case-insensitive matching (like old Puppeteer version)
     try:
@@ -358,7 +438,6 @@ def handle_player_in_iframe(driver: webdriver.Chrome):
         """)
         if clicked:
             print(f"Play button via JS: {clicked}")
-            time.sleep(1)
             return True
     except Exception as e:
         print(f"JS play button click failed: {e}")
@@ -373,7 +452,6 @@ def handle_player_in_iframe(driver: webdriver.Chrome):
         """)
         if played:
             print("Started video playback programmatically")
-            time.sleep(1)
             return True
     except:
         pass
@@ -388,6 +466,7 @@ def hover_video_bottom_right(driver: webdriver.Chrome):
     Based on old version's hoverVideoBottomRight function.
     """
     from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.by import By
 
     try:
         # Find video or player element
@@ -484,7 +563,6 @@ def handle_fullscreen_in_iframe(driver: webdriver.Chrome):
 
         if clicked:
             print(f"Fullscreen button: {clicked}")
-            time.sleep(0.5)
             return True
     except Exception as e:
         print(f"Fullscreen click failed: {e}")
@@ -501,7 +579,6 @@ def handle_fullscreen_in_iframe(driver: webdriver.Chrome):
         """)
         if result:
             print("Entered fullscreen programmatically")
-            time.sleep(0.5)
             return True
     except:
         pass
@@ -510,32 +587,24 @@ def handle_fullscreen_in_iframe(driver: webdriver.Chrome):
     return False
 
 
-def wait_for_video_playing(driver: webdriver.Chrome, timeout: int = 10) -> bool:
-    """Wait for video to be playing."""
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            is_playing = driver.execute_script("""
-                var v = document.querySelector('video');
-                if (v && !v.paused && v.readyState >= 2) return true;
-                return false;
-            """)
-            if is_playing:
-                print("Video is playing")
-                return True
-        except:
-            pass
-        time.sleep(0.5)
+def wait_for_video_playing(driver: webdriver.Chrome, timeout: float = None, readiness: PageReadiness = None) -> bool:
+    """Wait for video to be playing (data available and currentTime advancing)."""
+    readiness = readiness or PageReadiness(driver)
+    if readiness.video_playing(timeout):
+        print("Video is playing")
+        return True
     print("Video playback check timed out")
     return False
 
 
-def find_player_iframe(driver: webdriver.Chrome) -> bool:
+def find_player_iframe(driver: webdriver.Chrome, page_url: str = WEBCAM_URL) -> bool:
     """
     Find and switch to the ipcamlive player iframe.
     Based on old version: finds frame where URL includes 'ipcamlive.com'.
     Returns True if switched successfully.
     """
+    from selenium.webdriver.common.by import By
+
     try:
         iframes = driver.find_elements(By.TAG_NAME, 'iframe')
         print(f"Found {len(iframes)} iframes on page")
@@ -546,6 +615,7 @@ def find_player_iframe(driver: webdriver.Chrome) -> bool:
 
             # Match ipcamlive.com as per old version's PLAYER_FRAME_URL_MATCH
             if 'ipcamlive.com' in src:
+                remember_player_url(page_url, src)
                 driver.switch_to.frame(iframe)
                 print(f"Switched to ipcamlive iframe (index {i})")
                 return True
@@ -557,70 +627,156 @@ def find_player_iframe(driver: webdriver.Chrome) -> bool:
         return False
 
 
-def capture_screenshot(driver: webdriver.Chrome) -> str:
+def capture_video_frame(driver: webdriver.Chrome) -> Optional[bytes]:
+    """
+    Draw the current <video> frame into an offscreen canvas at its native
+    resolution and return it as JPEG bytes. Must be called inside the player iframe.
+    Returns None if there is no decodable frame or the canvas is tainted.
+    """
+    try:
+        result = driver.execute_script("""
+            var quality = arguments[0];
+            var v = document.querySelector('video');
+            if (!v || !v.videoWidth || !v.videoHeight) return null;
+            var canvas = document.createElement('canvas');
+            canvas.width = v.videoWidth;
+            canvas.height = v.videoHeight;
+            canvas.getContext('2d').drawImage(v, 0, 0, canvas.width, canvas.height);
+            try {
+                return canvas.toDataURL('image/jpeg', quality);
+            } catch (e) {
+                return 'error:' + e.name;
+            }
+        """, CANVAS_JPEG_QUALITY)
+    except Exception as e:
+        print(f"Canvas frame capture failed: {e}")
+        return None
+
+    if not result:
+        print("Canvas frame capture: no video frame available")
+        return None
+    if result.startswith('error:'):
+        print(f"Canvas frame capture failed: {result[6:]}")
+        return None
+
+    frame = base64.b64decode(result.split(',', 1)[1])
+    print(f"Captured video frame via canvas ({len(frame)} bytes)")
+    return frame
+
+
+def capture_viewport(driver: webdriver.Chrome) -> Tuple[bytes, bool]:
+    """
+    Capture the viewport as JPEG bytes via CDP Page.captureScreenshot,
+    clipped to the crop box so the crop happens in the browser.
+    Falls back to an in-memory PNG that still needs cropping.
+    Returns (image bytes, apply_crop).
+    """
+    # Log viewport size
+    viewport = driver.execute_script("return {width: window.innerWidth, height: window.innerHeight}")
+    print(f"Viewport size: {viewport['width']}x{viewport['height']}")
+
+    params = {'format': 'jpeg', 'quality': SCREENSHOT_JPEG_QUALITY}
+    box = get_transform().crop_box(viewport['width'], viewport['height'])
+    if box:
+        left, top, right, bottom = box
+        params['clip'] = {'x': left, 'y': top, 'width': right - left, 'height': bottom - top, 'scale': 1}
+
+    try:
+        result = driver.execute_cdp_cmd('Page.captureScreenshot', params)
+        data = base64.b64decode(result['data'])
+        print(f"Captured clipped JPEG screenshot ({len(data)} bytes)")
+        return data, False
+    except Exception as e:
+        print(f"CDP screenshot failed, using PNG screenshot: {e}")
+        return driver.get_screenshot_as_png(), True
+
+
+def capture_screenshot(
+    driver: webdriver.Chrome,
+    page_url: str = WEBCAM_URL,
+    readiness: PageReadiness = None
+) -> Tuple[bytes, bool]:
     """
     Navigate to webcam page, start video playback, and capture screenshot.
     Based on old working version's captureOnce logic.
+    Returns (image bytes, apply_crop): the clipped viewport JPEG or, in canvas
+    mode, a native video frame; only the PNG fallback still needs cropping.
+    Pass `readiness` to inspect which page signals fired afterwards.
     """
     print(f"[{datetime.now()}] Navigating to webcam page...")
-    driver.get(WEBCAM_URL)
-
-    # Wait for page to load (POST_NAV_WAIT_MS in old version)
-    time.sleep(5)
+    with stage('navigate'):
+        driver.get(page_url)
 
+    readiness = readiness or PageReadiness(driver)
     try:
-        # Step 1: Dismiss cookie/notification banner on main page
-        print("Checking for cookie banner...")
-        dismiss_cookie_banner(driver)
-        time.sleep(0.5)
-
-        # Step 2: Handle GDPR/consent dialog (FundingChoices etc.)
-        print("Checking for consent dialog...")
-        handle_consent_dialog(driver)
-        time.sleep(0.5)
+        # Wait for the document and the player iframe instead of a fixed delay
+        with stage('page_ready'):
+            readiness.dom_ready()
+            readiness.iframe_present()
+
+        if consent_already_given(driver):
+            # The persistent profile remembers consent, so no banner or dialog will show
+            print("Consent already given, skipping cookie banner and consent dialog")
+        else:
+            # Step 1: Dismiss cookie/notification banner on main page
+            print("Checking for cookie banner...")
+            with stage('cookie_banner'):
+                dismiss_cookie_banner(driver)
+
+            # Step 2: Handle GDPR/consent dialog (FundingChoices etc.)
+            if consent_dialog_blocked():
+                print("Consent framework blocked, skipping consent dialog")
+            else:
+                print("Checking for consent dialog...")
+                with stage('consent'):
+                    handle_consent_dialog(driver)
 
         # Step 3: Find and switch to the player iframe
         print("Looking for player iframe...")
-        iframe_found = find_player_iframe(driver)
+        with stage('find_iframe'):
+            iframe_found = find_player_iframe(driver, page_url)
 
         if iframe_found:
-            # Wait for iframe content to load
-            time.sleep(2)
-
-            # Step 4: Handle play button inside iframe (click center first)
-            print("Attempting to start video playback...")
-            handle_player_in_iframe(driver)
-
-            # Step 5: Wait for video to actually be playing
-            wait_for_video_playing(driver, timeout=10)
+            # Wait for the player to create its video element
+            with stage('player'):
+                readiness.video_element()
+
+                # Step 4: Handle play button inside iframe (click center first)
+                print("Attempting to start video playback...")
+                handle_player_in_iframe(driver, readiness)
+
+                # Step 5: Wait for video to actually be playing
+                wait_for_video_playing(driver, readiness=readiness)
+
+            # Canvas mode: read the frame straight from the video element, no fullscreen needed
+            if BROWSER_CAPTURE_MODE == 'canvas':
+                with stage('canvas_frame'):
+                    readiness.first_frame()
+                    frame = capture_video_frame(driver)
+                if frame:
+                    driver.switch_to.default_content()
+                    report_readiness(readiness)
+                    return frame, False
+                print("Falling back to fullscreen screenshot")
 
             # Step 6: Click fullscreen/maximize button
             print("Attempting to enter fullscreen...")
-            handle_fullscreen_in_iframe(driver)
+            with stage('fullscreen'):
+                handle_fullscreen_in_iframe(driver)
 
-            # Give video a moment to render in fullscreen
-            time.sleep(2)
+                # Wait for fullscreen layout and a freshly painted frame
+                readiness.fullscreen()
+                readiness.first_frame()
 
             # Switch back to main content for screenshot
             driver.switch_to.default_content()
 
-        # Wait a moment for fullscreen to take effect
-        time.sleep(1)
+        report_readiness(readiness)
 
-        # Take full page screenshot (like old Puppeteer version)
+        # Take viewport screenshot (like old Puppeteer version)
         # If fullscreen worked, video should fill the entire viewport
-        timestamp = datetime.now().strftime('%H-%M-%S')
-        temp_path = os.path.join(get_temp_dir(), f'raw_{timestamp}.png')
-
-        # Log viewport size
-        viewport = driver.execute_script("return {width: window.innerWidth, height: window.innerHeight}")
-        print(f"Viewport size: {viewport['width']}x{viewport['height']}")
-
-        # Take full page screenshot at viewport resolution
-        driver.save_screenshot(temp_path)
-        print(f"Screenshot saved: {temp_path}")
-
-        return temp_path
+        with stage('screenshot'):
+            return capture_viewport(driver)
 
     except Exception as e:
         print(f"Error during capture: {e}")
@@ -630,21 +786,95 @@ def capture_screenshot(driver: webdriver.Chrome) -> str:
         except:
             pass
         # Take screenshot anyway
-        timestamp = datetime.now().strftime('%H-%M-%S')
-        temp_path = os.path.join(get_temp_dir(), f'raw_{timestamp}.png')
-        driver.save_screenshot(temp_path)
-        return temp_path
+        with stage('screenshot', fallback=True):
+            return capture_viewport(driver)
 
 
-def process_screenshot(raw_path: str) -> int:
+def capture_player_direct(
+    driver: webdriver.Chrome,
+    page_url: str,
+    readiness: PageReadiness
+) -> Optional[Tuple[bytes, bool]]:
+    """
+    Navigate straight to the cached player URL for a page, skipping the host
+    page, cookie banner and consent dialog. The load is only accepted once
+    the video is playing; otherwise the cached URL is forgotten and None is
+    returned so the caller rediscovers it through the full page.
+    """
+    player_url = get_cached_player_url(page_url, PLAYER_URL_MAX_AGE)
+    if not player_url:
+        return None
+
+    print(f"[{datetime.now()}] Navigating directly to cached player: {player_url[:80]}")
+    try:
+        with stage('navigate', direct=True):
+            driver.get(player_url)
+
+        with stage('player', direct=True):
+            readiness.dom_ready()
+            playing = readiness.video_element()
+            if playing:
+                handle_player_in_iframe(driver, readiness)
+                playing = wait_for_video_playing(driver, readiness=readiness)
+
+        if not playing:
+            print("Cached player did not start playing, rediscovering through the webcam page")
+            forget_player_url(page_url)
+            return None
+
+        if BROWSER_CAPTURE_MODE == 'canvas':
+            with stage('canvas_frame'):
+                readiness.first_frame()
+                frame = capture_video_frame(driver)
+            if frame:
+                report_readiness(readiness)
+                return frame, False
+            print("Falling back to fullscreen screenshot")
+
+        # The player is the top-level document here, so no frame switching is needed
+        with stage('fullscreen'):
+            handle_fullscreen_in_iframe(driver)
+            readiness.fullscreen()
+            readiness.first_frame()
+
+        report_readiness(readiness)
+        with stage('screenshot'):
+            return capture_viewport(driver)
+
+    except Exception as e:
+        print(f"Direct player capture failed: {e}")
+        forget_player_url(page_url)
+        return None
+
+
+def report_readiness(readiness: PageReadiness) -> None:
+    """Log readiness timings and export them as metrics."""
+    print(f"[ready] {readiness.summary()}")
+    for signal_name, elapsed in readiness.timings.items():
+        if elapsed is not None:
+            READY_SIGNAL_DURATION.observe(elapsed, signal=signal_name)
+
+
+def process_screenshot(
+    raw: bytes,
+    apply_crop: bool = True,
+    camera_id: str = 'default',
+    retry_duplicates: bool = False
+) -> int:
     """
     Process screenshot (crop/resize) and save to database WITHOUT overlay.
     Weather metadata is still fetched and stored for later overlay application.
+    `raw` is the encoded image in memory; frames that are already clipped or
+    are native video frames (stream or canvas) skip the crop.
+    A frame whose fingerprint nearly matches the camera's previous capture
+    returns DUPLICATE_FRAME when `retry_duplicates` is set, otherwise it is
+    stored per DUPLICATE_ACTION.
     Returns the capture ID.
     """
     # Get weather data (still needed for metadata storage)
     print("Fetching weather data...")
-    weather = get_all_weather()
+    with span('weather'):
+        weather = get_all_weather()
 
     alicante = weather.get('alicante')
     bratislava = weather.get('bratislava')
@@ -657,71 +887,66 @@ def process_screenshot(raw_path: str) -> int:
     # Process image (crop and resize) WITHOUT overlay
     print("Processing image (no overlay)...")
     try:
-        image = Image.open(raw_path)
-
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-
-        # Crop based on environment variables (percentages 0-100)
-        img_width, img_height = image.size
-
-        x1 = float(os.environ.get('CROP_X1', '0')) / 100
-        y1 = float(os.environ.get('CROP_Y1', '0')) / 100
-        x2 = float(os.environ.get('CROP_X2', '100')) / 100
-        y2 = float(os.environ.get('CROP_Y2', '100')) / 100
-
-        left = int(img_width * x1)
-        top = int(img_height * y1)
-        right = int(img_width * x2)
-        bottom = int(img_height * y2)
-
-        # Clamp to image bounds
-        left = max(0, left)
-        top = max(0, top)
-        right = min(right, img_width)
-        bottom = min(bottom, img_height)
-
-        if right > left and bottom > top:
-            image = image.crop((left, top, right, bottom))
-
-        # Resize to target dimensions
-        target_width = int(os.environ.get('OUTPUT_WIDTH', '800'))
-        target_height = int(os.environ.get('OUTPUT_HEIGHT', '450'))
-        image = image.resize((target_width, target_height), Image.LANCZOS)
-
-        width, height = image.size
+        with span('resize'):
+            # Crop (CROP_X1..CROP_Y2 percentages) and resize to OUTPUT_WIDTH x OUTPUT_HEIGHT
+            image = transform(raw, apply_crop=apply_crop)
+            width, height = image.size
+            fingerprint = compute_fingerprint(image)
+            # Brightness class for daylight selection without decoding stored JPEGs
+            frame_stats = compute_frame_stats(image)
 
     except Exception as e:
         print(f"Failed to process image: {e}")
-        try:
-            os.remove(raw_path)
-        except:
-            pass
         return None
 
-    # Convert image to JPEG bytes
-    img_buffer = io.BytesIO()
-    image.save(img_buffer, 'JPEG', quality=90)
-    image_data = img_buffer.getvalue()
+    # Compare against the previous frame to catch stalled streams and static posters
+    duplicate_of = None
+    with span('duplicate_check'):
+        previous = get_latest_fingerprint(camera_id)
+    if previous and is_near_duplicate(
+        fingerprint, previous['fingerprint'], frame_stats['luminance'], previous['luminance']
+    ):
+        distance = hamming_distance(fingerprint, previous['fingerprint'])
+        print(f"Near-duplicate of capture {previous['image_id']} (distance {distance})")
+        if retry_duplicates:
+            return DUPLICATE_FRAME
+        if DUPLICATE_ACTION == 'reference':
+            duplicate_of = previous['image_id']
+
+    renditions = []
+    if duplicate_of:
+        # Reference the earlier frame (and its renditions) instead of storing another blob
+        image_data = b''
+        image_format = get_storage_format()
+    else:
+        # Encode in the configured storage format (IMAGE_FORMAT, optionally to a byte budget),
+        # with the downscaled renditions encoded on worker threads meanwhile
+        with span('encode'):
+            futures = submit_renditions(image, get_storage_format())
+            image_data, image_format = encode_capture(image)
+            renditions = [future.result() for future in futures]
 
     # Save to database (clean image, weather metadata stored separately)
     print("Saving capture to database...")
-    capture_id = save_capture(
-        image_data=image_data,
-        alicante_weather=alicante,
-        bratislava_weather=bratislava,
-        width=width,
-        height=height
-    )
-
-    # Clean up temp file
-    try:
-        os.remove(raw_path)
-    except:
-        pass
+    with span('save_capture', bytes=len(image_data)):
+        capture_id = save_capture(
+            image_data=image_data,
+            alicante_weather=alicante,
+            bratislava_weather=bratislava,
+            width=width,
+            height=height,
+            camera_id=camera_id,
+            fingerprint=fingerprint,
+            duplicate_of=duplicate_of,
+            image_format=image_format,
+            renditions=renditions,
+            frame_stats=frame_stats
+        )
 
     if capture_id:
+        BYTES_STORED_TOTAL.inc(len(image_data), camera=camera_id)
+        # Overlay and append to the hour's timelapse segment in the background (TIMELAPSE_SEGMENTS)
+        submit_timelapse_frame(camera_id, capture_id, image, alicante, bratislava, frame_stats['light_class'])
         print(f"Capture saved to database with ID: {capture_id}")
         return capture_id
     else:
@@ -729,45 +954,137 @@ def process_screenshot(raw_path: str) -> int:
         return None
 
 
-def get_next_interval() -> int:
-    """Get the next interval with random jitter."""
-    jitter = random.randint(-INTERVAL_JITTER, INTERVAL_JITTER)
-    interval = SCREENSHOT_INTERVAL + jitter
-    return max(60, interval)  # Minimum 1 minute
+def report_capture(capture_id: int, camera: Dict) -> None:
+    """Log the outcome of a processed capture."""
+    if capture_id:
+        print(f"Capture complete: {camera['id']} ID {capture_id}")
+    else:
+        print(f"Capture failed to save to database: {camera['id']}")
+
+
+def capture_with_browser(session: BrowserSession, camera: Dict, retry_duplicates: bool = False) -> Optional[int]:
+    """
+    Capture one camera through the browser, reusing the session's driver.
+    The browser stages run under a watchdog that kills the browser process
+    tree when a stage budget or the capture deadline is overrun.
+    """
+    captured = False
+    capture_id = None
+    raw = None
+    try:
+        with guard(session.kill, label=camera['id']) as watchdog:
+            try:
+                with stage('browser_acquire'):
+                    driver = session.acquire()
+                drain_performance_log(driver)
+                readiness = PageReadiness(driver)
+                direct = capture_player_direct(driver, camera['url'], readiness) if PLAYER_DIRECT else None
+                if direct:
+                    raw, apply_crop = direct
+                else:
+                    readiness = PageReadiness(driver)
+                    raw, apply_crop = capture_screenshot(driver, camera['url'], readiness)
+            finally:
+                if watchdog and watchdog.tripped:
+                    print(f"Capture of {camera['id']} aborted by watchdog in stage '{watchdog.tripped}'")
+                    raw = None
+        # A page whose video never played counts as failed, so a broken profile gets reset
+        captured = bool(raw) and readiness.timings.get('video_playing') is not None
+        report_page_load(driver)
+        CHROMIUM_RSS_BYTES.set(session.get_rss_bytes(), browser=session.name)
+        if raw:
+            capture_id = process_screenshot(raw, apply_crop=apply_crop, camera_id=camera['id'],
+                                            retry_duplicates=retry_duplicates)
+    except Exception as e:
+        print(f"Error during capture cycle for {camera['id']}: {e}")
+    finally:
+        session.release(success=captured)
+        # The browser is only a fallback for the stream backend, don't keep it resident
+        if CAPTURE_BACKEND == 'stream':
+            session.close()
+    return capture_id
+
+
+def capture_camera(camera: Dict, pool: BrowserPool = None, retry_duplicates: bool = False,
+                   use_stream: bool = True) -> Optional[int]:
+    """Capture and store one frame for a camera; returns the capture ID or DUPLICATE_FRAME."""
+    # Stream backend: grab a frame over HTTP and only fall back to the browser on failure
+    if CAPTURE_BACKEND == 'stream' and use_stream:
+        try:
+            with span('stream_grab'):
+                frame = capture_stream_frame(camera['url'])
+        except Exception as e:
+            print(f"[stream] Unexpected error: {e}")
+            frame = None
+        if frame:
+            return process_screenshot(frame, apply_crop=False, camera_id=camera['id'],
+                                      retry_duplicates=retry_duplicates)
+        print("[stream] Falling back to browser capture")
+
+    if pool:
+        with pool.session() as session:
+            return capture_with_browser(session, camera, retry_duplicates)
+
+    # A separate profile so a one-off run never shares a directory with the running pool
+    session = BrowserSession(setup_driver, name='browser-once', profile_dir=get_profile_dir('browser-once'))
+    try:
+        return capture_with_browser(session, camera, retry_duplicates)
+    finally:
+        session.close()
+
 
+def run_once(camera: Dict = None, pool: BrowserPool = None):
+    """
+    Run a single capture cycle for one camera.
+    With a BrowserPool a pooled driver is reused across cycles,
+    otherwise a fresh browser is started and quit.
+    """
+    camera = camera or get_default_camera()
 
-def run_once():
-    """Run a single capture cycle."""
     # Initialize database
     if not init_database():
         print("Failed to initialize database")
         return
 
-    driver = None
-    try:
-        driver = setup_driver()
-        raw_path = capture_screenshot(driver)
-        if raw_path:
-            capture_id = process_screenshot(raw_path)
-            if capture_id:
-                print(f"Capture complete: ID {capture_id}")
-            else:
-                print("Capture failed to save to database")
-    except Exception as e:
-        print(f"Error during capture cycle: {e}")
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+    for attempt in range(DUPLICATE_RETRIES + 1):
+        # A near-duplicate is retried through a freshly loaded page, not the possibly frozen stream
+        with trace(camera=camera['id'], attempt=attempt), span('capture'):
+            capture_id = capture_camera(
+                camera, pool,
+                retry_duplicates=attempt < DUPLICATE_RETRIES,
+                use_stream=attempt == 0
+            )
+        if capture_id == DUPLICATE_FRAME:
+            CAPTURES_TOTAL.inc(camera=camera['id'], result='duplicate')
+            print(f"Near-duplicate frame for {camera['id']}, retrying with a fresh page...")
+            continue
+        CAPTURES_TOTAL.inc(camera=camera['id'], result='ok' if capture_id else 'failed')
+        report_capture(capture_id, camera)
+        return
+
+
+def run_all_cameras(cameras: List[Dict], pool: BrowserPool, executor: ThreadPoolExecutor) -> None:
+    """Capture all cameras concurrently, bounded by the browser pool size."""
+    futures = [executor.submit(run_once, camera, pool) for camera in cameras]
+    for camera, future in zip(cameras, futures):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error in capture cycle for {camera['id']}: {e}")
 
 
 def run_continuous():
     """Run continuous capture loop."""
+    cameras = load_cameras()
+
     print(f"Starting continuous capture...")
-    print(f"Target URL: {WEBCAM_URL}")
-    print(f"Interval: {SCREENSHOT_INTERVAL}s ± {INTERVAL_JITTER}s")
+    for camera in cameras:
+        print(f"Camera {camera['id']}: {camera['url']}")
+    print(f"Interval: {SCREENSHOT_INTERVAL}s ± {INTERVAL_JITTER}s (overrun policy: {OVERRUN_POLICY})")
+    print(f"Persistent browser: {BROWSER_PERSISTENT}")
+    print(f"Browser pool size: {BROWSER_POOL_SIZE}")
+    print(f"Persistent browser profile: {BROWSER_PROFILE}")
+    print(f"Capture backend: {CAPTURE_BACKEND}")
 
     # Initialize database
     print("Initializing database...")
@@ -777,37 +1094,63 @@ def run_continuous():
     print("Database initialized successfully")
 
     # Handle graceful shutdown
-    running = True
+    stop_event = threading.Event()
 
     def signal_handler(signum, frame):
-        nonlocal running
         print("\nShutting down...")
-        running = False
+        stop_event.set()
+        # Don't wait for a capture stuck in the browser
+        aborted = abort_active_captures('shutdown')
+        if aborted:
+            print(f"Aborted {aborted} running capture(s)")
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    while running:
+    start_metrics_server()
+
+    # A fixed number of browsers caps CPU and memory no matter how many cameras there are
+    pool = BrowserPool(setup_driver, size=BROWSER_POOL_SIZE, persistent=BROWSER_PERSISTENT)
+    executor = ThreadPoolExecutor(max_workers=min(len(cameras), BROWSER_POOL_SIZE))
+
+    if CADENCE_MODE == 'sun':
+        # Dense captures around sunrise/sunset, sparse at night
+        cadence = CadencePolicy()
+        print(f"Cadence policy: {cadence.policy}")
+        scheduler = AlignedScheduler(
+            SCREENSHOT_INTERVAL, INTERVAL_JITTER, OVERRUN_POLICY,
+            interval_fn=cadence.interval_at,
+            step=math.gcd(*cadence.intervals)
+        )
+    else:
+        scheduler = AlignedScheduler(SCREENSHOT_INTERVAL, INTERVAL_JITTER, OVERRUN_POLICY)
+
+    while not stop_event.is_set():
+        tick = scheduler.wait_next(stop_event)
+        if tick is None:
+            break
+        SCHEDULE_LATENESS.observe(tick['lateness'])
+        if tick['lateness'] >= 1:
+            print(f"[schedule] Tick started {tick['lateness']:.1f}s late")
+
         try:
-            run_once()
+            run_all_cameras(cameras, pool, executor)
         except Exception as e:
             print(f"Error in capture cycle: {e}")
 
-        if running:
-            next_interval = get_next_interval()
-            print(f"Next capture in {next_interval} seconds...")
-
-            # Sleep in small increments to allow graceful shutdown
-            for _ in range(next_interval):
-                if not running:
-                    break
-                time.sleep(1)
+        stats = scheduler.get_stats()
+        SCHEDULE_SKIPPED.set(stats['skipped'])
+        print(f"[schedule] ticks={stats['ticks']} skipped={stats['skipped']} caught_up={stats['caught_up']} "
+              f"lateness mean={stats['mean_lateness']:.1f}s p95={stats['p95_lateness']:.1f}s max={stats['max_lateness']:.1f}s")
 
+    executor.shutdown(wait=True)
+    pool.close()
     print("Scraper stopped.")
 
 
 if __name__ == '__main__':
     if len(sys.argv) > 1 and sys.argv[1] == '--once':
-        run_once()
+        for camera in load_cameras():
+            run_once(camera)
     else:
         run_continuous()
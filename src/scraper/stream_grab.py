@@ -0,0 +1,327 @@
+"""
+Direct Stream Frame Grab
+Resolves the ipcamlive player's underlying stream (HLS playlist or snapshot
+endpoint) and pulls a single frame over HTTP, without a browser
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import subprocess
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urljoin, urlparse, parse_qs
+
+# requests is imported by the functions that fetch, so the cache helpers stay light
+if TYPE_CHECKING:
+    import requests
+
+
+CACHE_FILE = 'stream_cache.json'
+HTTP_TIMEOUT = int(os.environ.get('STREAM_HTTP_TIMEOUT', '15'))
+FFMPEG_BIN = os.environ.get('FFMPEG_BIN', 'ffmpeg')
+STREAM_STATE_URL = 'https://g0.ipcamlive.com/player/getcamerastreamstate.php'
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+
+PLAYER_IFRAME_PATTERN = re.compile(r'<iframe[^>]+src=["\']([^"\']*ipcamlive\.com[^"\']*)["\']', re.IGNORECASE)
+STREAM_URL_PATTERN = re.compile(r'(https?:)?//[^"\'\s]+\.m3u8[^"\'\s]*', re.IGNORECASE)
+
+# Cameras are captured from several threads; serialize read-modify-write of the cache file
+_cache_lock = threading.Lock()
+
+
+def get_storage_path() -> str:
+    """Get storage path from environment variable."""
+    return os.environ.get('OUTPUT_DIR', '/data')
+
+
+def get_cache_path() -> str:
+    """Get cache file path."""
+    metadata_path = os.path.join(get_storage_path(), 'metadata')
+    os.makedirs(metadata_path, exist_ok=True)
+    return os.path.join(metadata_path, CACHE_FILE)
+
+
+def load_cache() -> Dict:
+    """Load stream cache from file."""
+    cache_path = get_cache_path()
+    try:
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        pass
+    return {}
+
+
+def save_cache(cache: Dict) -> None:
+    """Save stream cache to file."""
+    try:
+        with open(get_cache_path(), 'w') as f:
+            json.dump(cache, f)
+    except IOError as e:
+        print(f"Warning: Could not save stream cache: {e}")
+
+
+def update_cache_entry(page_url: str, **fields) -> None:
+    """Update the cached stream details for a webcam page."""
+    with _cache_lock:
+        cache = load_cache()
+        entry = cache.get(page_url, {})
+        entry.update(fields)
+        cache[page_url] = entry
+        save_cache(cache)
+
+
+def remember_player_url(page_url: str, player_url: str) -> None:
+    """Record the player iframe URL discovered for a webcam page."""
+    with _cache_lock:
+        cache = load_cache()
+        entry = cache.get(page_url, {})
+        if entry.get('player_url') != player_url:
+            # A new player invalidates any stream resolved from the old one
+            entry = {'player_url': player_url}
+        entry['player_discovered_at'] = datetime.now().isoformat()
+        cache[page_url] = entry
+        save_cache(cache)
+
+
+def get_cached_player_url(page_url: str, max_age: int = 0) -> Optional[str]:
+    """Get the remembered player URL for a page, unless it is older than `max_age` seconds (0 = any age)."""
+    entry = load_cache().get(page_url, {})
+    player_url = entry.get('player_url')
+    if not player_url:
+        return None
+    if max_age > 0:
+        try:
+            discovered = datetime.fromisoformat(entry['player_discovered_at'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if (datetime.now() - discovered).total_seconds() > max_age:
+            return None
+    return player_url
+
+
+def forget_player_url(page_url: str) -> None:
+    """Drop a player URL that no longer works so the next capture rediscovers it."""
+    with _cache_lock:
+        cache = load_cache()
+        if cache.pop(page_url, None) is not None:
+            save_cache(cache)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """GET a URL with the scraper's user agent and timeout."""
+    import requests
+
+    headers = kwargs.pop('headers', {})
+    headers.setdefault('User-Agent', USER_AGENT)
+    response = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def resolve_player_url(page_url: str) -> Optional[str]:
+    """Get the ipcamlive player URL for a page, from cache or the page HTML."""
+    import requests
+
+    entry = load_cache().get(page_url, {})
+    if entry.get('player_url'):
+        return entry['player_url']
+
+    try:
+        html = http_get(page_url).text
+    except requests.RequestException as e:
+        print(f"[stream] Failed to fetch webcam page: {e}")
+        return None
+
+    match = PLAYER_IFRAME_PATTERN.search(html)
+    if not match:
+        print("[stream] No ipcamlive iframe in page HTML")
+        return None
+
+    player_url = urljoin(page_url, match.group(1).replace('&amp;', '&'))
+    remember_player_url(page_url, player_url)
+    return player_url
+
+
+def resolve_stream_url(player_url: str) -> Optional[str]:
+    """
+    Resolve the stream URL behind an ipcamlive player.
+    Uses the player's stream state API, falling back to scanning the player HTML.
+    """
+    import requests
+
+    alias = parse_qs(urlparse(player_url).query).get('alias', [None])[0]
+    if alias:
+        try:
+            state = http_get(STREAM_STATE_URL, params={'alias': alias, 'targetdomain': urlparse(player_url).netloc}).json()
+            details = state.get('details') or {}
+            address = details.get('address')
+            stream_id = details.get('streamid')
+            if address and stream_id:
+                return urljoin(address, f'streams/{stream_id}/stream.m3u8')
+        except (requests.RequestException, ValueError) as e:
+            print(f"[stream] Stream state lookup failed: {e}")
+
+    try:
+        html = http_get(player_url).text
+    except requests.RequestException as e:
+        print(f"[stream] Failed to fetch player page: {e}")
+        return None
+
+    match = STREAM_URL_PATTERN.search(html)
+    if match:
+        url = match.group(0)
+        return f'https:{url}' if url.startswith('//') else url
+
+    return None
+
+
+def parse_playlist(text: str, base_url: str) -> Dict:
+    """Parse an HLS playlist into variant, init-segment and media-segment URLs."""
+    variants = []
+    segments = []
+    init_segment = None
+    variant_bandwidth = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-STREAM-INF'):
+            match = re.search(r'BANDWIDTH=(\d+)', line)
+            variant_bandwidth = int(match.group(1)) if match else 0
+        elif line.startswith('#EXT-X-MAP'):
+            match = re.search(r'URI="([^"]+)"', line)
+            if match:
+                init_segment = urljoin(base_url, match.group(1))
+        elif not line.startswith('#'):
+            url = urljoin(base_url, line)
+            if variant_bandwidth is not None:
+                variants.append((variant_bandwidth, url))
+                variant_bandwidth = None
+            else:
+                segments.append(url)
+
+    return {'variants': variants, 'segments': segments, 'init_segment': init_segment}
+
+
+def decode_first_frame(data: bytes) -> Optional[bytes]:
+    """Decode the first video frame of a media segment to JPEG bytes via ffmpeg."""
+    try:
+        result = subprocess.run(
+            [FFMPEG_BIN, '-hide_banner', '-loglevel', 'error',
+             '-i', 'pipe:0',
+             '-frames:v', '1',
+             '-f', 'image2pipe', '-vcodec', 'mjpeg', '-q:v', '2',
+             'pipe:1'],
+            input=data,
+            capture_output=True,
+            timeout=HTTP_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"[stream] ffmpeg decode failed: {e}")
+        return None
+
+    if result.returncode != 0 or not result.stdout:
+        print(f"[stream] ffmpeg decode failed: {result.stderr.decode(errors='replace')[-300:]}")
+        return None
+    return result.stdout
+
+
+def grab_hls_frame(playlist_url: str) -> Optional[bytes]:
+    """Fetch the newest segment of an HLS stream and decode its first keyframe."""
+    playlist = parse_playlist(http_get(playlist_url).text, playlist_url)
+
+    # Master playlist: follow the highest bandwidth variant
+    if playlist['variants'] and not playlist['segments']:
+        _, variant_url = max(playlist['variants'])
+        playlist = parse_playlist(http_get(variant_url).text, variant_url)
+
+    if not playlist['segments']:
+        print("[stream] Playlist has no segments")
+        return None
+
+    data = b''
+    if playlist['init_segment']:
+        data = http_get(playlist['init_segment']).content
+    data += http_get(playlist['segments'][-1]).content
+    return decode_first_frame(data)
+
+
+def grab_frame(stream_url: str) -> Optional[bytes]:
+    """Grab a single frame as JPEG bytes from an HLS playlist or snapshot URL."""
+    path = urlparse(stream_url).path.lower()
+    if path.endswith('.m3u8'):
+        return grab_hls_frame(stream_url)
+
+    response = http_get(stream_url)
+    if not response.headers.get('Content-Type', '').startswith('image/'):
+        print(f"[stream] Unexpected snapshot content type: {response.headers.get('Content-Type')}")
+        return None
+    return response.content
+
+
+def capture_stream_frame(page_url: str) -> Optional[bytes]:
+    """
+    Capture one frame for a webcam page directly from its stream.
+    The stream URL is resolved once and cached; on failure it is re-resolved once.
+    Returns JPEG bytes, or None so the caller can fall back to the browser.
+    """
+    import requests
+
+    override_url = os.environ.get('STREAM_URL')
+    if override_url:
+        try:
+            return grab_frame(override_url)
+        except requests.RequestException as e:
+            print(f"[stream] Frame grab failed: {e}")
+            return None
+
+    for attempt in range(2):
+        entry = load_cache().get(page_url, {})
+        stream_url = entry.get('stream_url')
+
+        if not stream_url:
+            player_url = resolve_player_url(page_url)
+            if not player_url:
+                return None
+            stream_url = resolve_stream_url(player_url)
+            if not stream_url:
+                print("[stream] Could not resolve stream URL")
+                return None
+            print(f"[stream] Resolved stream URL: {stream_url}")
+            update_cache_entry(page_url, stream_url=stream_url, stream_resolved_at=datetime.now().isoformat())
+
+        try:
+            frame = grab_frame(stream_url)
+            if frame:
+                return frame
+        except requests.RequestException as e:
+            print(f"[stream] Frame grab failed: {e}")
+
+        # Stream addresses rotate between ipcamlive servers, so re-resolve once
+        update_cache_entry(page_url, stream_url=None)
+
+    return None
+
+
+if __name__ == '__main__':
+    # Test frame grab against a stream URL (e.g. a local HTTP server serving an HLS playlist)
+    if len(sys.argv) < 2:
+        print("Usage: python stream_grab.py <playlist.m3u8|snapshot url> [output.jpg]")
+        sys.exit(1)
+
+    frame = grab_frame(sys.argv[1])
+    if not frame:
+        print("Failed to grab frame")
+        sys.exit(1)
+
+    output_path = sys.argv[2] if len(sys.argv) > 2 else '/tmp/test_stream_frame.jpg'
+    with open(output_path, 'wb') as f:
+        f.write(frame)
+    print(f"Grabbed {len(frame)} bytes to {output_path}")
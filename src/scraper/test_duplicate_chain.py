@@ -0,0 +1,100 @@
+"""
+Duplicate Chain Test
+A slow fade stored one small step at a time must stop referencing the first
+frame once it has drifted past the duplicate thresholds.
+
+Runs get_latest_fingerprint against an in-memory SQLite table:
+    python -m pytest test_duplicate_chain.py
+"""
+import sqlite3
+import unittest
+from unittest import mock
+
+import database
+from fingerprint import is_near_duplicate
+
+
+class SQLiteConnection:
+    """Just enough of a mysql.connector connection for get_latest_fingerprint."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def cursor(self, dictionary: bool = False, **options):
+        return SQLiteCursor(self.db.cursor(), dictionary)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool):
+        self.cursor = cursor
+        self.dictionary = dictionary
+
+    def execute(self, sql: str, params=()) -> None:
+        self.cursor.execute(sql.replace('%s', '?'), params)
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip([column[0] for column in self.cursor.description], row))
+
+    def close(self) -> None:
+        self.cursor.close()
+
+
+class DuplicateChainTest(unittest.TestCase):
+    FINGERPRINT = 0x0F0F0F0F0F0F0F0F
+
+    def setUp(self):
+        self.db = sqlite3.connect(':memory:')
+        self.db.execute('''
+            CREATE TABLE captures (
+                id INTEGER PRIMARY KEY,
+                camera_id TEXT,
+                capture_date TEXT,
+                capture_time TEXT,
+                fingerprint INTEGER,
+                luminance REAL,
+                duplicate_of INTEGER
+            )
+        ''')
+        patcher = mock.patch.object(database, 'get_connection', lambda **options: SQLiteConnection(self.db))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.db.close)
+
+    def capture(self, minute: int, luminance: float):
+        """Store a frame the way process_screenshot does and return its duplicate_of."""
+        previous = database.get_latest_fingerprint('default')
+        duplicate_of = None
+        if previous and is_near_duplicate(
+            self.FINGERPRINT, previous['fingerprint'], luminance, previous['luminance'],
+            threshold=2, luminance_delta=2
+        ):
+            duplicate_of = previous['image_id']
+        self.db.execute(
+            'INSERT INTO captures (camera_id, capture_date, capture_time, fingerprint, luminance, duplicate_of) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            ('default', '2026-10-17', f'18:{minute:02d}:00', self.FINGERPRINT, luminance, duplicate_of)
+        )
+        return duplicate_of
+
+    def test_fade_stops_referencing_first_frame(self):
+        # Each frame is 1.0 darker than the one before: always within the delta of its
+        # predecessor, but only within the delta of the stored frame for two steps
+        references = [self.capture(minute, 100.0 - minute) for minute in range(7)]
+        self.assertEqual(references, [None, 1, 1, None, 4, 4, None])
+
+    def test_static_scene_keeps_referencing_first_frame(self):
+        references = [self.capture(minute, 100.0) for minute in range(5)]
+        self.assertEqual(references, [None, 1, 1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
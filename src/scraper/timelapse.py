@@ -0,0 +1,420 @@
+"""
+Timelapse Segments
+Appends each capture, with its overlay, to a per-hour segment as it arrives so
+daily and daylight videos become stream-copy concatenations of finished segments
+"""
+from __future__ import annotations
+
+import io
+import os
+import sys
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from cameras import DEFAULT_CAMERA_ID
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+TIMELAPSE_SEGMENTS = os.environ.get('TIMELAPSE_SEGMENTS', 'false').lower() in ('1', 'true', 'yes')
+TIMELAPSE_DIR = os.environ.get('TIMELAPSE_DIR', os.path.join(os.environ.get('OUTPUT_DIR', '/data'), 'segments'))
+TIMEZONE = ZoneInfo('Europe/Madrid')
+# Must match the server's daily videos so segments and full renders look the same
+FRAME_RATE = 30
+# An hour's segment is final this long after the hour ends (late saves still land in it)
+SEGMENT_GRACE = timedelta(minutes=5)
+# x264 settings for segments and re-encoded cuts (the default GOP, like the server's
+# renders). stitchable keeps the stream headers independent of the content so
+# segments and cuts concatenate with stream copy; without B-frames frame i of a
+# segment is at i / FRAME_RATE
+ENCODE_ARGS = [
+    '-c:v', 'libx264',
+    '-pix_fmt', 'yuv420p',
+    '-preset', 'medium',
+    '-crf', '23',
+    '-bf', '0',
+    '-x264-params', 'stitchable=1',
+    '-r', str(FRAME_RATE)
+]
+# Exit code when there are no usable segments (argparse uses 2 for usage errors)
+NO_SEGMENTS_EXIT_CODE = 3
+
+# One thread keeps appends in capture order and off the capture path
+_executor = None
+# Camera workers submit concurrently; only one of them may create the executor
+_executor_lock = threading.Lock()
+
+
+def get_segment_dir(camera_id: str, day: date) -> str:
+    """Directory holding a camera's segments for a day."""
+    return os.path.join(TIMELAPSE_DIR, camera_id, day.isoformat())
+
+
+def get_segment_paths(segment_dir: str, hour: int) -> Dict[str, str]:
+    """Paths of an hour's spool (overlaid JPEGs), frame index and encoded segment."""
+    base = os.path.join(segment_dir, f'{hour:02d}')
+    return {'spool': base + '.mjpeg', 'index': base + '.idx', 'segment': base + '.mp4'}
+
+
+def read_index(index_path: str) -> List[Tuple[int, str, int, Optional[str]]]:
+    """
+    Read an hour's frames as (capture_id, HH:MM:SS, spool end offset, light class),
+    in order. The light class is None for unclassified frames and older indexes.
+    """
+    if not os.path.exists(index_path):
+        return []
+    frames = []
+    with open(index_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3:
+                frames.append((int(parts[0]), parts[1], int(parts[2]), None))
+            elif len(parts) == 4:
+                frames.append((int(parts[0]), parts[1], int(parts[2]), None if parts[3] == '-' else parts[3]))
+    return frames
+
+
+def normalize_time(value: Optional[str]) -> Optional[str]:
+    """Pad HH:MM to HH:MM:SS so range bounds compare with index times like MariaDB TIME does."""
+    if value and len(value) == 5:
+        return value + ':00'
+    return value
+
+
+def is_selected(
+    frame_time: str,
+    light_class: Optional[str],
+    time_from: Optional[str],
+    time_to: Optional[str],
+    light_classes: Optional[List[str]]
+) -> bool:
+    """
+    Whether a frame belongs in a video, by the same rule as iter_captures: with
+    `light_classes`, classified frames are selected by class and the times only
+    apply to unclassified ones.
+    """
+    if light_classes and light_class is not None:
+        return light_class in light_classes
+    return (not time_from or frame_time >= time_from) and (not time_to or frame_time <= time_to)
+
+
+def render_segment_frame(
+    image: Image.Image,
+    alicante_weather: Optional[Dict],
+    bratislava_weather: Optional[Dict],
+    day: date
+) -> bytes:
+    """Overlay a processed frame and encode it as a JPEG spool frame."""
+    from overlay import render_overlay
+
+    buffer = io.BytesIO()
+    render_overlay(image, alicante_weather, bratislava_weather, day).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def append_capture(
+    camera_id: str,
+    capture_id: int,
+    image: Image.Image,
+    alicante_weather: Optional[Dict],
+    bratislava_weather: Optional[Dict],
+    captured_at: Optional[datetime] = None,
+    light_class: Optional[str] = None
+) -> None:
+    """
+    Append a saved capture to its hour's spool and encode the camera's
+    earlier hours that are now complete.
+    """
+    captured_at = captured_at or datetime.now(TIMEZONE)
+    segment_dir = get_segment_dir(camera_id, captured_at.date())
+    os.makedirs(segment_dir, exist_ok=True)
+    paths = get_segment_paths(segment_dir, captured_at.hour)
+
+    frame = render_segment_frame(image, alicante_weather, bratislava_weather, captured_at.date())
+    with open(paths['spool'], 'ab') as spool:
+        spool.write(frame)
+        spool.flush()
+        end = spool.tell()
+    # The index is written after the frame, so readers only see complete frames
+    with open(paths['index'], 'a') as index:
+        index.write(f"{capture_id} {captured_at.strftime('%H:%M:%S')} {end} {light_class or '-'}\n")
+
+    finalize_segments(camera_id, captured_at)
+
+
+def submit_capture(
+    camera_id: str,
+    capture_id: int,
+    image: Image.Image,
+    alicante_weather: Optional[Dict],
+    bratislava_weather: Optional[Dict],
+    light_class: Optional[str] = None
+) -> Optional[Future]:
+    """
+    Queue a capture for its segment (no-op unless TIMELAPSE_SEGMENTS is set).
+    The light class is kept in the index so videos select the frames a full render would.
+    """
+    global _executor
+    if not TIMELAPSE_SEGMENTS:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='timelapse')
+
+    captured_at = datetime.now(TIMEZONE)
+
+    def run():
+        try:
+            append_capture(camera_id, capture_id, image, alicante_weather, bratislava_weather, captured_at, light_class)
+        except Exception as e:
+            print(f"[timelapse] Failed to append capture {capture_id}: {e}")
+
+    return _executor.submit(run)
+
+
+def is_hour_complete(day: date, hour: int, now: Optional[datetime] = None) -> bool:
+    """Whether no more captures can arrive for an hour."""
+    now = now or datetime.now(TIMEZONE)
+    hour_end = datetime.combine(day, time(hour), TIMEZONE) + timedelta(hours=1)
+    return now >= hour_end + SEGMENT_GRACE
+
+
+def run_ffmpeg(args: List[str], output_path: str, data: Optional[bytes] = None) -> None:
+    """Run ffmpeg to write `output_path`; on failure remove it and raise RuntimeError."""
+    result = subprocess.run(['ffmpeg', '-y', '-loglevel', 'error'] + args + [output_path], input=data, capture_output=True)
+    if result.returncode != 0:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr[-500:].decode(errors='replace')}")
+
+
+def encode_segment(paths: Dict[str, str], finished: bool) -> bool:
+    """
+    Encode an hour's spooled frames into an MP4 segment. A finished hour's
+    spool is removed; an unfinished one keeps growing and is encoded again
+    later. Returns False when there was nothing to encode.
+    """
+    frames = read_index(paths['index'])
+    if not frames or not os.path.exists(paths['spool']):
+        return False
+
+    # Only the bytes covered by the index, in case a frame is being appended right now
+    with open(paths['spool'], 'rb') as spool:
+        data = spool.read(frames[-1][2])
+
+    partial_path = paths['segment'] + '.partial'
+    run_ffmpeg([
+        '-f', 'image2pipe',
+        '-framerate', str(FRAME_RATE),
+        '-c:v', 'mjpeg',
+        '-i', '-'
+    ] + ENCODE_ARGS + ['-f', 'mp4'], partial_path, data)
+
+    os.replace(partial_path, paths['segment'])
+    if finished:
+        os.remove(paths['spool'])
+    return True
+
+
+def finalize_segments(camera_id: str, now: Optional[datetime] = None) -> int:
+    """Encode every complete hour of a camera that still has a spool. Returns segments encoded."""
+    now = now or datetime.now(TIMEZONE)
+    camera_dir = os.path.join(TIMELAPSE_DIR, camera_id)
+    if not os.path.isdir(camera_dir):
+        return 0
+
+    encoded = 0
+    for day_name in sorted(os.listdir(camera_dir)):
+        try:
+            day = date.fromisoformat(day_name)
+        except ValueError:
+            continue
+        segment_dir = os.path.join(camera_dir, day_name)
+        for name in sorted(os.listdir(segment_dir)):
+            if not name.endswith('.mjpeg'):
+                continue
+            hour = int(name[:2])
+            if is_hour_complete(day, hour, now) and encode_segment(get_segment_paths(segment_dir, hour), finished=True):
+                print(f"[timelapse] Encoded segment {camera_id} {day_name} {hour:02d}:00")
+                encoded += 1
+    return encoded
+
+
+def get_day_segments(
+    camera_id: str,
+    day: date,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    light_classes: Optional[List[str]] = None
+) -> List[Dict]:
+    """
+    Get a day's segments, encoding any spool that has no up-to-date segment
+    yet, limited to the selected frames (see is_selected). A segment only
+    partly selected has 'trim' set to its (first, end) frame numbers; one
+    whose selection has gaps, e.g. a cloud passing at midday under a light
+    class filter, is listed once per run of frames.
+    """
+    time_from, time_to = normalize_time(time_from), normalize_time(time_to)
+    segment_dir = get_segment_dir(camera_id, day)
+    if not os.path.isdir(segment_dir):
+        return []
+
+    segments = []
+    for hour in range(24):
+        paths = get_segment_paths(segment_dir, hour)
+        if os.path.exists(paths['spool']):
+            encode_segment(paths, finished=is_hour_complete(day, hour))
+        if not os.path.exists(paths['segment']):
+            continue
+
+        frames = read_index(paths['index'])
+        selected = [
+            i for i, (_, frame_time, _, light_class) in enumerate(frames)
+            if is_selected(frame_time, light_class, time_from, time_to, light_classes)
+        ]
+        runs = []
+        for i in selected:
+            if runs and runs[-1][-1] == i - 1:
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+        for run in runs:
+            segment = {
+                'path': paths['segment'],
+                'frames': len(run),
+                'capture_ids': [frames[i][0] for i in run]
+            }
+            if len(run) < len(frames):
+                segment['trim'] = (run[0], run[-1] + 1)
+            segments.append(segment)
+    return segments
+
+
+def segments_match_captures(
+    camera_id: str,
+    day: date,
+    segments: List[Dict],
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    light_classes: Optional[List[str]] = None
+) -> bool:
+    """
+    Check a day's segments against the database: no frame of a deleted
+    capture, or of one whose stored light class is not selected, may be
+    shown, and every stored capture the selection covers must be in a
+    segment (e.g. not one that arrived before segments were enabled).
+    """
+    from database import get_capture_times
+
+    time_from, time_to = normalize_time(time_from), normalize_time(time_to)
+    stored = get_capture_times(camera_id, day.isoformat())
+    if stored is None:
+        return False
+
+    # Captures in an encoded segment, whether or not the range selects them
+    encoded = set()
+    segment_dir = get_segment_dir(camera_id, day)
+    for hour in range(24):
+        paths = get_segment_paths(segment_dir, hour)
+        if os.path.exists(paths['segment']):
+            encoded.update(frame[0] for frame in read_index(paths['index']))
+
+    shown = {capture_id for segment in segments for capture_id in segment['capture_ids']}
+    deleted = shown - stored.keys()
+    # Classes only, as index and database times of a capture can be a second apart
+    unselected = {
+        capture_id for capture_id in shown & stored.keys()
+        if light_classes and stored[capture_id][1] is not None and stored[capture_id][1] not in light_classes
+    }
+    missing = {
+        capture_id for capture_id, (capture_time, light_class) in stored.items()
+        if capture_id not in encoded
+        and is_selected(capture_time, light_class, time_from, time_to, light_classes)
+    }
+    if deleted or unselected or missing:
+        print(f"[timelapse] Segments for {camera_id} {day} are stale "
+              f"({len(deleted)} deleted, {len(unselected)} unselected, {len(missing)} missing captures)")
+        return False
+    return True
+
+
+def build_video(
+    output_path: str,
+    day: date,
+    camera_id: str = DEFAULT_CAMERA_ID,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    light_classes: Optional[List[str]] = None
+) -> int:
+    """
+    Concatenate a day's segments (optionally limited to light classes and a
+    time range, e.g. sunrise to sunset, as in iter_captures) into an MP4.
+    Whole segments are stream-copied; only the frames of a segment that a
+    cut keeps (usually the first and last hour) are decoded and re-encoded.
+    Returns the number of frames, or 0 when there are no segments or they
+    no longer match the stored captures (so the caller renders from the
+    database instead).
+    """
+    segments = get_day_segments(camera_id, day, time_from, time_to, light_classes)
+    if not segments or not segments_match_captures(camera_id, day, segments, time_from, time_to, light_classes):
+        return 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    partial_path = output_path + '.partial.mp4'
+    with tempfile.TemporaryDirectory() as work_dir:
+        lines = []
+        for number, segment in enumerate(segments):
+            path = segment['path']
+            if 'trim' in segment:
+                start, end = segment['trim']
+                path = os.path.join(work_dir, f'{number}.mp4')
+                run_ffmpeg([
+                    '-i', segment['path'],
+                    '-vf', f'trim=start_frame={start}:end_frame={end},setpts=PTS-STARTPTS'
+                ] + ENCODE_ARGS + ['-f', 'mp4'], path)
+            lines.append("file '{}'".format(path.replace("'", "'\\''")))
+            # Whole frames, so the joined timestamps stay one frame apart
+            lines.append(f"duration {segment['frames'] / FRAME_RATE:.6f}")
+
+        concat_list = os.path.join(work_dir, 'concat.txt')
+        with open(concat_list, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        run_ffmpeg([
+            '-f', 'concat', '-safe', '0',
+            '-i', concat_list,
+            '-c', 'copy',
+            '-movflags', '+faststart'
+        ], partial_path)
+
+    os.replace(partial_path, output_path)
+    return sum(segment['frames'] for segment in segments)
+
+
+if __name__ == '__main__':
+    # Usage: python timelapse.py OUTPUT DATE [--from-time HH:MM] [--to-time HH:MM] [--camera ID] [--light CLASSES]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build a day video from timelapse segments')
+    parser.add_argument('output', help='Output .mp4 path')
+    parser.add_argument('date', help='Capture date (YYYY-MM-DD)')
+    parser.add_argument('--from-time', help='Only frames at or after HH:MM')
+    parser.add_argument('--to-time', help='Only frames at or before HH:MM')
+    parser.add_argument('--camera', default=DEFAULT_CAMERA_ID, help='Camera id')
+    parser.add_argument('--light', help='Only frames of these light classes (e.g. day,twilight); '
+                                        'the time range still applies to unclassified frames')
+    options = parser.parse_args()
+
+    frames = build_video(
+        options.output, date.fromisoformat(options.date), options.camera,
+        options.from_time, options.to_time,
+        options.light.split(',') if options.light else None
+    )
+    print(f"Built {options.output} from {frames} segment frames" if frames else f"No segments for {options.date}")
+    # Lets the server fall back to a full render
+    sys.exit(0 if frames else NO_SEGMENTS_EXIT_CODE)
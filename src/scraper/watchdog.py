@@ -0,0 +1,179 @@
+"""
+Capture Watchdog
+Gives every browser stage a time budget and each capture a total deadline,
+killing the browser process tree when one is overrun
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from metrics import REGISTRY, Counter, span
+
+
+WATCHDOG_ENABLED = os.environ.get('WATCHDOG_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Total browser time per capture; keep it below the shortest capture interval
+CAPTURE_DEADLINE = float(os.environ.get('CAPTURE_DEADLINE', '110'))
+# Extra time past a budget so cooperative timeouts (page load, readiness) can fire first
+WATCHDOG_GRACE = float(os.environ.get('WATCHDOG_GRACE', '2'))
+
+# Default stage budgets in seconds, overridable with STAGE_BUDGET_<STAGE>
+DEFAULT_BUDGETS = {
+    'browser_acquire': 60,
+    'navigate': 40,
+    'page_ready': 30,
+    'cookie_banner': 5,
+    'consent': 15,
+    'find_iframe': 10,
+    'player': 30,
+    'canvas_frame': 10,
+    'fullscreen': 15,
+    'screenshot': 15,
+}
+DEFAULT_BUDGET = 30
+
+WATCHDOG_TRIPS_TOTAL = REGISTRY.register(Counter(
+    'scraper_watchdog_trips_total', 'Captures killed by the watchdog, by overrunning stage'))
+
+# Watchdog of the capture running in the current thread
+_active = threading.local()
+_watchdogs = set()
+_watchdogs_lock = threading.Lock()
+
+
+def get_stage_budget(stage: str) -> float:
+    """Get the budget in seconds for a stage."""
+    override = os.environ.get(f'STAGE_BUDGET_{stage.upper()}')
+    if override:
+        return float(override)
+    return DEFAULT_BUDGETS.get(stage, DEFAULT_BUDGET)
+
+
+class CaptureWatchdog:
+    """
+    Monitors one capture from a background thread.
+
+    `enter()`/`leave()` mark the running stage. When the stage budget or the
+    total deadline passes, `kill` is called (e.g. to SIGKILL the browser
+    process tree) so the blocked WebDriver call fails instead of hanging,
+    and the overrunning stage is kept in `tripped`.
+    """
+
+    def __init__(self, kill: Callable[[], None], deadline: float = CAPTURE_DEADLINE, grace: float = WATCHDOG_GRACE, label: str = ''):
+        self.kill = kill
+        self.deadline = deadline
+        self.grace = grace
+        self.label = label
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.stage = None
+        self.stage_deadline = None
+        self.tripped = None
+        self.done = threading.Event()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'watchdog-{label}', daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.done.set()
+        self.wake.set()
+        self.thread.join(timeout=1)
+
+    def enter(self, stage: str) -> None:
+        """Start the budget for a stage."""
+        with self.lock:
+            self.stage = stage
+            self.stage_deadline = time.monotonic() + get_stage_budget(stage) + self.grace
+        self.wake.set()
+
+    def leave(self, stage: str) -> None:
+        """Stop the budget for a stage."""
+        with self.lock:
+            if self.stage == stage:
+                self.stage = None
+                self.stage_deadline = None
+
+    def _next_limit(self):
+        with self.lock:
+            limit = self.started + self.deadline + self.grace
+            stage = self.stage or 'capture'
+            if self.stage_deadline is not None and self.stage_deadline < limit:
+                return self.stage_deadline, stage, 'stage budget'
+            return limit, stage, 'capture deadline'
+
+    def _run(self) -> None:
+        while not self.done.is_set():
+            limit, stage, reason = self._next_limit()
+            remaining = limit - time.monotonic()
+            if remaining <= 0:
+                self.trip(stage, reason)
+                return
+            self.wake.wait(remaining)
+            self.wake.clear()
+
+    def trip(self, stage: str, reason: str) -> None:
+        """Record the overrunning stage and kill the browser."""
+        if self.tripped or self.done.is_set():
+            return
+        self.tripped = stage
+        elapsed = time.monotonic() - self.started
+        print(f"[watchdog] {self.label}: {reason} exceeded in stage '{stage}' after {elapsed:.1f}s, killing browser")
+        WATCHDOG_TRIPS_TOTAL.inc(stage=stage, reason=reason)
+        try:
+            self.kill()
+        except Exception as e:
+            print(f"[watchdog] Kill failed: {e}")
+
+
+@contextmanager
+def guard(kill: Callable[[], None], label: str = '', deadline: float = CAPTURE_DEADLINE):
+    """Run the enclosed capture under a watchdog bound to the current thread."""
+    if not WATCHDOG_ENABLED:
+        yield None
+        return
+
+    watchdog = CaptureWatchdog(kill, deadline=deadline, label=label)
+    previous = getattr(_active, 'watchdog', None)
+    _active.watchdog = watchdog
+    with _watchdogs_lock:
+        _watchdogs.add(watchdog)
+    watchdog.start()
+    try:
+        yield watchdog
+    finally:
+        watchdog.stop()
+        with _watchdogs_lock:
+            _watchdogs.discard(watchdog)
+        _active.watchdog = previous
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    """A traced span that is also budgeted by the current thread's watchdog."""
+    watchdog = getattr(_active, 'watchdog', None)
+    if watchdog:
+        watchdog.enter(name)
+    try:
+        with span(name, **attrs):
+            yield
+    finally:
+        if watchdog:
+            watchdog.leave(name)
+
+
+def abort_active_captures(reason: str = 'shutdown') -> int:
+    """Kill the browsers of all running captures, e.g. on SIGTERM. Returns how many were aborted."""
+    with _watchdogs_lock:
+        watchdogs = list(_watchdogs)
+    for watchdog in watchdogs:
+        watchdog.trip(watchdog.stage or 'capture', reason)
+    return len(watchdogs)
+
+
+def get_active_stages() -> Dict[str, Optional[str]]:
+    """Get the running stage of each guarded capture, keyed by label."""
+    with _watchdogs_lock:
+        return {watchdog.label: watchdog.stage for watchdog in _watchdogs}
@@ -2,11 +2,13 @@
 Open-Meteo Weather API Client
 Fetches weather data for Alicante and Bratislava
 """
-import requests
 from datetime import datetime
 from typing import Dict, Optional
 import json
 import os
+import threading
+
+from metrics import WEATHER_CACHE_TOTAL
 
 # City coordinates
 CITIES = {
@@ -17,6 +19,9 @@ CITIES = {
 CACHE_FILE = 'weather_cache.json'
 CACHE_DURATION = 600  # 10 minutes in seconds
 
+# Cameras may be captured concurrently; serialize read-modify-write of the cache file
+_cache_lock = threading.Lock()
+
 
 def get_storage_path() -> str:
     """Get storage path from environment variable."""
@@ -53,6 +58,17 @@ def save_cache(cache: Dict) -> None:
         print(f"Warning: Could not save cache: {e}")
 
 
+def update_cache_entry(city: str, data: Dict) -> None:
+    """Store a city's fresh weather data, keeping the other cities' entries."""
+    with _cache_lock:
+        cache = load_cache()
+        cache[city] = {
+            'timestamp': datetime.now().timestamp(),
+            'data': data
+        }
+        save_cache(cache)
+
+
 def is_cache_valid(cache: Dict, city: str) -> bool:
     """Check if cached data is still valid."""
     if city not in cache:
@@ -77,7 +93,12 @@ def fetch_weather_data(city: str) -> Optional[Dict]:
     # Check cache first
     cache = load_cache()
     if is_cache_valid(cache, city):
+        WEATHER_CACHE_TOTAL.inc(city=city, result='hit')
         return cache[city]['data']
+    WEATHER_CACHE_TOTAL.inc(city=city, result='miss')
+
+    # Deferred so cache hits never pay for importing requests
+    import requests
 
     coords = CITIES[city]
     url = (
@@ -124,11 +145,7 @@ def fetch_weather_data(city: str) -> Optional[Dict]:
         }
 
         # Update cache
-        cache[city] = {
-            'timestamp': datetime.now().timestamp(),
-            'data': result
-        }
-        save_cache(cache)
+        update_cache_entry(city, result)
 
         return result
 
@@ -136,6 +153,7 @@ def fetch_weather_data(city: str) -> Optional[Dict]:
         print(f"Error fetching weather data for {city}: {e}")
         # Return cached data if available, even if expired
         if city in cache:
+            WEATHER_CACHE_TOTAL.inc(city=city, result='stale')
             return cache[city].get('data')
         return None
 
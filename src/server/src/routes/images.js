@@ -1,10 +1,22 @@
 import express from 'express';
 import { imageService, getOverlaySettings, updateOverlaySettings } from '../services/imageService.js';
-import { applyOverlayToBuffer } from '../utils/imageOverlay.js';
+import { renderOverlay } from '../utils/overlayClient.js';
+import { cameraParam } from '../utils/cameras.js';
 
 const router = express.Router();
 
+// Gallery routes take ?camera= (defaults to DEFAULT_CAMERA)
+router.use(cameraParam);
+
+const MIME_TYPES = {
+  jpeg: 'image/jpeg',
+  png: 'image/png',
+  webp: 'image/webp',
+  avif: 'image/avif'
+};
+
 // Serve raw image data from database (no overlay)
+// ?size=thumb|preview serves a downscaled rendition when one was stored, else the full image
 router.get('/data/:id', async (req, res) => {
   try {
     const { id } = req.params;
@@ -13,12 +25,18 @@ router.get('/data/:id', async (req, res) => {
       return res.status(400).json({ error: 'Invalid capture ID' });
     }
 
-    const imageResult = await imageService.getImageData(captureId);
+    let imageResult = null;
+    if (req.query.size) {
+      imageResult = await imageService.getRendition(captureId, String(req.query.size));
+    }
+    if (!imageResult) {
+      imageResult = await imageService.getImageData(captureId);
+    }
     if (!imageResult || !imageResult.data) {
       return res.status(404).json({ error: 'Image not found' });
     }
 
-    const mimeType = imageResult.format === 'png' ? 'image/png' : 'image/jpeg';
+    const mimeType = MIME_TYPES[imageResult.format] || 'image/jpeg';
     res.set('Content-Type', mimeType);
     res.set('Cache-Control', 'public, max-age=31536000'); // Cache for 1 year (images don't change)
     res.send(imageResult.data);
@@ -55,8 +73,8 @@ router.get('/data/:id/overlay', async (req, res) => {
       ]);
     }
 
-    // Apply overlay to image with options
-    const overlayedImage = await applyOverlayToBuffer(
+    // Apply overlay to image with options (render daemon when enabled and no charts are shown)
+    const overlayedImage = await renderOverlay(
       captureData.imageData,
       captureData.weather,
       captureData.date,
@@ -81,7 +99,7 @@ router.get('/data/:id/overlay', async (req, res) => {
 // Get latest image
 router.get('/latest', async (req, res) => {
   try {
-    const latest = await imageService.getLatestImage();
+    const latest = await imageService.getLatestImage(req.cameraId);
     if (!latest) {
       return res.status(404).json({ error: 'No images found' });
     }
@@ -95,7 +113,7 @@ router.get('/latest', async (req, res) => {
 // Get list of days with images
 router.get('/days', async (req, res) => {
   try {
-    const days = await imageService.getDays();
+    const days = await imageService.getDays(req.cameraId);
     res.json(days);
   } catch (error) {
     console.error('Error getting days:', error);
@@ -111,7 +129,7 @@ router.get('/day/:date', async (req, res) => {
     if (!/^\d{4}-\d{2}-\d{2}$/.test(date)) {
       return res.status(400).json({ error: 'Invalid date format. Use YYYY-MM-DD' });
     }
-    const images = await imageService.getImagesForDay(date);
+    const images = await imageService.getImagesForDay(date, req.cameraId);
     res.json(images.reverse());
   } catch (error) {
     console.error('Error getting images for day:', error);
@@ -122,7 +140,7 @@ router.get('/day/:date', async (req, res) => {
 // Get image count per day (for calendar view)
 router.get('/counts', async (req, res) => {
   try {
-    const counts = await imageService.getImageCounts();
+    const counts = await imageService.getImageCounts(req.cameraId);
     res.json(counts);
   } catch (error) {
     console.error('Error getting image counts:', error);
@@ -161,7 +179,7 @@ router.delete('/day/:date', async (req, res) => {
     if (!/^\d{4}-\d{2}-\d{2}$/.test(date)) {
       return res.status(400).json({ error: 'Invalid date format. Use YYYY-MM-DD' });
     }
-    const result = await imageService.deleteAllImagesForDay(date);
+    const result = await imageService.deleteAllImagesForDay(date, req.cameraId);
     res.json(result);
   } catch (error) {
     console.error('Error deleting images for day:', error);
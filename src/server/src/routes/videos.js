@@ -1,12 +1,16 @@
 import express from 'express';
 import { videoService } from '../services/videoService.js';
+import { cameraParam } from '../utils/cameras.js';
 
 const router = express.Router();
 
+// Video routes take ?camera= (or `camera` in a JSON body; defaults to DEFAULT_CAMERA)
+router.use(cameraParam);
+
 // Get list of daily videos
 router.get('/daily', async (req, res) => {
   try {
-    const videos = await videoService.getVideos('daily');
+    const videos = await videoService.getVideos('daily', req.cameraId);
     res.json(videos);
   } catch (error) {
     console.error('Error getting daily videos:', error);
@@ -17,7 +21,7 @@ router.get('/daily', async (req, res) => {
 // Get list of daylight videos
 router.get('/daylight', async (req, res) => {
   try {
-    const videos = await videoService.getVideos('daylight');
+    const videos = await videoService.getVideos('daylight', req.cameraId);
     res.json(videos);
   } catch (error) {
     console.error('Error getting daylight videos:', error);
@@ -28,7 +32,7 @@ router.get('/daylight', async (req, res) => {
 // Get combined 24h videos
 router.get('/combined-24h', async (req, res) => {
   try {
-    const videos = await videoService.getVideos('combined-24h');
+    const videos = await videoService.getVideos('combined-24h', req.cameraId);
     res.json(videos);
   } catch (error) {
     console.error('Error getting combined 24h videos:', error);
@@ -39,7 +43,7 @@ router.get('/combined-24h', async (req, res) => {
 // Get combined daylight videos
 router.get('/combined-daylight', async (req, res) => {
   try {
-    const videos = await videoService.getVideos('combined-daylight');
+    const videos = await videoService.getVideos('combined-daylight', req.cameraId);
     res.json(videos);
   } catch (error) {
     console.error('Error getting combined daylight videos:', error);
@@ -74,7 +78,7 @@ router.post('/generate/:type', async (req, res) => {
       return res.status(400).json({ error: 'Date is required for daily/daylight video generation' });
     }
 
-    const jobId = await videoService.queueVideoGeneration(type, date);
+    const jobId = await videoService.queueVideoGeneration(type, date, req.cameraId);
     res.json({ success: true, jobId, message: 'Video generation queued' });
   } catch (error) {
     console.error('Error queueing video generation:', error);
@@ -85,7 +89,7 @@ router.post('/generate/:type', async (req, res) => {
 // Get count of missing videos
 router.get('/missing-count', async (req, res) => {
   try {
-    const count = await videoService.getMissingVideosCount();
+    const count = await videoService.getMissingVideosCount(req.cameraId);
     res.json(count);
   } catch (error) {
     console.error('Error getting missing videos count:', error);
@@ -96,7 +100,7 @@ router.get('/missing-count', async (req, res) => {
 // Generate all missing videos
 router.post('/generate-all', async (req, res) => {
   try {
-    const result = await videoService.generateAllMissing();
+    const result = await videoService.generateAllMissing(req.cameraId);
     res.json(result);
   } catch (error) {
     console.error('Error generating all videos:', error);
@@ -116,7 +120,7 @@ router.delete('/:type/:filename', async (req, res) => {
     if (filename.includes('/') || filename.includes('\\') || filename.includes('..')) {
       return res.status(400).json({ error: 'Invalid filename' });
     }
-    const result = await videoService.deleteVideo(type, filename);
+    const result = await videoService.deleteVideo(type, filename, req.cameraId);
     res.json(result);
   } catch (error) {
     console.error('Error deleting video:', error);
@@ -135,7 +139,7 @@ router.delete('/:type', async (req, res) => {
     if (!validTypes.includes(type)) {
       return res.status(400).json({ error: 'Invalid video type' });
     }
-    const result = await videoService.deleteAllVideos(type);
+    const result = await videoService.deleteAllVideos(type, req.cameraId);
     res.json(result);
   } catch (error) {
     console.error('Error deleting videos:', error);
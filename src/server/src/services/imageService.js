@@ -1,5 +1,6 @@
 import fs from 'fs/promises';
 import path from 'path';
+import sharp from 'sharp';
 import * as db from '../utils/database.js';
 import { applyOverlayToBuffer } from '../utils/imageOverlay.js';
 
@@ -10,6 +11,14 @@ let overlaySettings = {
   sunsetOffsetMinutes: -20
 };
 
+/**
+ * Frames may be stored as WebP or AVIF; ffmpeg inputs are written as .jpg files
+ */
+async function toJpeg(imageData, format) {
+  if (!format || format === 'jpeg') return imageData;
+  return await sharp(imageData).jpeg({ quality: 90 }).toBuffer();
+}
+
 export function getOverlaySettings() {
   return { ...overlaySettings };
 }
@@ -24,6 +33,7 @@ const OUTPUT_DIR = process.env.OUTPUT_DIR || '/data';
 class ImageService {
   constructor() {
     this.tempPath = path.join(OUTPUT_DIR, 'temp');
+    this.segmentsPath = process.env.TIMELAPSE_DIR || path.join(OUTPUT_DIR, 'segments');
   }
 
   async ensureTempDirectory() {
@@ -34,26 +44,34 @@ class ImageService {
     }
   }
 
-  async getDays() {
-    return await db.getDays();
+  async getCameras() {
+    return await db.getCameras();
+  }
+
+  async getDays(cameraId) {
+    return await db.getDays(cameraId);
   }
 
-  async getImagesForDay(date) {
-    return await db.getCapturesForDay(date);
+  async getImagesForDay(date, cameraId) {
+    return await db.getCapturesForDay(date, cameraId);
   }
 
-  async getLatestImage() {
-    return await db.getLatestCapture();
+  async getLatestImage(cameraId) {
+    return await db.getLatestCapture(cameraId);
   }
 
-  async getImageCounts() {
-    return await db.getImageCounts();
+  async getImageCounts(cameraId) {
+    return await db.getImageCounts(cameraId);
   }
 
   async getImageData(captureId) {
     return await db.getImageData(captureId);
   }
 
+  async getRendition(captureId, size) {
+    return await db.getRendition(captureId, size);
+  }
+
   async getFullCaptureData(captureId) {
     return await db.getFullCaptureData(captureId);
   }
@@ -62,12 +80,12 @@ class ImageService {
    * Get image paths for video generation.
    * Extracts images from database, applies overlay, and writes to temp files.
    */
-  async getImagePaths(date) {
+  async getImagePaths(date, cameraId) {
     await this.ensureTempDirectory();
-    const captures = await db.getCaptureIdsForDay(date);
+    const captures = await db.getCaptureIdsForDay(date, cameraId);
     if (captures.length === 0) return [];
 
-    const tempDir = path.join(this.tempPath, `video-${date}-${Date.now()}`);
+    const tempDir = path.join(this.tempPath, `video-${cameraId}-${date}-${Date.now()}`);
     await fs.mkdir(tempDir, { recursive: true });
 
     const paths = [];
@@ -95,7 +113,7 @@ class ImageService {
           console.error(`Error applying overlay to capture ${capture.id}:`, error);
           // Fallback: write raw image without overlay
           const filePath = path.join(tempDir, `${capture.id}.jpg`);
-          await fs.writeFile(filePath, captureData.imageData);
+          await fs.writeFile(filePath, await toJpeg(captureData.imageData, captureData.format));
           paths.push(filePath);
         }
       }
@@ -108,12 +126,12 @@ class ImageService {
    * Get daylight image paths for video generation.
    * Extracts images from database, applies overlay, and writes to temp files.
    */
-  async getDaylightImagePaths(date, sunriseTime, sunsetTime) {
+  async getDaylightImagePaths(date, sunriseTime, sunsetTime, cameraId) {
     await this.ensureTempDirectory();
-    const captures = await db.getDaylightCaptureIdsForDay(date, sunriseTime, sunsetTime);
+    const captures = await db.getDaylightCaptureIdsForDay(date, sunriseTime, sunsetTime, cameraId);
     if (captures.length === 0) return [];
 
-    const tempDir = path.join(this.tempPath, `daylight-${date}-${Date.now()}`);
+    const tempDir = path.join(this.tempPath, `daylight-${cameraId}-${date}-${Date.now()}`);
     await fs.mkdir(tempDir, { recursive: true });
 
     const paths = [];
@@ -141,7 +159,7 @@ class ImageService {
           console.error(`Error applying overlay to capture ${capture.id}:`, error);
           // Fallback: write raw image without overlay
           const filePath = path.join(tempDir, `${capture.id}.jpg`);
-          await fs.writeFile(filePath, captureData.imageData);
+          await fs.writeFile(filePath, await toJpeg(captureData.imageData, captureData.format));
           paths.push(filePath);
         }
       }
@@ -185,19 +203,44 @@ class ImageService {
     return await db.deleteCapture(captureId);
   }
 
-  async deleteAllImagesForDay(date) {
-    return await db.deleteCapturesForDay(date);
+  async deleteAllImagesForDay(date, cameraId) {
+    const result = await db.deleteCapturesForDay(date, cameraId);
+    await this.removeSegments(date, cameraId);
+    return result;
   }
 
   async deleteAllImages() {
-    return await db.deleteAllCaptures();
+    const result = await db.deleteAllCaptures();
+    await this.removeSegments();
+    return result;
+  }
+
+  /**
+   * Remove timelapse segments for a day (of one camera, or of all cameras),
+   * or all of them, so segment-built videos do not bring deleted captures back
+   */
+  async removeSegments(date = null, cameraId = null) {
+    try {
+      if (!date) {
+        await fs.rm(this.segmentsPath, { recursive: true, force: true });
+        return;
+      }
+      const cameras = cameraId ? [cameraId] : await fs.readdir(this.segmentsPath);
+      await Promise.all(cameras.map(camera =>
+        fs.rm(path.join(this.segmentsPath, camera, date), { recursive: true, force: true })
+      ));
+    } catch (error) {
+      if (error.code !== 'ENOENT') {
+        console.error('Error removing timelapse segments:', error);
+      }
+    }
   }
 
   /**
    * Get sun times for a specific date from database
    */
-  async getSunTimesForDate(date) {
-    return await db.getSunTimesForDate(date);
+  async getSunTimesForDate(date, cameraId) {
+    return await db.getSunTimesForDate(date, cameraId);
   }
 
   /**
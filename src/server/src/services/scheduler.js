@@ -17,11 +17,13 @@ export function initScheduler() {
 
       console.log(`Generating videos for ${dateStr}...`);
 
-      // Queue daily video
-      await videoService.queueVideoGeneration('daily', dateStr);
+      for (const cameraId of await imageService.getCameras()) {
+        // Queue daily video
+        await videoService.queueVideoGeneration('daily', dateStr, cameraId);
 
-      // Queue daylight video
-      await videoService.queueVideoGeneration('daylight', dateStr);
+        // Queue daylight video
+        await videoService.queueVideoGeneration('daylight', dateStr, cameraId);
+      }
     } catch (error) {
       console.error('Error in scheduled daily video generation:', error);
     }
@@ -32,7 +34,9 @@ export function initScheduler() {
     console.log('Running scheduled combined-24h video generation...');
 
     try {
-      await videoService.queueVideoGeneration('combined-24h');
+      for (const cameraId of await imageService.getCameras()) {
+        await videoService.queueVideoGeneration('combined-24h', null, cameraId);
+      }
     } catch (error) {
       console.error('Error in combined-24h video generation:', error);
     }
@@ -43,7 +47,9 @@ export function initScheduler() {
     console.log('Running scheduled combined-daylight video generation...');
 
     try {
-      await videoService.queueVideoGeneration('combined-daylight');
+      for (const cameraId of await imageService.getCameras()) {
+        await videoService.queueVideoGeneration('combined-daylight', null, cameraId);
+      }
     } catch (error) {
       console.error('Error in combined-daylight video generation:', error);
     }
@@ -1,9 +1,16 @@
 import fs from 'fs/promises';
 import path from 'path';
-import { generateDailyVideo, generateCombinedVideo } from '../utils/ffmpeg.js';
+import { generateDailyVideo, generateCombinedVideo, renderOverlayVideo, buildVideoFromSegments } from '../utils/ffmpeg.js';
 import { imageService, getOverlaySettings } from './imageService.js';
+import { DAYLIGHT_CLASSES, SKIP_DARK_FRAMES } from '../utils/database.js';
+import { DEFAULT_CAMERA_ID } from '../utils/cameras.js';
 
 const OUTPUT_DIR = process.env.OUTPUT_DIR || '/data';
+// 'node' writes overlaid frames to temp files one at a time; 'python' streams them
+// from the database through scraper/overlay.py's process pool straight into ffmpeg;
+// 'segments' concatenates the scraper's per-hour timelapse segments (TIMELAPSE_SEGMENTS)
+// and falls back to 'node' for days without up-to-date segments
+const VIDEO_RENDERER = process.env.VIDEO_RENDERER || 'node';
 
 class VideoService {
   constructor() {
@@ -13,23 +20,36 @@ class VideoService {
     this.currentJob = null;
   }
 
-  async ensureDirectories() {
+  /**
+   * Directory (relative to videosPath) of a camera's videos of a type.
+   * The default camera keeps the original layout; other cameras get their own tree.
+   */
+  getTypeDir(type, cameraId = DEFAULT_CAMERA_ID) {
+    return cameraId === DEFAULT_CAMERA_ID ? type : path.join('cameras', cameraId, type);
+  }
+
+  getTypePath(type, cameraId = DEFAULT_CAMERA_ID) {
+    return path.join(this.videosPath, this.getTypeDir(type, cameraId));
+  }
+
+  async ensureDirectories(cameraId = DEFAULT_CAMERA_ID) {
     const dirs = ['daily', 'daylight', 'combined-24h', 'combined-daylight'];
     for (const dir of dirs) {
-      await fs.mkdir(path.join(this.videosPath, dir), { recursive: true });
+      await fs.mkdir(this.getTypePath(dir, cameraId), { recursive: true });
     }
   }
 
-  async getVideos(type) {
-    await this.ensureDirectories();
-    const typePath = path.join(this.videosPath, type);
+  async getVideos(type, cameraId = DEFAULT_CAMERA_ID) {
+    await this.ensureDirectories(cameraId);
+    const typeDir = this.getTypeDir(type, cameraId);
+    const typePath = path.join(this.videosPath, typeDir);
 
     // Get sunrise/sunset times for daylight videos
     let sunTimes = null;
     if (type === 'daylight') {
-      const days = await imageService.getDays();
+      const days = await imageService.getDays(cameraId);
       if (days.length > 0) {
-        sunTimes = await imageService.getSunTimesForDate(days[0]);
+        sunTimes = await imageService.getSunTimesForDate(days[0], cameraId);
       } else {
         sunTimes = { sunrise: '06:00', sunset: '20:00' };
       }
@@ -46,7 +66,7 @@ class VideoService {
             const videoData = {
               filename: file,
               date: file.replace(/(-daylight)?\.mp4$/i, ''),
-              url: `/storage/videos/${type}/${file}`,
+              url: `/storage/videos/${typeDir.split(path.sep).join('/')}/${file}`,
               size: stats.size,
               createdAt: stats.birthtime
             };
@@ -84,14 +104,15 @@ class VideoService {
       queuedJobs: this.queue.map((job, index) => ({
         position: index + 1,
         type: job.type,
-        date: job.date
+        date: job.date,
+        camera: job.cameraId
       }))
     };
   }
 
-  async queueVideoGeneration(type, date = null) {
-    const jobId = `${type}-${date || 'all'}-${Date.now()}`;
-    const job = { id: jobId, type, date, status: 'queued' };
+  async queueVideoGeneration(type, date = null, cameraId = DEFAULT_CAMERA_ID) {
+    const jobId = `${cameraId}-${type}-${date || 'all'}-${Date.now()}`;
+    const job = { id: jobId, type, date, cameraId, status: 'queued' };
 
     this.queue.push(job);
     console.log(`Queued video generation: ${jobId}`);
@@ -117,7 +138,7 @@ class VideoService {
       console.log(`Processing job: ${job.id}`);
 
       try {
-        await this.generateVideo(job.type, job.date);
+        await this.generateVideo(job.type, job.date, job.cameraId);
         console.log(`Completed job: ${job.id}`);
       } catch (error) {
         console.error(`Error processing job ${job.id}:`, error);
@@ -128,36 +149,52 @@ class VideoService {
     this.isProcessing = false;
   }
 
-  async generateVideo(type, date) {
-    await this.ensureDirectories();
+  async generateVideo(type, date, cameraId = DEFAULT_CAMERA_ID) {
+    await this.ensureDirectories(cameraId);
 
     switch (type) {
       case 'daily':
-        await this.generateDailyVideo(date);
+        await this.generateDailyVideo(date, cameraId);
         break;
       case 'daylight':
-        await this.generateDaylightVideo(date);
+        await this.generateDaylightVideo(date, cameraId);
         break;
       case 'combined-24h':
-        await this.generateCombined24hVideo();
+        await this.generateCombined24hVideo(cameraId);
         break;
       case 'combined-daylight':
-        await this.generateCombinedDaylightVideo();
+        await this.generateCombinedDaylightVideo(cameraId);
         break;
       default:
         throw new Error(`Unknown video type: ${type}`);
     }
   }
 
-  async generateDailyVideo(date) {
-    const imagePaths = await imageService.getImagePaths(date);
+  async generateDailyVideo(date, cameraId = DEFAULT_CAMERA_ID) {
+    const outputPath = path.join(this.getTypePath('daily', cameraId), `${date}.mp4`);
+
+    // Same frame selection for every renderer
+    const lightClasses = SKIP_DARK_FRAMES ? ['twilight', 'day'] : undefined;
+
+    if (VIDEO_RENDERER === 'segments') {
+      if (await buildVideoFromSegments(outputPath, date, { cameraId, lightClasses })) return;
+      console.log(`No up-to-date timelapse segments for ${date}, rendering from captures`);
+    }
+
+    if (VIDEO_RENDERER === 'python') {
+      if (!await renderOverlayVideo(outputPath, date, { cameraId, lightClasses })) {
+        console.log(`No images found for ${date}`);
+      }
+      return;
+    }
+
+    const imagePaths = await imageService.getImagePaths(date, cameraId);
     if (imagePaths.length === 0) {
       console.log(`No images found for ${date}`);
       return;
     }
 
     try {
-      const outputPath = path.join(this.videosPath, 'daily', `${date}.mp4`);
       await generateDailyVideo(imagePaths, outputPath);
     } finally {
       // Clean up temporary image files
@@ -165,9 +202,11 @@ class VideoService {
     }
   }
 
-  async generateDaylightVideo(date) {
+  async generateDaylightVideo(date, cameraId = DEFAULT_CAMERA_ID) {
+    const outputPath = path.join(this.getTypePath('daylight', cameraId), `${date}-daylight.mp4`);
+
     // Get sunrise/sunset times from database and apply offsets from settings
-    const sunTimes = await imageService.getSunTimesForDate(date);
+    const sunTimes = await imageService.getSunTimesForDate(date, cameraId);
     const settings = getOverlaySettings();
 
     const rawSunrise = sunTimes.sunrise || '06:00';
@@ -180,14 +219,25 @@ class VideoService {
     const sunsetMinutes = Math.max(0, Math.min(1439, sh * 60 + sm + (settings.sunsetOffsetMinutes || 0)));
     const sunsetTime = `${String(Math.floor(sunsetMinutes / 60)).padStart(2, '0')}:${String(sunsetMinutes % 60).padStart(2, '0')}`;
 
-    const imagePaths = await imageService.getDaylightImagePaths(date, sunriseTime, sunsetTime);
+    if (VIDEO_RENDERER === 'segments') {
+      if (await buildVideoFromSegments(outputPath, date, { cameraId, timeFrom: sunriseTime, timeTo: sunsetTime, lightClasses: DAYLIGHT_CLASSES })) return;
+      console.log(`No up-to-date timelapse segments for ${date}, rendering daylight video from captures`);
+    }
+
+    if (VIDEO_RENDERER === 'python') {
+      if (!await renderOverlayVideo(outputPath, date, { cameraId, timeFrom: sunriseTime, timeTo: sunsetTime, lightClasses: DAYLIGHT_CLASSES })) {
+        console.log(`No daylight images found for ${date}`);
+      }
+      return;
+    }
+
+    const imagePaths = await imageService.getDaylightImagePaths(date, sunriseTime, sunsetTime, cameraId);
     if (imagePaths.length === 0) {
       console.log(`No daylight images found for ${date}`);
       return;
     }
 
     try {
-      const outputPath = path.join(this.videosPath, 'daylight', `${date}-daylight.mp4`);
       await generateDailyVideo(imagePaths, outputPath);
     } finally {
       // Clean up temporary image files
@@ -195,8 +245,8 @@ class VideoService {
     }
   }
 
-  async generateCombined24hVideo() {
-    const dailyVideos = await this.getVideos('daily');
+  async generateCombined24hVideo(cameraId = DEFAULT_CAMERA_ID) {
+    const dailyVideos = await this.getVideos('daily', cameraId);
     if (dailyVideos.length === 0) {
       console.log('No daily videos to combine');
       return;
@@ -204,14 +254,14 @@ class VideoService {
 
     const videoPaths = dailyVideos
       .sort((a, b) => a.date.localeCompare(b.date))
-      .map(v => path.join(this.videosPath, 'daily', v.filename));
+      .map(v => path.join(this.getTypePath('daily', cameraId), v.filename));
 
-    const outputPath = path.join(this.videosPath, 'combined-24h', 'combined-all.mp4');
+    const outputPath = path.join(this.getTypePath('combined-24h', cameraId), 'combined-all.mp4');
     await generateCombinedVideo(videoPaths, outputPath);
   }
 
-  async generateCombinedDaylightVideo() {
-    const daylightVideos = await this.getVideos('daylight');
+  async generateCombinedDaylightVideo(cameraId = DEFAULT_CAMERA_ID) {
+    const daylightVideos = await this.getVideos('daylight', cameraId);
     if (daylightVideos.length === 0) {
       console.log('No daylight videos to combine');
       return;
@@ -219,16 +269,16 @@ class VideoService {
 
     const videoPaths = daylightVideos
       .sort((a, b) => a.date.localeCompare(b.date))
-      .map(v => path.join(this.videosPath, 'daylight', v.filename));
+      .map(v => path.join(this.getTypePath('daylight', cameraId), v.filename));
 
-    const outputPath = path.join(this.videosPath, 'combined-daylight', 'combined-daylight-all.mp4');
+    const outputPath = path.join(this.getTypePath('combined-daylight', cameraId), 'combined-daylight-all.mp4');
     await generateCombinedVideo(videoPaths, outputPath);
   }
 
-  async getMissingVideosCount() {
-    const days = await imageService.getDays();
-    const dailyVideos = await this.getVideos('daily');
-    const daylightVideos = await this.getVideos('daylight');
+  async getMissingVideosCount(cameraId = DEFAULT_CAMERA_ID) {
+    const days = await imageService.getDays(cameraId);
+    const dailyVideos = await this.getVideos('daily', cameraId);
+    const daylightVideos = await this.getVideos('daylight', cameraId);
 
     const existingDaily = new Set(dailyVideos.map(v => v.date));
     const existingDaylight = new Set(daylightVideos.map(v => v.date.replace('-daylight', '')));
@@ -248,10 +298,10 @@ class VideoService {
     return { missingDaily, missingDaylight, total: missingDaily + missingDaylight };
   }
 
-  async generateAllMissing() {
-    const days = await imageService.getDays();
-    const dailyVideos = await this.getVideos('daily');
-    const daylightVideos = await this.getVideos('daylight');
+  async generateAllMissing(cameraId = DEFAULT_CAMERA_ID) {
+    const days = await imageService.getDays(cameraId);
+    const dailyVideos = await this.getVideos('daily', cameraId);
+    const daylightVideos = await this.getVideos('daylight', cameraId);
 
     const existingDaily = new Set(dailyVideos.map(v => v.date));
     const existingDaylight = new Set(daylightVideos.map(v => v.date.replace('-daylight', '')));
@@ -261,11 +311,11 @@ class VideoService {
     // Queue missing daily videos
     for (const day of days) {
       if (!existingDaily.has(day)) {
-        await this.queueVideoGeneration('daily', day);
+        await this.queueVideoGeneration('daily', day, cameraId);
         queued.push({ type: 'daily', date: day });
       }
       if (!existingDaylight.has(day)) {
-        await this.queueVideoGeneration('daylight', day);
+        await this.queueVideoGeneration('daylight', day, cameraId);
         queued.push({ type: 'daylight', date: day });
       }
     }
@@ -273,8 +323,8 @@ class VideoService {
     return { queued, message: `Queued ${queued.length} video generation jobs` };
   }
 
-  async deleteVideo(type, filename) {
-    const filePath = path.join(this.videosPath, type, filename);
+  async deleteVideo(type, filename, cameraId = DEFAULT_CAMERA_ID) {
+    const filePath = path.join(this.getTypePath(type, cameraId), filename);
     try {
       await fs.unlink(filePath);
       console.log(`Deleted video: ${filePath}`);
@@ -285,8 +335,8 @@ class VideoService {
     }
   }
 
-  async deleteAllVideos(type) {
-    const typePath = path.join(this.videosPath, type);
+  async deleteAllVideos(type, cameraId = DEFAULT_CAMERA_ID) {
+    const typePath = this.getTypePath(type, cameraId);
     try {
       const files = await fs.readdir(typePath);
       const videoFiles = files.filter(f => /\.mp4$/i.test(f));
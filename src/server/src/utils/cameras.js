@@ -0,0 +1,32 @@
+/**
+ * Camera Helpers
+ * Resolves which camera's captures a request or job works on
+ */
+
+// The camera shown and rendered when none is given (the scraper's TARGET_URL camera is 'default')
+export const DEFAULT_CAMERA_ID = process.env.DEFAULT_CAMERA || 'default';
+
+// Same rule as the scraper's camera registry (scraper/cameras.py)
+const CAMERA_ID_PATTERN = /^[a-z0-9][a-z0-9_-]{0,63}$/;
+
+/**
+ * Resolve a camera id from a request value, falling back to the default camera.
+ * Returns null for an invalid id.
+ */
+export function resolveCameraId(value) {
+  if (value === undefined || value === null || value === '') return DEFAULT_CAMERA_ID;
+  const cameraId = String(value).trim().toLowerCase();
+  return CAMERA_ID_PATTERN.test(cameraId) ? cameraId : null;
+}
+
+/**
+ * Express middleware: resolve ?camera= (or a JSON body `camera`) into req.cameraId
+ */
+export function cameraParam(req, res, next) {
+  const cameraId = resolveCameraId(req.query.camera ?? req.body?.camera);
+  if (!cameraId) {
+    return res.status(400).json({ error: 'Invalid camera id' });
+  }
+  req.cameraId = cameraId;
+  next();
+}
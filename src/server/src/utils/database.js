@@ -3,6 +3,7 @@
  * Handles MariaDB connection and capture operations
  */
 import mysql from 'mysql2/promise';
+import { DEFAULT_CAMERA_ID } from './cameras.js';
 
 const dbConfig = {
   host: process.env.DB_HOST || 'localhost',
@@ -15,6 +16,16 @@ const dbConfig = {
   queueLimit: 0
 };
 
+// Daylight videos select captures by the brightness class the scraper stores
+// ('light') or by the stored sunrise/sunset times ('sun')
+const DAYLIGHT_SELECTION = process.env.DAYLIGHT_SELECTION || 'light';
+// Classes a daylight video keeps (none when selecting by sun times)
+export const DAYLIGHT_CLASSES = DAYLIGHT_SELECTION === 'sun'
+  ? []
+  : (process.env.DAYLIGHT_CLASSES || 'day').split(',').map(c => c.trim()).filter(Boolean);
+// Leave frames classified as dark out of daily videos
+export const SKIP_DARK_FRAMES = process.env.SKIP_DARK_FRAMES === 'true';
+
 let pool = null;
 
 /**
@@ -36,6 +47,7 @@ export async function initDatabase() {
     await conn.execute(`
       CREATE TABLE IF NOT EXISTS captures (
         id INT AUTO_INCREMENT PRIMARY KEY,
+        camera_id VARCHAR(64) NOT NULL DEFAULT 'default',
         capture_date DATE NOT NULL,
         capture_time TIME NOT NULL,
         captured_at DATETIME NOT NULL,
@@ -51,10 +63,28 @@ export async function initDatabase() {
         bratislava_sunrise VARCHAR(10),
         bratislava_sunset VARCHAR(10),
         bratislava_day_length VARCHAR(20),
+        fingerprint BIGINT UNSIGNED,
+        duplicate_of INT,
+        luminance FLOAT,
+        contrast FLOAT,
+        light_class ENUM('dark', 'twilight', 'day'),
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         INDEX idx_capture_date (capture_date),
         INDEX idx_capture_datetime (capture_date, capture_time),
-        UNIQUE KEY unique_capture (capture_date, capture_time)
+        INDEX idx_light (camera_id, capture_date, light_class, capture_time),
+        UNIQUE KEY unique_capture (camera_id, capture_date, capture_time)
+      ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    `);
+    await conn.execute(`
+      CREATE TABLE IF NOT EXISTS capture_renditions (
+        capture_id INT NOT NULL,
+        size VARCHAR(16) NOT NULL,
+        width INT,
+        height INT,
+        image_format VARCHAR(10) DEFAULT 'jpeg',
+        image_data MEDIUMBLOB NOT NULL,
+        PRIMARY KEY (capture_id, size),
+        FOREIGN KEY (capture_id) REFERENCES captures(id) ON DELETE CASCADE
       ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
     `);
     console.log('Database schema initialized');
@@ -68,16 +98,17 @@ export async function initDatabase() {
 }
 
 /**
- * Get all capture dates (days)
+ * Get all capture dates (days) of a camera
  */
-export async function getDays() {
+export async function getDays(cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
       SELECT DISTINCT DATE_FORMAT(capture_date, '%Y-%m-%d') as date
       FROM captures
+      WHERE camera_id = ?
       ORDER BY capture_date DESC
-    `);
+    `, [cameraId]);
     return rows.map(row => row.date);
   } catch (error) {
     console.error('Error getting days:', error);
@@ -88,9 +119,29 @@ export async function getDays() {
 }
 
 /**
- * Get captures for a specific date (metadata only, no image data)
+ * Get all cameras that have captures
+ */
+export async function getCameras() {
+  const conn = await getPool().getConnection();
+  try {
+    const [rows] = await conn.execute(`
+      SELECT DISTINCT camera_id
+      FROM captures
+      ORDER BY camera_id ASC
+    `);
+    return rows.map(row => row.camera_id);
+  } catch (error) {
+    console.error('Error getting cameras:', error);
+    return [];
+  } finally {
+    conn.release();
+  }
+}
+
+/**
+ * Get a camera's captures for a specific date (metadata only, no image data)
  */
-export async function getCapturesForDay(date) {
+export async function getCapturesForDay(date, cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
@@ -98,9 +149,9 @@ export async function getCapturesForDay(date) {
              alicante_temp, alicante_sunrise, alicante_sunset, alicante_day_length,
              bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length
       FROM captures
-      WHERE capture_date = ?
+      WHERE camera_id = ? AND capture_date = ?
       ORDER BY capture_time ASC
-    `, [date]);
+    `, [cameraId, date]);
 
     return rows.map(row => ({
       id: row.id,
@@ -108,6 +159,7 @@ export async function getCapturesForDay(date) {
       time: row.capture_time.toString().substring(0, 5).replace(/:/g, ':'),
       url: `/api/images/data/${row.id}/overlay`,
       rawUrl: `/api/images/data/${row.id}`,
+      thumbUrl: `/api/images/data/${row.id}?size=preview`,
       date: row.capture_date instanceof Date ? row.capture_date.toISOString().split('T')[0] : row.capture_date,
       width: row.width,
       height: row.height,
@@ -135,9 +187,9 @@ export async function getCapturesForDay(date) {
 }
 
 /**
- * Get latest capture (metadata only)
+ * Get a camera's latest capture (metadata only)
  */
-export async function getLatestCapture() {
+export async function getLatestCapture(cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
@@ -145,9 +197,10 @@ export async function getLatestCapture() {
              alicante_temp, alicante_sunrise, alicante_sunset, alicante_day_length,
              bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length
       FROM captures
-      ORDER BY captured_at DESC
+      WHERE camera_id = ?
+      ORDER BY capture_date DESC, capture_time DESC
       LIMIT 1
-    `);
+    `, [cameraId]);
 
     if (rows.length === 0) return null;
 
@@ -170,16 +223,46 @@ export async function getLatestCapture() {
   }
 }
 
+/**
+ * Get a downscaled rendition (e.g. 'thumb', 'preview') of a capture
+ * Near-duplicates use the renditions of the capture they reference
+ */
+export async function getRendition(captureId, size) {
+  const conn = await getPool().getConnection();
+  try {
+    const [rows] = await conn.execute(`
+      SELECT r.image_data, r.image_format
+      FROM captures c
+      JOIN capture_renditions r ON r.capture_id = COALESCE(c.duplicate_of, c.id)
+      WHERE c.id = ? AND r.size = ?
+    `, [captureId, size]);
+
+    if (rows.length === 0) return null;
+    return {
+      data: rows[0].image_data,
+      format: rows[0].image_format || 'jpeg'
+    };
+  } catch (error) {
+    console.error('Error getting rendition:', error);
+    return null;
+  } finally {
+    conn.release();
+  }
+}
+
 /**
  * Get image data by capture ID
+ * Near-duplicate captures store no blob and read it from the capture they reference
  */
 export async function getImageData(captureId) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
-      SELECT image_data, image_format
-      FROM captures
-      WHERE id = ?
+      SELECT COALESCE(o.image_data, c.image_data) as image_data,
+             COALESCE(o.image_format, c.image_format) as image_format
+      FROM captures c
+      LEFT JOIN captures o ON o.id = c.duplicate_of
+      WHERE c.id = ?
     `, [captureId]);
 
     if (rows.length === 0) return null;
@@ -202,11 +285,15 @@ export async function getFullCaptureData(captureId) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
-      SELECT id, capture_date, capture_time, image_data, image_format, width, height,
-             alicante_temp, alicante_sunrise, alicante_sunset, alicante_day_length,
-             bratislava_temp, bratislava_sunrise, bratislava_sunset, bratislava_day_length
-      FROM captures
-      WHERE id = ?
+      SELECT c.id, c.capture_date, c.capture_time,
+             COALESCE(o.image_data, c.image_data) as image_data,
+             COALESCE(o.image_format, c.image_format) as image_format,
+             c.width, c.height,
+             c.alicante_temp, c.alicante_sunrise, c.alicante_sunset, c.alicante_day_length,
+             c.bratislava_temp, c.bratislava_sunrise, c.bratislava_sunset, c.bratislava_day_length
+      FROM captures c
+      LEFT JOIN captures o ON o.id = c.duplicate_of
+      WHERE c.id = ?
     `, [captureId]);
 
     if (rows.length === 0) return null;
@@ -244,17 +331,19 @@ export async function getFullCaptureData(captureId) {
 }
 
 /**
- * Get capture IDs for a date (for video generation)
+ * Get a camera's capture IDs for a date (for video generation).
+ * With SKIP_DARK_FRAMES, captures classified as dark are left out.
  */
-export async function getCaptureIdsForDay(date) {
+export async function getCaptureIdsForDay(date, cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
       SELECT id, capture_time
       FROM captures
-      WHERE capture_date = ?
+      WHERE camera_id = ? AND capture_date = ?
+        ${SKIP_DARK_FRAMES ? "AND (light_class IS NULL OR light_class <> 'dark')" : ''}
       ORDER BY capture_time ASC
-    `, [date]);
+    `, [cameraId, date]);
     return rows;
   } catch (error) {
     console.error('Error getting capture IDs:', error);
@@ -265,19 +354,37 @@ export async function getCaptureIdsForDay(date) {
 }
 
 /**
- * Get daylight capture IDs for a date (between sunrise and sunset)
+ * Get a camera's daylight capture IDs for a date. Captures are selected by their
+ * brightness class (an idx_light range); captures stored before they were
+ * classified, or all captures with DAYLIGHT_SELECTION=sun, fall back to
+ * sunrise..sunset.
  */
-export async function getDaylightCaptureIdsForDay(date, sunriseTime, sunsetTime) {
+export async function getDaylightCaptureIdsForDay(date, sunriseTime, sunsetTime, cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
+    if (DAYLIGHT_CLASSES.length === 0) {
+      const [rows] = await conn.execute(`
+        SELECT id, capture_time
+        FROM captures
+        WHERE camera_id = ? AND capture_date = ?
+          AND capture_time >= ?
+          AND capture_time <= ?
+        ORDER BY capture_time ASC
+      `, [cameraId, date, sunriseTime, sunsetTime]);
+      return rows;
+    }
+
+    const placeholders = DAYLIGHT_CLASSES.map(() => '?').join(', ');
     const [rows] = await conn.execute(`
       SELECT id, capture_time
       FROM captures
-      WHERE capture_date = ?
-        AND capture_time >= ?
-        AND capture_time <= ?
+      WHERE camera_id = ? AND capture_date = ?
+        AND (
+          light_class IN (${placeholders})
+          OR (light_class IS NULL AND capture_time >= ? AND capture_time <= ?)
+        )
       ORDER BY capture_time ASC
-    `, [date, sunriseTime, sunsetTime]);
+    `, [cameraId, date, ...DAYLIGHT_CLASSES, sunriseTime, sunsetTime]);
     return rows;
   } catch (error) {
     console.error('Error getting daylight capture IDs:', error);
@@ -288,17 +395,18 @@ export async function getDaylightCaptureIdsForDay(date, sunriseTime, sunsetTime)
 }
 
 /**
- * Get image count per day
+ * Get a camera's image count per day
  */
-export async function getImageCounts() {
+export async function getImageCounts(cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
       SELECT DATE_FORMAT(capture_date, '%Y-%m-%d') as date, COUNT(*) as count
       FROM captures
+      WHERE camera_id = ?
       GROUP BY capture_date
       ORDER BY capture_date DESC
-    `);
+    `, [cameraId]);
     const counts = {};
     for (const row of rows) {
       counts[row.date] = row.count;
@@ -318,6 +426,13 @@ export async function getImageCounts() {
 export async function deleteCapture(captureId) {
   const conn = await getPool().getConnection();
   try {
+    // Give near-duplicates that reference this capture their own copy of the image first
+    await conn.execute(`
+      UPDATE captures d
+      JOIN captures o ON o.id = d.duplicate_of
+      SET d.image_data = o.image_data, d.duplicate_of = NULL
+      WHERE o.id = ?
+    `, [captureId]);
     await conn.execute('DELETE FROM captures WHERE id = ?', [captureId]);
     console.log(`Deleted capture: ${captureId}`);
     return { success: true };
@@ -330,13 +445,23 @@ export async function deleteCapture(captureId) {
 }
 
 /**
- * Delete all captures for a date
+ * Delete all of a camera's captures for a date
  */
-export async function deleteCapturesForDay(date) {
+export async function deleteCapturesForDay(date, cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
-    const [result] = await conn.execute('DELETE FROM captures WHERE capture_date = ?', [date]);
-    console.log(`Deleted ${result.affectedRows} captures for ${date}`);
+    // Near-duplicates on other days keep their image when the referenced capture is deleted
+    await conn.execute(`
+      UPDATE captures d
+      JOIN captures o ON o.id = d.duplicate_of
+      SET d.image_data = o.image_data, d.duplicate_of = NULL
+      WHERE o.camera_id = ? AND o.capture_date = ? AND d.capture_date <> ?
+    `, [cameraId, date, date]);
+    const [result] = await conn.execute(
+      'DELETE FROM captures WHERE camera_id = ? AND capture_date = ?',
+      [cameraId, date]
+    );
+    console.log(`Deleted ${result.affectedRows} captures of ${cameraId} for ${date}`);
     return { success: true, deleted: result.affectedRows };
   } catch (error) {
     console.error('Error deleting captures:', error);
@@ -347,19 +472,19 @@ export async function deleteCapturesForDay(date) {
 }
 
 /**
- * Get sunrise/sunset from latest capture for a date
+ * Get sunrise/sunset from a camera's latest capture for a date
  */
-export async function getSunTimesForDate(date) {
+export async function getSunTimesForDate(date, cameraId = DEFAULT_CAMERA_ID) {
   const conn = await getPool().getConnection();
   try {
     const [rows] = await conn.execute(`
       SELECT alicante_sunrise, alicante_sunset
       FROM captures
-      WHERE capture_date = ?
+      WHERE camera_id = ? AND capture_date = ?
         AND alicante_sunrise IS NOT NULL
       ORDER BY capture_time DESC
       LIMIT 1
-    `, [date]);
+    `, [cameraId, date]);
 
     if (rows.length === 0) {
       return { sunrise: '06:00', sunset: '20:00' };
@@ -7,36 +7,100 @@ const FRAME_RATE = 30;
 // Duration per image in seconds (1/FRAME_RATE for smooth video)
 const IMAGE_DURATION = 1 / FRAME_RATE;
 
+// Python batch renderer (scraper/overlay.py --video) used when VIDEO_RENDERER=python
+const PYTHON_BIN = process.env.PYTHON_BIN || '/app/venv/bin/python';
+const OVERLAY_SCRIPT = process.env.OVERLAY_SCRIPT || '/app/scraper/overlay.py';
+// Concatenates the scraper's per-hour timelapse segments (VIDEO_RENDERER=segments)
+const TIMELAPSE_SCRIPT = process.env.TIMELAPSE_SCRIPT || '/app/scraper/timelapse.py';
+// Exit code of overlay.py --video and timelapse.py when there is nothing to render
+// (2 is argparse's usage error)
+const NO_FRAMES_EXIT_CODE = 3;
+
 /**
- * Execute an FFmpeg command
+ * Run a command, rejecting with the tail of its stderr on failure
  */
-function runFFmpeg(args) {
+function runCommand(command, args, options = {}) {
   return new Promise((resolve, reject) => {
-    console.log(`Running: ffmpeg ${args.join(' ')}`);
+    console.log(`Running: ${command} ${args.join(' ')}`);
 
-    const ffmpeg = spawn('ffmpeg', args);
+    const child = spawn(command, args, options);
 
     let stderr = '';
 
-    ffmpeg.stderr.on('data', (data) => {
+    child.stdout?.on('data', (data) => {
+      process.stdout.write(data);
+    });
+
+    child.stderr.on('data', (data) => {
       stderr += data.toString();
     });
 
-    ffmpeg.on('close', (code) => {
+    child.on('close', (code) => {
       if (code === 0) {
-        resolve();
+        resolve(code);
       } else {
-        console.error(`FFmpeg stderr: ${stderr}`);
-        reject(new Error(`FFmpeg exited with code ${code}: ${stderr.slice(-500)}`));
+        console.error(`${command} stderr: ${stderr}`);
+        reject(Object.assign(new Error(`${command} exited with code ${code}: ${stderr.slice(-500)}`), { code }));
       }
     });
 
-    ffmpeg.on('error', (error) => {
+    child.on('error', (error) => {
       reject(error);
     });
   });
 }
 
+/**
+ * Execute an FFmpeg command
+ */
+function runFFmpeg(args) {
+  return runCommand('ffmpeg', args);
+}
+
+/**
+ * Render a video straight from the database with the Python batch renderer:
+ * overlays are drawn across a process pool and piped into ffmpeg, without temp files.
+ * With lightClasses, classified captures are selected by class instead of time.
+ * Returns false when there were no captures to render.
+ */
+export async function renderOverlayVideo(outputPath, date, { cameraId, timeFrom, timeTo, lightClasses } = {}) {
+  const args = [OVERLAY_SCRIPT, '--video', outputPath, date];
+  if (cameraId) args.push('--camera', cameraId);
+  if (timeFrom) args.push('--from-time', timeFrom);
+  if (timeTo) args.push('--to-time', timeTo);
+  if (lightClasses?.length) args.push('--light', lightClasses.join(','));
+
+  try {
+    await runCommand(PYTHON_BIN, args, { cwd: path.dirname(OVERLAY_SCRIPT) });
+    return true;
+  } catch (error) {
+    if (error.code === NO_FRAMES_EXIT_CODE) return false;
+    throw error;
+  }
+}
+
+/**
+ * Build a day's video by stream-copying the timelapse segments the scraper
+ * encoded as captures arrived (optionally cut to light classes and a time
+ * range, selected like renderOverlayVideo).
+ * Returns false when the day has no segments, so callers can do a full render.
+ */
+export async function buildVideoFromSegments(outputPath, date, { cameraId, timeFrom, timeTo, lightClasses } = {}) {
+  const args = [TIMELAPSE_SCRIPT, outputPath, date];
+  if (cameraId) args.push('--camera', cameraId);
+  if (timeFrom) args.push('--from-time', timeFrom);
+  if (timeTo) args.push('--to-time', timeTo);
+  if (lightClasses?.length) args.push('--light', lightClasses.join(','));
+
+  try {
+    await runCommand(PYTHON_BIN, args, { cwd: path.dirname(TIMELAPSE_SCRIPT) });
+    return true;
+  } catch (error) {
+    if (error.code === NO_FRAMES_EXIT_CODE) return false;
+    throw error;
+  }
+}
+
 /**
  * Generate a video from a list of image paths
  */
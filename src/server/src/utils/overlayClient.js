@@ -0,0 +1,87 @@
+import net from 'net';
+import { applyOverlayToBuffer } from './imageOverlay.js';
+
+// Offload overlays to the Python render daemon (scraper/overlay_server.py)
+const OVERLAY_DAEMON = process.env.OVERLAY_DAEMON === 'true';
+const OVERLAY_SOCKET = process.env.OVERLAY_SOCKET || '/tmp/overlay.sock';
+const OVERLAY_TIMEOUT_MS = parseInt(process.env.OVERLAY_TIMEOUT_MS || '10000', 10);
+
+/**
+ * Build the daemon's weather object for a city from capture weather data
+ */
+function toDaemonWeather(city, data) {
+  if (!data || data.temp === null || data.temp === undefined) return null;
+  return {
+    city,
+    temperature: data.temp,
+    sunrise: data.sunrise || '--:--',
+    sunset: data.sunset || '--:--',
+    day_length: data.day_length || '--'
+  };
+}
+
+/**
+ * Encode a length-prefixed frame (big-endian u32 length + bytes)
+ */
+function frame(buffer) {
+  const length = Buffer.alloc(4);
+  length.writeUInt32BE(buffer.length);
+  return [length, buffer];
+}
+
+/**
+ * Render an overlay through the daemon: image bytes in, JPEG bytes out, no disk I/O
+ */
+export function renderOverlayWithDaemon(imageBuffer, weatherData, date) {
+  return new Promise((resolve, reject) => {
+    const header = Buffer.from(JSON.stringify({
+      alicante: toDaemonWeather('Alicante', weatherData?.alicante),
+      bratislava: toDaemonWeather('Bratislava', weatherData?.bratislava),
+      date
+    }));
+
+    const chunks = [];
+    const socket = net.createConnection(OVERLAY_SOCKET, () => {
+      socket.end(Buffer.concat([...frame(header), ...frame(imageBuffer)]));
+    });
+
+    socket.setTimeout(OVERLAY_TIMEOUT_MS, () => {
+      socket.destroy(new Error(`Overlay daemon timed out after ${OVERLAY_TIMEOUT_MS}ms`));
+    });
+
+    socket.on('data', (chunk) => chunks.push(chunk));
+    socket.on('error', reject);
+    socket.on('end', () => {
+      try {
+        const response = Buffer.concat(chunks);
+        const headerLength = response.readUInt32BE(0);
+        const responseHeader = JSON.parse(response.subarray(4, 4 + headerLength).toString());
+        if (!responseHeader.ok) {
+          throw new Error(`Overlay daemon error: ${responseHeader.error}`);
+        }
+        const imageLength = response.readUInt32BE(4 + headerLength);
+        const imageStart = 8 + headerLength;
+        resolve(response.subarray(imageStart, imageStart + imageLength));
+      } catch (error) {
+        reject(error);
+      }
+    });
+  });
+}
+
+/**
+ * Apply the overlay, using the render daemon when enabled.
+ * The daemon draws the compact overlay without temperature charts, so
+ * requests with chart data (and any daemon failure) use the sharp renderer.
+ */
+export async function renderOverlay(imageBuffer, weatherData, date, options = {}) {
+  const wantsCharts = options.showChart || options.temperatureHistory || options.temperatureHistory30;
+  if (OVERLAY_DAEMON && !wantsCharts) {
+    try {
+      return await renderOverlayWithDaemon(imageBuffer, weatherData, date);
+    } catch (error) {
+      console.error('Overlay daemon failed, falling back to sharp:', error.message);
+    }
+  }
+  return await applyOverlayToBuffer(imageBuffer, weatherData, date, options);
+}